@@ -4,36 +4,45 @@ from dotenv import load_dotenv
 # Load environment variables from .env file before importing config
 load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env'))
 
-from flask import Flask, render_template
+from flask import Flask
 from config import Config
-from models import db, User, ReportLog
+from models import db, User
 from flask_login import LoginManager
-from extensions import mail
+from extensions import mail, compress, assets, FastJSONProvider
 
-app = Flask(__name__)
-app.config.from_object(Config)
-
-# Initialize Extensions
-db.init_app(app)
-mail.init_app(app)
 login_manager = LoginManager()
 login_manager.login_view = 'auth.login'
-login_manager.init_app(app)
 
 @login_manager.user_loader
 def load_user(user_id):
     return User.query.get(int(user_id))
 
-# Register Blueprints
-with app.app_context():
-    db.create_all() # Create tables if they don't exist
+def create_app(config_class=Config):
+    """
+    Application factory. Keeps boot cheap: no schema creation (use `flask init-db`)
+    and no pandas/openpyxl/linebot imports until a request actually needs them.
+    """
+    app = Flask(__name__)
+    app.config.from_object(config_class)
+    app.json = FastJSONProvider(app)
+    _prepare_environment(app)
+
+    # Initialize Extensions
+    db.init_app(app)
+    mail.init_app(app)
+    compress.init_app(app)
+    assets.init_app(app)
+    login_manager.init_app(app)
 
+    # Register Blueprints
     from routes.main_routes import main_bp
     from routes.salary_routes import salary_bp
     from routes.download_routes import download_bp
     from routes.ntut_routes import ntut_bp
     from routes.expense_routes import expense_bp
     from routes.auth import auth_bp
+    from routes.line_routes import line_bp, register_line_handlers
+    from routes.reminder_routes import reminder_bp
 
     app.register_blueprint(main_bp)
     app.register_blueprint(salary_bp, url_prefix='/salary')
@@ -41,42 +50,50 @@ with app.app_context():
     app.register_blueprint(ntut_bp)
     app.register_blueprint(expense_bp)
     app.register_blueprint(auth_bp)
-    
-    from services.line_service import LineService
-    from routes.line_routes import line_bp, register_line_handlers
-    
-    # Initialize LINE Service
-    LineService.init_app(app)
-    register_line_handlers(LineService.get_handler())
-    
     app.register_blueprint(line_bp, url_prefix='/line')
-    
-    from routes.reminder_routes import reminder_bp
     app.register_blueprint(reminder_bp, url_prefix='/reminders')
 
-    # Initialize Scheduler
-    try:
-        from flask_apscheduler import APScheduler
-        from services.reminder_service import ReminderService
-        
-        scheduler = APScheduler()
-        app.config['SCHEDULER_API_ENABLED'] = True
-        scheduler.init_app(app)
-        
-        @scheduler.task('interval', id='check_reminders', seconds=60)
-        def check_reminders_task():
-            # Wrap in app context inside the task
-            with app.app_context():
-                ReminderService.check_and_send_reminders(app)
-            
-        scheduler.start()
-        print("Scheduler started successfully.")
-    except ImportError as e:
-        print(f"Scheduler could not start: {e}")
-        print("Reminders will not be sent automatically.")
-    except Exception as e:
-        print(f"Scheduler error: {e}")
+    # Initialize LINE Service (SDK is loaded on first use)
+    from services.line_service import LineService
+    LineService.init_app(app, register_line_handlers)
+
+    _register_commands(app)
+    return app
+
+def _prepare_environment(app):
+    # Add project bin to PATH (for ffmpeg on Render)
+    bin_dir = app.config.get('BIN_DIR')
+    if bin_dir and os.path.exists(bin_dir) and bin_dir not in os.environ['PATH']:
+        os.environ['PATH'] = bin_dir + os.pathsep + os.environ['PATH']
+
+    # Ensure download directory exists
+    download_path = app.config.get('DOWNLOAD_PATH')
+    if download_path:
+        os.makedirs(download_path, exist_ok=True)
+
+def _register_commands(app):
+    @app.cli.command('init-db')
+    def init_db():
+        """Create tables if they don't exist."""
+        db.create_all()
+        print("Database tables are ready.")
+
+    @app.cli.command('run-scheduler')
+    def run_scheduler():
+        """Run the reminder scheduler in its own process."""
+        from services.scheduler_service import SchedulerService
+        SchedulerService.run_forever(app)
+
+    @app.cli.command('book-recurring')
+    def book_recurring():
+        """Book due recurring expenses now (the scheduler does this every 15 minutes)."""
+        from services.recurring_service import RecurringExpenseService
+        RecurringExpenseService.materialize_due()
 
+app = create_app()
 
 if __name__ == '__main__':
+    # Scheduler only for server entry points (see wsgi.py), never for CLI commands
+    from services.scheduler_service import SchedulerService
+    SchedulerService.init_app(app)
     app.run(debug=True, port=5001)
@@ -6,21 +6,41 @@ class Config:
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
     SALARY_DATA_FILE = os.path.join(BASE_DIR, 'salary_data.json')
     
-    # Add project bin to PATH (for ffmpeg on Render)
+    # Project bin, added to PATH by create_app (for ffmpeg on Render)
     BIN_DIR = os.path.join(BASE_DIR, 'bin')
-    if os.path.exists(BIN_DIR):
-        os.environ['PATH'] = BIN_DIR + os.pathsep + os.environ['PATH']
     
     # Database Configuration
     SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(BASE_DIR, 'app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
-    # Download Path (relative to project root)
-    DOWNLOAD_PATH = os.path.join(BASE_DIR, 'downloads')
+    # Scheduler: only the process holding this lock runs jobs. Jobs normally run in
+    # the Procfile's `flask run-scheduler` process; set SCHEDULER_IN_WEB=1 to also let
+    # web processes (wsgi.py / python app.py) contend, e.g. on a single host without it.
+    SCHEDULER_LOCK_FILE = os.path.join(BASE_DIR, 'scheduler.lock')
+    SCHEDULER_IN_WEB = os.environ.get('SCHEDULER_IN_WEB', '0') == '1'
+    
+    # Response compression (see extensions.Compress). Brotli is used when installed.
+    COMPRESS_MIN_SIZE = 500  # bytes; smaller bodies aren't worth the CPU or the header
+    COMPRESS_MIMETYPES = (
+        'text/html', 'text/css', 'text/plain', 'text/javascript',
+        'application/javascript', 'application/json', 'image/svg+xml'
+    )
+    COMPRESS_STATIC_EXTENSIONS = ('.js', '.css', '.svg', '.json', '.txt')
+    
+    # Content-hashed static URLs (see extensions.StaticAssets). Uploads change in place.
+    STATIC_HASHED_EXTENSIONS = ('.js', '.css', '.png', '.jpg', '.svg', '.ico', '.woff2')
+    STATIC_HASH_EXCLUDE = ('uploads/',)
     
-    # Ensure download directory exists
-    if not os.path.exists(DOWNLOAD_PATH):
-        os.makedirs(DOWNLOAD_PATH, exist_ok=True)
+    # Request body limit; the avatar upload route tightens it further
+    MAX_CONTENT_LENGTH = 4 * 1024 * 1024
+    
+    # Avatars (see services/avatar_service.py): square WebP variants per display size
+    AVATAR_FOLDER = os.path.join(BASE_DIR, 'static', 'uploads', 'avatars')
+    AVATAR_MAX_BYTES = 2 * 1024 * 1024
+    AVATAR_SIZES = (64, 200, 400)  # nav (32px @2x), settings (100px @2x), preview
+    
+    # Download Path (relative to project root), created by create_app
+    DOWNLOAD_PATH = os.path.join(BASE_DIR, 'downloads')
     # Email Configuration
     MAIL_SERVER = 'smtp.gmail.com'
     MAIL_PORT = 587
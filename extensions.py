@@ -1,3 +1,235 @@
 from flask_mail import Mail
+from flask import current_app, request, send_from_directory, url_for
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.security import safe_join
+from datetime import date, datetime
+import mimetypes
+import hashlib
+import gzip
+import os
+
+try:
+    import orjson
+except ImportError:  # Optional speedup; stdlib json is used without it
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # Optional; gzip alone is offered without it
+    brotli = None
 
 mail = Mail()
+
+def _default(o):
+    # Same ISO 8601 output orjson produces natively, so both paths agree
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    return DefaultJSONProvider.default(o)
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider backed by orjson when installed, falling back to the stdlib.
+    Keys stay sorted (snapshot ETags depend on stable output) and datetimes
+    from Reminder / UserSettings serialize as ISO 8601 on both paths.
+    """
+
+    default = staticmethod(_default)
+    ensure_ascii = False
+
+    def _orjson_option(self, indent=False):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        # Extra kwargs are stdlib json.dumps options orjson can't honour
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._orjson_option()).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=self.default, option=self._orjson_option(indent))
+        # Bytes go straight into the response, no str round trip
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+class Compress:
+    """
+    gzip / Brotli for responses. Dynamic JSON and HTML are compressed in
+    after_request when they clear COMPRESS_MIN_SIZE; static files are
+    precompressed once at startup into .gz / .br siblings and served directly.
+    """
+
+    SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+    def init_app(self, app):
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', 500)
+        self.mimetypes = frozenset(app.config.get('COMPRESS_MIMETYPES', ()))
+        self.static_extensions = tuple(app.config.get('COMPRESS_STATIC_EXTENSIONS', ()))
+        self.encodings = ('br', 'gzip') if brotli else ('gzip',)
+
+        app.after_request(self._after_request)
+        if app.has_static_folder:
+            self.precompress_static(app)
+            app.view_functions['static'] = self._static_view(app, app.view_functions['static'])
+
+    def compress(self, data, encoding, static=False):
+        if encoding == 'br':
+            return brotli.compress(data, quality=11 if static else 5)
+        return gzip.compress(data, compresslevel=9 if static else 6, mtime=0)
+
+    def _negotiate(self):
+        return request.accept_encodings.best_match(self.encodings)
+
+    def _after_request(self, response):
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in self.mimetypes):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        data = response.get_data()
+        encoding = self._negotiate()
+        if len(data) < self.min_size or not encoding:
+            return response
+
+        compressed = self.compress(data, encoding)
+        if len(compressed) >= len(data):
+            return response
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        # Bytes differ per encoding, so a strong validator must become weak
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    def precompress_static(self, app):
+        """Write .gz / .br next to each compressible static file that is missing or stale."""
+        written = 0
+        for dirpath, _, filenames in os.walk(app.static_folder):
+            for name in filenames:
+                if not name.endswith(self.static_extensions):
+                    continue
+                source = os.path.join(dirpath, name)
+                data = None
+                for encoding in self.encodings:
+                    target = source + self.SUFFIXES[encoding]
+                    if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source):
+                        continue
+                    if data is None:
+                        with open(source, 'rb') as f:
+                            data = f.read()
+                    if len(data) < self.min_size:
+                        break
+                    try:
+                        # Several workers boot at once; replace atomically
+                        tmp = f"{target}.{os.getpid()}.tmp"
+                        with open(tmp, 'wb') as f:
+                            f.write(self.compress(data, encoding, static=True))
+                        os.replace(tmp, target)
+                        written += 1
+                    except OSError as e:
+                        print(f"Static precompression skipped: {e}")
+                        return written
+        return written
+
+    def _static_view(self, app, view):
+        def static(filename):
+            compressible = filename.endswith(self.static_extensions)
+            encoding = self._negotiate() if compressible else None
+            if encoding:
+                source = safe_join(app.static_folder, filename)
+                target = source and source + self.SUFFIXES[encoding]
+                if target and os.path.isfile(target) and os.path.getmtime(target) >= os.path.getmtime(source):
+                    response = send_from_directory(
+                        app.static_folder, filename + self.SUFFIXES[encoding],
+                        mimetype=mimetypes.guess_type(filename)[0],
+                        max_age=app.get_send_file_max_age(filename)
+                    )
+                    response.headers['Content-Encoding'] = encoding
+                    response.vary.add('Accept-Encoding')
+                    return response
+
+            response = view(filename=filename)
+            if compressible:
+                response.vary.add('Accept-Encoding')
+            return response
+        return static
+
+class StaticAssets:
+    """
+    Content-hashed static URLs. A manifest of css/style.css -> css/style.<hash>.css
+    is built at startup; templates call static_url() and the hashed URLs are
+    served as immutable for a year, so repeat visits make no static requests.
+    """
+
+    IMMUTABLE_MAX_AGE = 31536000
+
+    def __init__(self):
+        self.manifest = {}   # filename -> hashed filename
+        self._sources = {}   # hashed filename -> filename
+
+    def init_app(self, app):
+        self.build_manifest(app)
+        app.add_template_global(self.static_url)
+        if app.has_static_folder:
+            app.view_functions['static'] = self._static_view(app.view_functions['static'])
+
+    def build_manifest(self, app):
+        extensions = tuple(app.config.get('STATIC_HASHED_EXTENSIONS', ()))
+        excluded = tuple(app.config.get('STATIC_HASH_EXCLUDE', ()))
+        manifest = {}
+        if app.has_static_folder:
+            for dirpath, _, filenames in os.walk(app.static_folder):
+                for name in filenames:
+                    path = os.path.join(dirpath, name)
+                    filename = os.path.relpath(path, app.static_folder).replace(os.sep, '/')
+                    if not name.endswith(extensions) or filename.startswith(excluded):
+                        continue
+                    with open(path, 'rb') as f:
+                        digest = hashlib.sha256(f.read()).hexdigest()[:10]
+                    root, ext = os.path.splitext(filename)
+                    manifest[filename] = f"{root}.{digest}{ext}"
+        self.manifest = manifest
+        self._sources = {hashed: filename for filename, hashed in manifest.items()}
+        return manifest
+
+    def static_url(self, filename, **values):
+        """url_for('static') with the content-hashed name when one is known."""
+        # The manifest is fixed at startup; in debug, edited files must show up on reload
+        if not current_app.debug:
+            filename = self.manifest.get(filename, filename)
+        return url_for('static', filename=filename, **values)
+
+    def _static_view(self, view):
+        def static(filename):
+            source = self._sources.get(filename)
+            if source is None:
+                return view(filename=filename)
+
+            response = view(filename=source)
+            if response.status_code in (200, 304):
+                # The name changes whenever the bytes do
+                response.cache_control.no_cache = None
+                response.cache_control.public = True
+                response.cache_control.max_age = self.IMMUTABLE_MAX_AGE
+                response.cache_control.immutable = True
+            return response
+        return static
+
+compress = Compress()
+assets = StaticAssets()
@@ -1,10 +1,83 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from sqlalchemy import case, event, DDL
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.ext.hybrid import hybrid_property
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
+from datetime import datetime, date, time, timedelta
+from decimal import Decimal, ROUND_HALF_UP
 
 db = SQLAlchemy()
 
+# SQLite has no date/time storage class, so SQLAlchemy keeps these as ISO text.
+# Pin that text to the layouts the tables already hold ("YYYY-MM-DD", "HH:MM",
+# "YYYY-MM-DD HH:MM:SS"): rows written before and after compare and sort alike,
+# and the regexps also read unpadded legacy values.
+Date = db.Date().with_variant(sqlite.DATE(
+    storage_format="%(year)04d-%(month)02d-%(day)02d",
+    regexp=r"(\d{4})-(\d{1,2})-(\d{1,2})"
+), 'sqlite')
+TimeHM = db.Time().with_variant(sqlite.TIME(
+    storage_format="%(hour)02d:%(minute)02d",
+    regexp=r"(\d{1,2}):(\d{2})"
+), 'sqlite')
+Timestamp = db.DateTime().with_variant(sqlite.DATETIME(
+    storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d",
+    regexp=r"(\d{4})-(\d{1,2})-(\d{1,2})(?:[ T](\d{1,2}):(\d{2})(?::(\d{2}))?)?"
+), 'sqlite')
+
+def parse_date(value):
+    """'YYYY-MM-DD' (or a date) -> date. Raises ValueError on anything else."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value).strip().replace('T', ' ').split(' ')[0], '%Y-%m-%d').date()
+
+def parse_time(value):
+    """'HH:MM' (seconds ignored) -> time, None for empty. Raises ValueError otherwise."""
+    if value in (None, ''):
+        return None
+    if isinstance(value, time):
+        return value.replace(second=0, microsecond=0)
+    return datetime.strptime(':'.join(str(value).strip().split(':')[:2]), '%H:%M').time()
+
+def parse_timestamp(value):
+    """'YYYY-MM-DD HH:MM:SS', 'YYYY-MM-DDTHH:MM' or 'YYYY-MM-DD' -> datetime."""
+    if isinstance(value, datetime):
+        return value.replace(microsecond=0)
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    text = str(value).strip().replace('T', ' ')
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid timestamp: {value!r}")
+
+def shift_span(day, start_time, end_time):
+    """(starts_at, ends_at) datetimes of a shift; an end before the start runs past midnight."""
+    if day is None or start_time is None or end_time is None:
+        return None, None
+    starts_at = datetime.combine(day, start_time)
+    ends_at = datetime.combine(day, end_time)
+    if ends_at < starts_at:
+        ends_at += timedelta(days=1)
+    return starts_at, ends_at
+
+def to_cents(value):
+    """Decimal amount (number or string) -> integer minor units, rounded half up."""
+    return int((Decimal(str(value)) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+def from_cents(cents):
+    """Integer minor units -> decimal amount for the API and messages."""
+    return (cents or 0) / 100
+
+def format_amount(amount):
+    """1,234 / 1,234.5 / 12.35 for messages: thousands separator, no trailing zeros."""
+    return f"{amount:,.2f}".rstrip('0').rstrip('.')
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -47,12 +120,12 @@ class User(UserMixin, db.Model):
 class SalaryRecord(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    date = db.Column(db.String(10), nullable=False) # YYYY-MM-DD
+    date = db.Column(Date, nullable=False)
     type = db.Column(db.String(20), nullable=False) # 'shift' or 'bonus'
     
     # Shift details
-    start_time = db.Column(db.String(5)) # HH:MM
-    end_time = db.Column(db.String(5))   # HH:MM
+    start_time = db.Column(TimeHM)
+    end_time = db.Column(TimeHM)
     hours = db.Column(db.Float, default=0.0)
     rate = db.Column(db.Float, default=0.0)
     
@@ -60,13 +133,144 @@ class SalaryRecord(db.Model):
     amount = db.Column(db.Integer, default=0)
     note = db.Column(db.String(200))
 
+    # Shift span as datetimes (see shift_span), indexed for overlap checks; NULL for bonuses
+    starts_at = db.Column(Timestamp)
+    ends_at = db.Column(Timestamp)
+
+    __table_args__ = (
+        db.Index('ix_salary_record_user_date', 'user_id', 'date'),
+        db.Index('ix_salary_record_user_starts_at', 'user_id', 'starts_at'),
+    )
+
+class ShiftTemplate(db.Model):
+    """A named recurring shift (e.g. 平日早班: Mon-Fri 09:00-17:00) expanded into SalaryRecords on demand."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    name = db.Column(db.String(50), nullable=False)
+    # JSON list of integers: 0=Mon, ..., 6=Sun (same as Reminder.weekdays)
+    weekdays = db.Column(db.String(50), nullable=False, default='[]')
+    start_time = db.Column(TimeHM, nullable=False)
+    end_time = db.Column(TimeHM, nullable=False)
+    rate = db.Column(db.Float)  # None: the hourly_rate at generation time
+    note = db.Column(db.String(200))
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'name', name='uq_shift_template_user_name'),
+    )
+
+class Category(db.Model):
+    """
+    A user's expense category. Records point at it by id, so a rename is one
+    row update. The API still speaks in labels ("🍽️ 飲食"); see CategoryService.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    name = db.Column(db.String(50), nullable=False)
+    emoji = db.Column(db.String(16), nullable=False, default='')
+    color = db.Column(db.String(30))
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'name', name='uq_category_user_name'),
+    )
+
+    @hybrid_property
+    def label(self):
+        return f"{self.emoji} {self.name}" if self.emoji else self.name
+
+    @label.expression
+    def label(cls):
+        return case((cls.emoji == '', cls.name), else_=cls.emoji + ' ' + cls.name)
+
 class ExpenseRecord(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    timestamp = db.Column(db.String(20), nullable=False) # YYYY-MM-DD HH:MM:SS
-    category = db.Column(db.String(50))
+    timestamp = db.Column(Timestamp, nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), index=True)
+    category = db.relationship('Category', lazy='joined')
     note = db.Column(db.String(200))
-    amount = db.Column(db.Float, default=0.0)
+    # Money is stored as integer cents so sums are exact; `amount` is the decimal view
+    amount_cents = db.Column(db.Integer, nullable=False, default=0)
+    # Set on rows created from a RecurringExpense; unique per occurrence so reruns are no-ops
+    recurring_id = db.Column(db.Integer, db.ForeignKey('recurring_expense.id'))
+    occurrence = db.Column(Date)
+
+    @property
+    def amount(self):
+        return from_cents(self.amount_cents)
+
+    @amount.setter
+    def amount(self, value):
+        self.amount_cents = to_cents(value)
+
+    __table_args__ = (
+        db.Index('ix_expense_record_user_timestamp', 'user_id', 'timestamp'),
+        db.UniqueConstraint('recurring_id', 'occurrence', name='uq_expense_record_occurrence'),
+    )
+
+# Full-text index over expense notes and category names (rowid = expense_record.id).
+# The trigram tokenizer matches any substring of 3+ characters, which suits
+# notes without word breaks ("全家飲料") and covers prefix queries. Triggers keep
+# it in sync with every write path, including bulk Core inserts and raw SQL.
+EXPENSE_SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS expense_fts USING fts5(note, category, tokenize='trigram')",
+    """CREATE TRIGGER IF NOT EXISTS expense_fts_insert AFTER INSERT ON expense_record BEGIN
+        INSERT INTO expense_fts (rowid, note, category) VALUES (new.id, coalesce(new.note, ''),
+            coalesce((SELECT name FROM category WHERE id = new.category_id), ''));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS expense_fts_update AFTER UPDATE OF note, category_id ON expense_record BEGIN
+        UPDATE expense_fts SET note = coalesce(new.note, ''),
+            category = coalesce((SELECT name FROM category WHERE id = new.category_id), '')
+        WHERE rowid = new.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS expense_fts_delete AFTER DELETE ON expense_record BEGIN
+        DELETE FROM expense_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS expense_fts_category AFTER UPDATE OF name ON category BEGIN
+        UPDATE expense_fts SET category = new.name
+        WHERE rowid IN (SELECT id FROM expense_record WHERE category_id = new.id);
+    END""",
+)
+
+for _statement in EXPENSE_SEARCH_DDL:
+    event.listen(ExpenseRecord.__table__, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+event.listen(ExpenseRecord.__table__, 'after_drop',
+             DDL("DROP TABLE IF EXISTS expense_fts").execute_if(dialect='sqlite'))
+
+class RecurringExpense(db.Model):
+    """
+    A monthly rule from UserSettings.recurring_expenses, parsed once when settings
+    are saved. next_date is the next occurrence still to be booked, so the
+    scheduler finds due rules for every user with one indexed range query.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    rule_key = db.Column(db.String(40), nullable=False)  # the `id` of the settings entry
+    name = db.Column(db.String(100), nullable=False)
+    amount_cents = db.Column(db.Integer, nullable=False, default=0)
+    day = db.Column(db.Integer, nullable=False)  # 1-31, clamped to short months
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'))
+    next_date = db.Column(Date, nullable=False, index=True)
+    last_date = db.Column(Date)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'rule_key', name='uq_recurring_expense_user_key'),
+    )
+
+class CycleSpend(db.Model):
+    """
+    Running expense total of one billing cycle, adjusted by every expense write
+    (see BudgetService), so budget checks read one row instead of summing the
+    cycle. alerted_cents is the threshold last notified for the cycle.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    cycle_start = db.Column(Date, nullable=False)
+    total_cents = db.Column(db.Integer, nullable=False, default=0)
+    alerted_cents = db.Column(db.Integer)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'cycle_start', name='uq_cycle_spend_user_start'),
+    )
 
 class UserSettings(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -102,6 +306,9 @@ class UserSettings(db.Model):
     notification_methods = db.Column(db.Text, default='["email"]') # JSON list: ["email", "line"]
     monthly_report_day = db.Column(db.Integer, default=5) # 1-28
 
+    # Bumped whenever a frozen period snapshot is dropped, so clients refetch
+    snapshot_epoch = db.Column(db.Integer, default=0)
+
 class ReportLog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -111,6 +318,32 @@ class ReportLog(db.Model):
 
     sent_at = db.Column(db.String(20), nullable=False)      # Timestamp
 
+class PeriodSnapshot(db.Model):
+    """Frozen API payload for a period that is past the editable month range."""
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'kind', 'period_start', 'period_end', name='uq_period_snapshot'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    kind = db.Column(db.String(30), nullable=False)          # 'salary_history' or 'expense_summary'
+    period_start = db.Column(db.String(10), nullable=False)  # YYYY-MM-DD
+    period_end = db.Column(db.String(10), nullable=False)    # YYYY-MM-DD
+    payload = db.Column(db.Text, nullable=False)             # Serialized JSON response body
+    etag = db.Column(db.String(64), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class DataVersion(db.Model):
+    """Per-user, per-module write counter used to build ETags for read APIs."""
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'module', name='uq_data_version'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    module = db.Column(db.String(20), nullable=False)  # 'salary', 'expense', 'reminders', 'settings'
+    version = db.Column(db.Integer, nullable=False, default=0)
+
 class Reminder(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -138,3 +371,18 @@ class Reminder(db.Model):
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+
+class ReminderChange(db.Model):
+    """Append-only log of reminder state changes, tailed by the SSE stream in every worker."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    reminder_id = db.Column(db.Integer, nullable=False)
+    change_type = db.Column(db.String(10), nullable=False)  # 'create', 'update', 'delete'
+    is_active = db.Column(db.Boolean, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class LineWebhookEvent(db.Model):
+    """Webhook event ids already handled, so LINE redeliveries are processed once."""
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.String(64), unique=True, nullable=False)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
@@ -1,8 +1,11 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request, session, jsonify, send_file, current_app
-from werkzeug.utils import secure_filename
+from werkzeug.exceptions import RequestEntityTooLarge
 from flask_login import login_user, logout_user, login_required, current_user
-from models import db, User, SalaryRecord, ExpenseRecord, UserSettings
+from models import db, User, SalaryRecord, ExpenseRecord, UserSettings, parse_date, parse_time, parse_timestamp, shift_span
 from services.email_service import EmailService
+from services.version_service import VersionService, versioned
+from services.avatar_service import AvatarService
+from services.category_service import CategoryService
 from datetime import datetime
 import json
 import os
@@ -178,6 +181,7 @@ def settings():
             except ValueError:
                 pass
                 
+            VersionService.bump(current_user.id, 'settings')
             db.session.commit()
             flash('通知設定已更新')
             
@@ -187,11 +191,13 @@ def settings():
             code = str(random.randint(100000, 999999))
             current_user.settings.binding_code = code
             current_user.settings.binding_expiry = datetime.now() + timedelta(minutes=5)
+            VersionService.bump(current_user.id, 'settings')
             db.session.commit()
             flash(f'驗證碼已產生：{code} (5分鐘內有效)')
             
         elif action == 'unbind_line':
             current_user.settings.line_user_id = None
+            VersionService.bump(current_user.id, 'settings')
             db.session.commit()
             flash('已解除 LINE 綁定')
 
@@ -204,6 +210,7 @@ def settings():
                     flash('此 Email 已被其他帳號使用')
                 else:
                     current_user.email = email
+                    VersionService.bump(current_user.id, 'settings')
                     db.session.commit()
                     flash('Email 更新成功')
             
@@ -231,6 +238,7 @@ def settings():
 
 @auth_bp.route('/check_line_status')
 @login_required
+@versioned('settings')
 def check_line_status():
     is_linked = current_user.settings.line_user_id is not None
     return jsonify({'linked': is_linked})
@@ -327,40 +335,45 @@ def reset_data():
 def set_preset_avatar():
     preset_name = request.json.get('preset')
     if preset_name:
+        previous = current_user.avatar_val if current_user.avatar_type == 'upload' else None
         current_user.avatar_type = 'preset'
         current_user.avatar_val = preset_name
         db.session.commit()
+        AvatarService.discard(previous)
         return jsonify({'success': True})
     return jsonify({'success': False}), 400
 
 @auth_bp.route('/avatar/upload', methods=['POST'])
 @login_required
 def upload_avatar():
-    if 'avatar_file' not in request.files:
-        flash('未選擇檔案')
-        return redirect(url_for('auth.settings'))
-        
-    file = request.files['avatar_file']
-    if file.filename == '':
-        flash('未選擇檔案')
-        return redirect(url_for('auth.settings'))
-        
-    if file:
-        filename = secure_filename(f"user_{current_user.id}_{int(datetime.now().timestamp())}.png")
-        save_path = os.path.join(current_app.root_path, 'static', 'uploads', 'avatars', filename)
-        
-        # Ensure directory exists
-        os.makedirs(os.path.dirname(save_path), exist_ok=True)
-        
-        file.save(save_path)
-        
-        current_user.avatar_type = 'upload'
-        current_user.avatar_val = filename
-        db.session.commit()
-        flash('頭像上傳成功')
-        
+    # 比全域 MAX_CONTENT_LENGTH 更嚴格；超過時讀取表單會丟出 413
+    request.max_content_length = current_app.config['AVATAR_MAX_BYTES']
+    try:
+        file = request.files.get('avatar_file')
+    except RequestEntityTooLarge:
+        limit_mb = current_app.config['AVATAR_MAX_BYTES'] // (1024 * 1024)
+        return jsonify({'error': f'檔案過大 (上限 {limit_mb} MB)'}), 413
+
+    if not file or file.filename == '':
+        return jsonify({'error': '未選擇檔案'}), 400
+
+    error = AvatarService.save_upload(current_user, file)
+    if error:
+        return jsonify({'error': error}), 400
+
+    flash('頭像上傳成功')
     return redirect(url_for('auth.settings'))
 
+@auth_bp.route('/avatar/<key>/<int:size>')
+@login_required
+def avatar_image(key, size):
+    return AvatarService.send(key, size)
+
+@auth_bp.app_template_global()
+def avatar_url(user, size):
+    """URL of a user's uploaded avatar at one of AVATAR_SIZES."""
+    return url_for('auth.avatar_image', key=user.avatar_val, size=size)
+
 def migrate_legacy_data(user):
     """Migrate JSON data to SQLite for the given user"""
     try:
@@ -378,16 +391,18 @@ def migrate_legacy_data(user):
             for r in s_data.get('records', []):
                 new_record = SalaryRecord(
                     user_id=user.id,
-                    date=r['date'],
+                    date=parse_date(r['date']),
                     type=r['type'],
                     amount=r['amount'],
                     note=r.get('note')
                 )
                 if r['type'] == 'shift':
-                    new_record.start_time = r.get('start_time')
-                    new_record.end_time = r.get('end_time')
+                    new_record.start_time = parse_time(r.get('start_time'))
+                    new_record.end_time = parse_time(r.get('end_time'))
                     new_record.hours = float(r.get('hours', 0.0))
                     new_record.rate = float(r.get('rate', 0.0))
+                    new_record.starts_at, new_record.ends_at = shift_span(
+                        new_record.date, new_record.start_time, new_record.end_time)
                 
                 db.session.add(new_record)
             
@@ -405,12 +420,15 @@ def migrate_legacy_data(user):
             for r in e_data.get('records', []):
                 new_record = ExpenseRecord(
                     user_id=user.id,
-                    timestamp=r.get('timestamp'),
-                    category=r.get('category'),
+                    timestamp=parse_timestamp(r.get('timestamp')),
+                    category_id=CategoryService.resolve(user.id, r.get('category')),
                     note=r.get('note'),
                     amount=float(r.get('amount', 0.0))
                 )
                 db.session.add(new_record)
+
+            from services.budget_service import BudgetService
+            BudgetService.rebuild(user.id, user.settings.billing_cycle_start_day)
                 
         db.session.commit()
         print("Migration completed successfully.")
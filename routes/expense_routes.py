@@ -1,8 +1,13 @@
 from flask import Blueprint, render_template, request, jsonify
-from flask_login import login_required
+from flask_login import login_required, current_user
 from datetime import datetime
 
 from services.expense_service import ExpenseService
+from services.snapshot_service import SnapshotService
+from services.version_service import versioned
+from services.category_service import CategoryService
+from services.suggest_service import SuggestService
+from models import format_amount
 
 expense_bp = Blueprint('expense', __name__, url_prefix='/expense')
 expense_service = ExpenseService()
@@ -35,6 +40,7 @@ def settings():
 
 @expense_bp.route('/api/records/grouped', methods=['GET'])
 @login_required
+@versioned('expense')
 def get_grouped_records():
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
@@ -42,11 +48,22 @@ def get_grouped_records():
     if not start_date or not end_date:
         start_date, end_date = expense_service.get_current_period()
         
-    summary = expense_service.get_grouped_summary(start_date, end_date)
+    try:
+        summary = expense_service.get_grouped_summary(start_date, end_date)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     return jsonify(summary)
 
+@expense_bp.route('/api/bootstrap', methods=['GET'])
+@login_required
+@versioned('expense', 'settings')
+def get_bootstrap():
+    # 首頁一次取得設定與資料: view=today 為本日紀錄 + 週期總額, 其餘為本週期分組摘要
+    return jsonify(expense_service.get_dashboard(request.args.get('view', 'period')))
+
 @expense_bp.route('/api/records', methods=['GET'])
 @login_required
+@versioned('expense')
 def get_records():
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
@@ -54,9 +71,50 @@ def get_records():
     if not start_date or not end_date:
         start_date, end_date = expense_service.get_current_period()
         
-    summary = expense_service.get_summary(start_date, end_date)
+    # Closed periods are frozen and served with long-lived caching
+    try:
+        snapshot = SnapshotService.get_or_freeze(
+            current_user, 'expense_summary', start_date, end_date,
+            lambda: expense_service.get_summary(start_date, end_date)
+        )
+        if snapshot:
+            return SnapshotService.make_response(snapshot, request)
+
+        summary = expense_service.get_summary(start_date, end_date)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     return jsonify(summary)
 
+@expense_bp.route('/api/search', methods=['GET'])
+@login_required
+@versioned('expense')
+def search_records():
+    # 全文搜尋備註與類別: q 以空白分隔多個關鍵字 (皆須符合), 可加 start_date / end_date 限定區間
+    # 下一頁: 將回應中的 next (before_id / offset / before_ts) 原樣帶回
+    try:
+        result = expense_service.search(
+            request.args.get('q', ''),
+            request.args.get('start_date'),
+            request.args.get('end_date'),
+            request.args.get('limit'),
+            {key: request.args.get(key) for key in ('before_id', 'offset', 'before_ts')}
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result)
+
+@expense_bp.route('/api/suggestions', methods=['GET'])
+@login_required
+@versioned('expense')
+def get_suggestions():
+    # 依輸入前綴建議常用項目 (含慣用類別與金額), 依使用頻率與最近使用時間排序
+    try:
+        limit = int(request.args.get('limit', 8))
+    except ValueError:
+        return jsonify({"error": "Invalid limit"}), 400
+    suggestions = SuggestService.suggest(current_user.id, request.args.get('q', ''), limit)
+    return jsonify({"suggestions": suggestions})
+
 @expense_bp.route('/api/records', methods=['POST'])
 @login_required
 def add_record():
@@ -64,21 +122,11 @@ def add_record():
     if not data or 'amount' not in data:
         return jsonify({"error": "Missing data"}), 400
     
-    # Default category emoji mapping help
-    categories = {
-        "飲食": "🍽️ 飲食",
-        "衣著": "👕 衣著",
-        "居住": "🏠 居住",
-        "交通": "🚌 交通",
-        "教育": "📖 教育",
-        "娛樂": "🎮 娛樂",
-        "其他": "📦 其他"
-    }
-    
-    if data.get('category') in categories:
-        data['category'] = categories[data['category']]
-    
-    record = expense_service.add_record(data)
+    # 類別名稱 (如 "飲食") 由 CategoryService 對應到使用者的類別
+    try:
+        record = expense_service.add_record(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     return jsonify(record), 201
 
 @expense_bp.route('/api/records/<record_id>', methods=['PUT', 'DELETE'])
@@ -90,19 +138,24 @@ def handle_record(record_id):
         return jsonify({"error": "Not found"}), 404
     
     data = request.json
-    record = expense_service.update_record(record_id, data)
+    try:
+        record = expense_service.update_record(record_id, data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     if record:
         return jsonify(record)
     return jsonify({"error": "Not found"}), 404
 
 @expense_bp.route('/api/history/periods')
 @login_required
+@versioned('expense')
 def get_periods():
     periods = expense_service.get_monthly_periods()
     return jsonify(periods)
 
 @expense_bp.route('/api/settings', methods=['GET', 'POST'])
 @login_required
+@versioned('settings')
 def handle_settings():
     if request.method == 'POST':
         data = request.json
@@ -143,8 +196,7 @@ def export_records():
         # Calculate category stats for the email
         category_stats = {}
         for r in records:
-            cat = r.get('category', '其他')
-            cat_name = cat.split(' ')[1] if ' ' in cat else cat
+            cat_name = CategoryService.parse_label(r.get('category') or '其他')[1]
             category_stats[cat_name] = category_stats.get(cat_name, 0) + r['amount']
             
         # Simplified top 5 categories
@@ -157,7 +209,7 @@ def export_records():
                 template='email/expense_export.html',
                 username=current_user.username,
                 period=f"{start_date} ~ {end_date}",
-                total_amount=f"${summary_data.get('total_amount', 0):,}",
+                total_amount=f"${format_amount(summary_data.get('total_amount', 0))}",
                 records=records,
                 top_categories=top_categories
             )
@@ -172,7 +224,7 @@ def export_records():
         msg = (
             f"📉 [記帳匯出通知]\n"
             f"期間: {start_date} ~ {end_date}\n"
-            f"總支出: ${total:,}\n"
+            f"總支出: ${format_amount(total)}\n"
             f"匯出時間: {datetime.now().strftime('%Y/%m/%d %H:%M')}\n"
             f"------------------\n"
         )
@@ -181,8 +233,9 @@ def export_records():
         records = summary_data.get('records', [])
         detail_lines = []
         for r in records:
-            cat = r.get('category', '其他').split(' ')[0] # Get emoji or just first part
-            detail_lines.append(f"{r['timestamp'][5:16]} {cat} ${int(r['amount'])}")
+            emoji, name = CategoryService.parse_label(r.get('category') or '其他')
+            cat = emoji or name
+            detail_lines.append(f"{r['timestamp'][5:16]} {cat} ${format_amount(r['amount'])}")
             
         msg += "\n".join(detail_lines)
             
@@ -206,6 +259,7 @@ def export_records():
 
 @expense_bp.route('/api/expense-trend')
 @login_required
+@versioned('expense', 'settings')
 def get_expense_trend():
     """
     回傳所有歷史帳單週期的支出趨勢
@@ -215,7 +269,7 @@ def get_expense_trend():
     from dateutil.relativedelta import relativedelta
     from sqlalchemy import func
     from models import db, ExpenseRecord
-    from flask_login import current_user
+    import json
     
     settings = expense_service.get_settings()
     start_day = settings.get('billing_cycle_start_day', 10)
@@ -228,7 +282,7 @@ def get_expense_trend():
         return jsonify({"labels": [], "period_details": [], "data": [], "total_cycles": 0})
     
     # 從第一筆記錄的帳單週期開始
-    first_date = datetime.strptime(first_record[:10], '%Y-%m-%d')
+    first_date = first_record.replace(hour=0, minute=0, second=0)
     
     # 找到第一個週期的開始日
     if first_date.day >= start_day:
@@ -253,8 +307,15 @@ def get_expense_trend():
         next_cycle = current + relativedelta(months=1)
         period_end = (next_cycle - timedelta(days=1)).strftime('%Y-%m-%d')
         
-        # 查詢該週期支出
-        summary = expense_service.get_summary(period_start, period_end, current_user)
+        # 查詢該週期支出 (已關帳週期直接讀取快照)
+        snapshot = SnapshotService.get_or_freeze(
+            current_user, 'expense_summary', period_start, period_end,
+            lambda: expense_service.get_summary(period_start, period_end, current_user)
+        )
+        if snapshot:
+            summary = json.loads(snapshot.payload)
+        else:
+            summary = expense_service.get_summary(period_start, period_end, current_user)
         total = summary.get('total_amount', 0)
         
         labels.append(f"{current.strftime('%Y-%m')} 週期")
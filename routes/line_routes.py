@@ -1,8 +1,6 @@
 from flask import Blueprint, request, abort, current_app
-from linebot import LineBotApi, WebhookHandler
-from linebot.exceptions import InvalidSignatureError
-from linebot.models import MessageEvent, TextMessage, TextSendMessage
 from services.line_service import LineService
+from services.version_service import VersionService
 from models import db, UserSettings
 import os
 from datetime import datetime
@@ -16,19 +14,21 @@ def callback():
 
     # get request body as text
     body = request.get_data(as_text=True)
-    current_app.logger.info("Request body: " + body)
+    current_app.logger.debug(f"LINE webhook: {len(body)} bytes")
 
-    handler = LineService.get_handler()
-    if not handler:
+    if not LineService.get_handler():
         return 'Not Configured', 200
 
-    # handle webhook body
+    from linebot.exceptions import InvalidSignatureError
+
+    # Verify inline, handle in the background: LINE expects a fast 200
     try:
-        handler.handle(body, signature)
+        events = LineService.parse_webhook(body, signature)
     except InvalidSignatureError:
         print("Invalid signature. Please check your channel access token/channel secret.")
         abort(400)
 
+    LineService.enqueue_events(current_app._get_current_object(), events)
     return 'OK'
 
 # Register Handler Logic separately to avoid circular import issues if possible,
@@ -37,6 +37,7 @@ def callback():
 
 def register_line_handlers(handler):
     if not handler: return
+    from linebot.models import MessageEvent, TextMessage
 
     @handler.add(MessageEvent, message=TextMessage)
     def handle_message(event):
@@ -54,18 +55,19 @@ def register_line_handlers(handler):
                     setting.line_user_id = user_id
                     setting.binding_code = None # Clear code
                     setting.binding_expiry = None
+                    VersionService.bump(setting.user_id, 'settings')
                     db.session.commit()
                     
-                    LineService.push_message(user_id, "✅ 綁定成功！\n您現在可以接收工具箱的通知報告了。")
+                    LineService.respond(event, "✅ 綁定成功！\n您現在可以接收工具箱的通知報告了。")
                 else:
-                    LineService.push_message(user_id, "❌ 驗證碼已過期，請重新產生。")
+                    LineService.respond(event, "❌ 驗證碼已過期，請重新產生。")
             else:
-                LineService.push_message(user_id, "❌ 找不到此驗證碼，請確認輸入正確。")
+                LineService.respond(event, "❌ 找不到此驗證碼，請確認輸入正確。")
         
         elif msg == "查詢":
-             LineService.push_message(user_id, f"您的 LINE User ID: {user_id}")
+             LineService.respond(event, f"您的 LINE User ID: {user_id}")
         else:
-             LineService.push_message(user_id, "🤖 我是工具箱小幫手。\n請輸入 6 位數驗證碼進行綁定。")
+             LineService.respond(event, "🤖 我是工具箱小幫手。\n請輸入 6 位數驗證碼進行綁定。")
 
 # Hacky way to register handlers on import or first request?
 # Better: In app factory, call a setup function.
@@ -1,8 +1,13 @@
-from flask import Blueprint, render_template, request, jsonify, url_for, flash, redirect
+from flask import Blueprint, render_template, request, jsonify, url_for, flash, redirect, Response, current_app
 from flask_login import login_required, current_user
 from services.reminder_service import ReminderService
+from services.version_service import versioned
+from services.event_service import ReminderEventBus
 from models import Reminder
 from datetime import datetime
+import json
+import queue
+import time
 
 reminder_bp = Blueprint('reminder', __name__)
 
@@ -48,6 +53,7 @@ def toggle_reminder(id):
 
 @reminder_bp.route('/api/list')
 @login_required
+@versioned('reminders')
 def list_reminders():
     """API to get current state of reminders for polling."""
     reminders = ReminderService.get_user_reminders(current_user.id)
@@ -58,3 +64,53 @@ def list_reminders():
             'is_active': r.is_active
         })
     return jsonify({'success': True, 'reminders': data})
+
+@reminder_bp.route('/api/stream')
+@login_required
+def stream_reminders():
+    """Server-sent events: pushes reminder state changes instead of polling /api/list."""
+    user_id = current_user.id
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID', 0))
+    except ValueError:
+        last_event_id = 0
+
+    events = ReminderEventBus.subscribe(current_app._get_current_object(), user_id)
+    if events is None:
+        # 串流已滿: 回 503 讓前端改用 /api/list 輪詢
+        return Response('Too many open streams', status=503, headers={'Retry-After': '60'})
+
+    try:
+        if last_event_id:
+            missed = ReminderEventBus.replay(user_id, last_event_id)
+        else:
+            # Hand the client a resume point up front, so a reconnect before any event still replays
+            missed, last_event_id = [], ReminderEventBus.latest_id(user_id)
+    except Exception:
+        ReminderEventBus.unsubscribe(user_id, events)
+        raise
+    deadline = time.monotonic() + ReminderEventBus.STREAM_LIFETIME
+
+    def generate():
+        yield f'retry: 5000\nid: {last_event_id}\n\n'
+        for event in missed:
+            yield f"id: {event['id']}\ndata: {json.dumps(event)}\n\n"
+        # Ends after STREAM_LIFETIME to free the thread; EventSource reconnects with Last-Event-ID
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                event = events.get(timeout=min(15, remaining))
+            except queue.Empty:
+                # Comment line keeps proxies from closing an idle stream
+                yield ': keep-alive\n\n'
+                continue
+            yield f"id: {event['id']}\ndata: {json.dumps(event)}\n\n"
+
+    # No stream_with_context: the generator must not pin a request context or DB session
+    response = Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # Runs when the server closes the response, even if the stream never started
+    response.call_on_close(lambda: ReminderEventBus.unsubscribe(user_id, events))
+    return response
@@ -1,6 +1,8 @@
 from flask import Blueprint, render_template, request, jsonify, Response
 from flask_login import login_required, current_user
 from services.salary_service import SalaryService
+from services.snapshot_service import SnapshotService
+from services.version_service import versioned
 
 from datetime import datetime, timedelta
 
@@ -44,12 +46,16 @@ def settings():
 
 @salary_bp.route('/api/records', methods=['GET'])
 @login_required
+@versioned('salary')
 def get_records():
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
     
     if start_date and end_date:
-        records = service.get_records_by_range(start_date, end_date)
+        try:
+            records = service.get_records_by_range(start_date, end_date)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
     else:
         records = service.get_all_records()
         
@@ -86,13 +92,41 @@ def delete_record(record_id):
 
 @salary_bp.route('/api/stats', methods=['GET'])
 @login_required
+@versioned('salary', 'settings')
 def get_stats():
+    # month=YYYY-MM 或 start_date + end_date: 整段區間的每日/每週統計與目標進度
+    # 只給 start_date 時維持原本的單週摘要
     start_date = request.args.get('start_date')
-    summary = service.calculate_weekly_summary(start_date)
+    end_date = request.args.get('end_date')
+    month = request.args.get('month')
+    try:
+        if month:
+            first = datetime.strptime(month, '%Y-%m').date()
+            last = (first + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+            return jsonify(service.get_range_stats(first, last))
+        if start_date and end_date:
+            return jsonify(service.get_range_stats(start_date, end_date))
+        if not start_date:
+            return jsonify({'error': 'Missing start_date or month'}), 400
+        summary = service.calculate_weekly_summary(start_date)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     return jsonify(summary)
 
+@salary_bp.route('/api/bootstrap', methods=['GET'])
+@login_required
+@versioned('salary', 'settings')
+def get_bootstrap():
+    # 週班表首頁一次取得: 設定、本週紀錄與統計、當月目標進度
+    try:
+        data = service.get_dashboard(request.args.get('start_date'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(data)
+
 @salary_bp.route('/api/settings', methods=['GET', 'POST'])
 @login_required
+@versioned('settings')
 def handle_settings():
     if request.method == 'POST':
         data = request.json
@@ -100,6 +134,17 @@ def handle_settings():
         return jsonify(updated)
     return jsonify(service.get_settings())
 
+@salary_bp.route('/api/conflicts', methods=['GET'])
+@login_required
+@versioned('salary')
+def get_conflicts():
+    # 列出區間內時間重疊的排班 (未指定日期則檢查全部)
+    try:
+        conflicts = service.find_conflicts(request.args.get('start_date'), request.args.get('end_date'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(conflicts)
+
 @salary_bp.route('/api/actions/copy_week', methods=['POST'])
 @login_required
 def copy_week():
@@ -110,6 +155,33 @@ def copy_week():
     count = service.copy_week_records(target_date)
     return jsonify({'count': count})
 
+@salary_bp.route('/api/actions/copy_range', methods=['POST'])
+@login_required
+def copy_range():
+    # 將 source_start ~ source_end 的班表複製到 target_start 起, 連續 repeat 次 (如本週 -> 後 8 週)
+    data = request.json or {}
+    if not all(data.get(k) for k in ('source_start', 'source_end', 'target_start')):
+        return jsonify({'error': 'Missing source/target dates'}), 400
+
+    try:
+        count = service.copy_records(data['source_start'], data['source_end'],
+                                     data['target_start'], data.get('repeat', 1))
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'count': count})
+
+@salary_bp.route('/api/actions/recalculate', methods=['POST'])
+@login_required
+def recalculate():
+    # 以時薪重算區間內所有排班 (預設: 可編輯期間, 目前時薪); dry_run 只回傳差異
+    data = request.json or {}
+    try:
+        summary = service.recalculate_rates(data.get('start_date'), data.get('end_date'),
+                                            data.get('rate'), bool(data.get('dry_run')))
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(summary)
+
 @salary_bp.route('/api/actions/clear_week', methods=['POST'])
 @login_required
 def clear_week():
@@ -120,6 +192,53 @@ def clear_week():
     count = service.clear_week_records(week_start)
     return jsonify({'count': count})
 
+# ================= 班表範本 =================
+
+@salary_bp.route('/api/templates', methods=['GET'])
+@login_required
+@versioned('settings')
+def get_templates():
+    return jsonify(service.get_templates())
+
+@salary_bp.route('/api/templates', methods=['POST'])
+@login_required
+def create_template():
+    try:
+        template = service.save_template(request.json or {})
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(template), 201
+
+@salary_bp.route('/api/templates/<int:template_id>', methods=['PUT', 'DELETE'])
+@login_required
+def handle_template(template_id):
+    if request.method == 'DELETE':
+        if service.delete_template(template_id):
+            return jsonify({'success': True})
+        return jsonify({'error': 'Template not found'}), 404
+
+    try:
+        template = service.save_template(request.json or {}, template_id)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    if template:
+        return jsonify(template)
+    return jsonify({'error': 'Template not found'}), 404
+
+@salary_bp.route('/api/templates/generate', methods=['POST'])
+@login_required
+def generate_from_templates():
+    # 依範本在 start_date ~ end_date 產生排班, 已有排班的日期會略過
+    data = request.json or {}
+    if not data.get('start_date') or not data.get('end_date'):
+        return jsonify({'error': 'Missing start_date/end_date'}), 400
+
+    try:
+        result = service.generate_from_templates(data.get('template_ids'), data['start_date'], data['end_date'])
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(result)
+
 @salary_bp.route('/api/export', methods=['GET'])
 @login_required
 def export_csv():
@@ -212,12 +331,14 @@ def export_csv():
 
 @salary_bp.route('/api/history/periods', methods=['GET'])
 @login_required
+@versioned('salary')
 def get_history_periods():
     periods = service.get_monthly_periods()
     return jsonify(periods)
 
 @salary_bp.route('/api/history/data', methods=['GET'])
 @login_required
+@versioned('salary')
 def get_history_data():
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
@@ -225,11 +346,23 @@ def get_history_data():
     if not start_date or not end_date:
         return jsonify({'error': 'Missing dates'}), 400
         
-    data = service.get_history_summary(start_date, end_date)
+    # Closed months are frozen and served with long-lived caching
+    try:
+        snapshot = SnapshotService.get_or_freeze(
+            current_user, 'salary_history', start_date, end_date,
+            lambda: service.get_history_summary(start_date, end_date)
+        )
+        if snapshot:
+            return SnapshotService.make_response(snapshot, request)
+
+        data = service.get_history_summary(start_date, end_date)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     return jsonify(data)
 
 @salary_bp.route('/api/income-trend')
 @login_required
+@versioned('salary')
 def get_income_trend():
     """
     回傳所有歷史月份的薪資收入趨勢
@@ -239,6 +372,7 @@ def get_income_trend():
     from dateutil.relativedelta import relativedelta
     from sqlalchemy import func
     from models import db, SalaryRecord
+    import json
     
     # 找出第一筆記錄的日期
     first_record = db.session.query(func.min(SalaryRecord.date))\
@@ -248,7 +382,7 @@ def get_income_trend():
         return jsonify({"labels": [], "data": [], "total_months": 0})
     
     # 從第一筆記錄的月份開始
-    first_date = datetime.strptime(first_record, '%Y-%m-%d')
+    first_date = datetime.combine(first_record, datetime.min.time())
     start_month = first_date.replace(day=1)
     
     # 到當前月份
@@ -270,8 +404,15 @@ def get_income_trend():
         
         month_end = (next_month - timedelta(days=1)).strftime('%Y-%m-%d')
         
-        # 查詢該月總收入
-        summary = service.get_history_summary(month_start, month_end)
+        # 查詢該月總收入 (已關帳月份直接讀取快照)
+        snapshot = SnapshotService.get_or_freeze(
+            current_user, 'salary_history', month_start, month_end,
+            lambda: service.get_history_summary(month_start, month_end)
+        )
+        if snapshot:
+            summary = json.loads(snapshot.payload)
+        else:
+            summary = service.get_history_summary(month_start, month_end)
         total = summary.get('total_amount', 0)
         
         labels.append(current.strftime('%Y-%m'))
@@ -1,6 +1,7 @@
 from flask import jsonify, request
 from flask_login import login_required, current_user
 from models import db, User
+from services.version_service import VersionService
 import json
 import re
 
@@ -22,6 +23,7 @@ def register_settings_api(auth_bp):
             return jsonify({'error': '此 Email 已被其他帳號使用'}), 400
             
         current_user.email = email
+        VersionService.bump(current_user.id, 'settings')
         db.session.commit()
         return jsonify({'success': True})
     
@@ -42,6 +44,7 @@ def register_settings_api(auth_bp):
             
         current_user.settings.notification_methods = json.dumps(methods)
         current_user.settings.monthly_report_day = report_day
+        VersionService.bump(current_user.id, 'settings')
         db.session.commit()
         
         return jsonify({'success': True})
@@ -0,0 +1,108 @@
+"""
+Dashboard bootstrap benchmark: the request chains the salary / expense pages
+used to make before first render vs the single /api/bootstrap call, served
+through the real app against an in-memory database. Chained requests run one
+after another in the browser, so each also pays a network round trip (--rtt).
+
+Usage: python scripts/bench_bootstrap.py [--records 2000] [--repeat 50] [--rtt 50]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from datetime import time as clock
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('SCHEDULER_IN_WEB', '0')
+
+from app import create_app
+from config import Config
+from models import db, User, UserSettings, Category, SalaryRecord, ExpenseRecord, shift_span
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SCHEDULER_IN_WEB = False
+
+def seed(app, n):
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        db.session.add(UserSettings(user_id=user.id, target_income=40000))
+        category = Category(user_id=user.id, name='飲食', emoji='🍽️')
+
+        now = datetime.now()
+        for i in range(n):
+            t = (now - timedelta(minutes=53 * i)).replace(microsecond=0)
+            db.session.add(ExpenseRecord(user_id=user.id, timestamp=t, category=category,
+                                         note=f'午餐 #{i}', amount=float(50 + i % 450)))
+        for i in range(n // 4):
+            day = now.date() - timedelta(days=i)
+            starts_at, ends_at = shift_span(day, clock(9, 0), clock(17, 0))
+            db.session.add(SalaryRecord(user_id=user.id, date=day, type='shift',
+                                        start_time=clock(9, 0), end_time=clock(17, 0), hours=8.0, rate=190.0,
+                                        amount=1520.0, note='', starts_at=starts_at, ends_at=ends_at))
+        db.session.commit()
+        return user.id
+
+def chains():
+    """Request chains per page before and after, mirroring salary.js / expense.js init."""
+    today = datetime.now().date()
+    monday = today - timedelta(days=today.weekday())
+    sunday = monday + timedelta(days=6)
+    month_start = monday.replace(day=1)
+    month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    cycle_start = today.replace(day=10) if today.day >= 10 else \
+        (today.replace(day=1) - timedelta(days=1)).replace(day=10)
+    cycle_end = (cycle_start + timedelta(days=32)).replace(day=9)
+    tomorrow = today + timedelta(days=1)
+    return [
+        ('/salary/', [
+            '/salary/api/settings',
+            f'/salary/api/records?start_date={monday}&end_date={sunday}',
+            f'/salary/api/records?start_date={month_start}&end_date={month_end}',
+        ], [f'/salary/api/bootstrap?start_date={monday}']),
+        ('/expense/', [
+            '/expense/api/settings',
+            f'/expense/api/records/grouped?start_date={cycle_start}&end_date={cycle_end}',
+        ], ['/expense/api/bootstrap']),
+        ('/expense/today', [
+            '/expense/api/settings',
+            f'/expense/api/records?start_date={today}&end_date={tomorrow}',
+            f'/expense/api/records?start_date={cycle_start}&end_date={cycle_end}',
+        ], ['/expense/api/bootstrap?view=today']),
+    ]
+
+def run_chain(client, urls, repeat):
+    """Mean server time in ms for one pass through the chain."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for url in urls:
+            response = client.get(url)
+            assert response.status_code == 200, (url, response.status_code)
+            response.close()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--records', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--rtt', type=float, default=50.0, help='network round trip per request, ms')
+    args = parser.parse_args()
+
+    app = create_app(BenchConfig)
+    user_id = seed(app, args.records)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+
+    print(f"{'page':16s}{'requests':>10s}{'server ms':>12s}{'first render ms':>18s}")
+    for page, before, after in chains():
+        for label, urls in (('before', before), ('bootstrap', after)):
+            server = run_chain(client, urls, args.repeat)
+            print(f"{page if label == 'before' else '':16s}{len(urls):>10d}{server:12.2f}"
+                  f"{server + len(urls) * args.rtt:18.2f}  {label}")
+
+if __name__ == '__main__':
+    main()
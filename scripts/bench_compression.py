@@ -0,0 +1,93 @@
+"""
+Compression benchmark: bytes on the wire for typical pages, their static assets
+and record APIs with no encoding, gzip and (when installed) Brotli, served
+through the real app against an in-memory database.
+
+Usage: python scripts/bench_compression.py [--records 1000]
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, time, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('SCHEDULER_IN_WEB', '0')
+
+from app import create_app
+from config import Config
+from extensions import brotli
+from models import db, User, UserSettings, Category, SalaryRecord, ExpenseRecord
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SCHEDULER_IN_WEB = False
+
+PAGES = [
+    '/salary/', '/expense/', '/auth/settings', '/reminders/',
+    '/static/js/expense.js', '/static/js/salary.js',
+    '/static/css/style.css', '/static/css/expense.css',
+]
+
+def seed(app, n):
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        db.session.add(UserSettings(user_id=user.id))
+        category = Category(user_id=user.id, name='飲食', emoji='🍽️')
+
+        ts = datetime.now() - timedelta(days=30)
+        for i in range(n):
+            t = ts + timedelta(minutes=37 * i)
+            db.session.add(ExpenseRecord(user_id=user.id, timestamp=t.replace(microsecond=0),
+                                         category=category, note=f'午餐 #{i}', amount=float(50 + i % 450)))
+            db.session.add(SalaryRecord(user_id=user.id, date=t.date(), type='hourly',
+                                        start_time=time(9, 0), end_time=time(17, 0), hours=8.0, rate=190.0,
+                                        amount=1520.0, note=''))
+        db.session.commit()
+        return user.id
+
+def fetch(client, url, encoding):
+    response = client.get(url, headers={'Accept-Encoding': encoding})
+    size = len(response.get_data())
+    response.close()
+    return response.status_code, size
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--records', type=int, default=1000)
+    args = parser.parse_args()
+
+    app = create_app(BenchConfig)
+    user_id = seed(app, args.records)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+
+    today = datetime.now()
+    start = (today - timedelta(days=60)).strftime('%Y-%m-%d')
+    end = (today + timedelta(days=1)).strftime('%Y-%m-%d')
+    urls = PAGES + [
+        f'/expense/api/records?start_date={start}&end_date={end}',
+        f'/salary/api/records?start_date={start}&end_date={end}',
+    ]
+
+    encodings = ['identity', 'gzip'] + (['br'] if brotli else [])
+    print(f"{'url':55s}" + ''.join(f"{e:>12s}" for e in encodings) + f"{'saved':>9s}")
+    totals = dict.fromkeys(encodings, 0)
+    for url in urls:
+        sizes = {}
+        for encoding in encodings:
+            status, sizes[encoding] = fetch(client, url, encoding)
+            totals[encoding] += sizes[encoding]
+        best = min(sizes.values())
+        saved = 1 - best / sizes['identity'] if sizes['identity'] else 0
+        label = url if status == 200 else f"{url} ({status})"
+        print(f"{label[:55]:55s}" + ''.join(f"{sizes[e]:12,d}" for e in encodings) + f"{saved:9.0%}")
+
+    best = min(totals.values())
+    print(f"{'total':55s}" + ''.join(f"{totals[e]:12,d}" for e in encodings)
+          + f"{1 - best / totals['identity']:9.0%}")
+
+if __name__ == '__main__':
+    main()
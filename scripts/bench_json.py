@@ -0,0 +1,65 @@
+"""
+JSON serialization benchmark: a 10k-record /expense/api/records style response
+through Flask's stdlib provider vs FastJSONProvider (orjson when installed).
+
+Usage: python scripts/bench_json.py [--records 10000] [--repeat 20]
+"""
+import argparse
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from extensions import FastJSONProvider, orjson
+
+def build_payload(n):
+    start = datetime(2024, 1, 1, 8, 0, 0)
+    categories = ['🍽️ 飲食', '🚌 交通', '🏠 居住', '🎮 娛樂', '📦 其他']
+    records = []
+    for i in range(n):
+        ts = start + timedelta(minutes=37 * i)
+        records.append({
+            'id': i + 1,
+            'timestamp': ts.strftime('%Y-%m-%d %H:%M:%S'),
+            'category': categories[i % len(categories)],
+            'note': f'午餐 便當 #{i}',
+            'amount': float(50 + i % 450),
+            'created_at': ts,  # datetime, as on Reminder / UserSettings
+        })
+    return {
+        'records': records,
+        'total_amount': sum(r['amount'] for r in records),
+        'category_split': {c: 0 for c in categories},
+        'period': {'start': '2024-01-01', 'end': '2024-12-31'},
+    }
+
+def bench(provider_class, payload, repeat):
+    app = Flask(__name__)
+    app.json = provider_class(app)
+    with app.app_context():
+        body = app.json.response(payload).get_data()
+        best = min(timeit.repeat(lambda: app.json.response(payload), number=1, repeat=repeat))
+    return best, len(body)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--records', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    payload = build_payload(args.records)
+    print(f"{args.records} records, best of {args.repeat}")
+
+    base, base_size = bench(DefaultJSONProvider, payload, args.repeat)
+    print(f"  DefaultJSONProvider (stdlib): {base * 1000:8.2f} ms  {base_size / 1024:8.1f} KiB")
+
+    fast, fast_size = bench(FastJSONProvider, payload, args.repeat)
+    engine = 'orjson' if orjson else 'stdlib fallback'
+    print(f"  FastJSONProvider ({engine}): {fast * 1000:8.2f} ms  {fast_size / 1024:8.1f} KiB")
+    print(f"  speedup: {base / fast:.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Row serialization benchmark: list N salary and expense records through the old
+ORM path (hydrate model instances, then _to_dict) vs the lean column-tuple path
+now used by SalaryService / ExpenseService, on an in-memory SQLite database.
+
+Usage: python scripts/bench_row_serialization.py [--rows 50000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import timeit
+import tracemalloc
+from datetime import date, datetime, time, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from models import db, User, Category, SalaryRecord, ExpenseRecord
+from services.salary_service import SalaryService
+from services.expense_service import ExpenseService
+
+def build_app(n):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        uid = user.id
+        category = Category(user_id=uid, name='飲食', emoji='🍽️')
+        db.session.add(category)
+        db.session.commit()
+        category_id = category.id
+
+        day = date(2020, 1, 1)
+        ts = datetime(2020, 1, 1, 8, 0, 0)
+        salary, expense = [], []
+        for i in range(n):
+            salary.append({
+                'user_id': uid, 'date': day + timedelta(days=i // 3),
+                'type': 'hourly', 'start_time': time(9, 0), 'end_time': time(17, 0),
+                'hours': 8.0, 'rate': 190.0, 'amount': 1520.0, 'note': f'shift {i}'
+            })
+            expense.append({
+                'user_id': uid, 'timestamp': ts + timedelta(minutes=37 * i),
+                'category_id': category_id, 'note': f'午餐 #{i}', 'amount_cents': (50 + i % 450) * 100 + i % 100
+            })
+        db.session.bulk_insert_mappings(SalaryRecord, salary)
+        db.session.bulk_insert_mappings(ExpenseRecord, expense)
+        db.session.commit()
+    return app, uid
+
+def orm_salary(service, user_id):
+    records = SalaryRecord.query.filter_by(user_id=user_id).order_by(SalaryRecord.date.asc()).all()
+    return [service._to_dict(r) for r in records]
+
+def lean_salary(service, user_id):
+    rows = SalaryRecord.query.with_entities(*service._LIST_COLUMNS)\
+        .filter_by(user_id=user_id).order_by(SalaryRecord.date.asc()).all()
+    return service._rows_to_dicts(rows)
+
+def orm_expense(service, user_id):
+    records = ExpenseRecord.query.filter_by(user_id=user_id).order_by(ExpenseRecord.timestamp.desc()).all()
+    return [service._to_dict(r) for r in records]
+
+def lean_expense(service, user_id):
+    rows = ExpenseRecord.query.with_entities(*service._LIST_COLUMNS)\
+        .outerjoin(Category, ExpenseRecord.category_id == Category.id)\
+        .filter(ExpenseRecord.user_id == user_id).order_by(ExpenseRecord.timestamp.desc()).all()
+    return [dict(zip(service._LIST_FIELDS, row)) for row in rows]
+
+def measure(fn, repeat):
+    def run():
+        fn()
+        db.session.remove()  # fresh identity map each run, like a new request
+    best = min(timeit.repeat(run, number=1, repeat=repeat))
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    db.session.remove()
+    return best, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app, user_id = build_app(args.rows)
+    salary, expense = SalaryService(), ExpenseService()
+    cases = [
+        ('salary', lambda: orm_salary(salary, user_id), lambda: lean_salary(salary, user_id)),
+        ('expense', lambda: orm_expense(expense, user_id), lambda: lean_expense(expense, user_id)),
+    ]
+
+    print(f"{args.rows} rows per table, best of {args.repeat}")
+    with app.app_context():
+        for name, orm_fn, lean_fn in cases:
+            assert orm_fn() == lean_fn(), f"{name}: lean path differs from ORM path"
+            db.session.remove()
+            orm_time, orm_peak = measure(orm_fn, args.repeat)
+            lean_time, lean_peak = measure(lean_fn, args.repeat)
+            print(f"  {name:8s} ORM : {orm_time * 1000:8.1f} ms  peak {orm_peak / 2**20:7.1f} MiB")
+            print(f"  {name:8s} lean: {lean_time * 1000:8.1f} ms  peak {lean_peak / 2**20:7.1f} MiB"
+                  f"  ({orm_time / lean_time:.1f}x faster)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Expense search benchmark: /expense/api/search (FTS5 trigram index) vs the
+LIKE '%term%' scan it replaces, over a large single-user table on a temporary
+on-disk database.
+
+Usage: python scripts/bench_search.py [--rows 1000000] [--repeat 20]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('SCHEDULER_IN_WEB', '0')
+
+from sqlalchemy import insert, text
+from app import create_app
+from config import Config
+from models import db, User, UserSettings, Category, ExpenseRecord
+
+NOTES = ['早餐 蛋餅', '午餐 便當', '晚餐 拉麵', '全家飲料', '捷運 悠遊卡', '7-11 咖啡',
+         'Starbucks latte', 'Uber 車資', '電影票', '房租', '超市 買菜', '書店 雜誌']
+CATEGORIES = ['飲食', '交通', '娛樂', '居住', '其他']
+BATCH = 50000
+
+QUERIES = [
+    ('rare term', '牛排館'),
+    ('common term', '電影票'),
+    ('latin prefix', 'starb*'),
+    ('two terms', '7-11 咖啡'),
+    ('old month range', '電影票', '2020-03-01', '2020-04-01'),
+    ('no match', 'zzz-none'),
+    ('short, common', '交通'),
+    ('short, rare', '聚餐'),
+]
+
+def seed(app, n):
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        db.session.add(UserSettings(user_id=user.id))
+        categories = [Category(user_id=user.id, name=name) for name in CATEGORIES]
+        db.session.add_all(categories)
+        db.session.commit()
+        category_ids = [c.id for c in categories]
+
+        # Rows go in through Core so the FTS triggers fire exactly as in production
+        start = datetime(2020, 1, 1)
+        started = time.perf_counter()
+        for offset in range(0, n, BATCH):
+            rows = [{
+                "user_id": user.id,
+                "timestamp": start + timedelta(minutes=3 * i),
+                "category_id": category_ids[i % len(category_ids)],
+                "note": f"{NOTES[(i * 7) % len(NOTES)]} #{i}" if i % 1000 else f"牛排館 聚餐 #{i}",
+                "amount_cents": 5000 + i % 45000
+            } for i in range(offset, min(n, offset + BATCH))]
+            db.session.execute(insert(ExpenseRecord.__table__), rows)
+            db.session.commit()
+        print(f"Seeded {n:,} records (with FTS triggers) in {time.perf_counter() - started:.1f}s")
+        return user.id
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        class BenchConfig(Config):
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+            SCHEDULER_IN_WEB = False
+
+        app = create_app(BenchConfig)
+        user_id = seed(app, args.rows)
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+
+        print(f"{'query':18s}{'terms':>16s}{'hits':>7s}{'search ms':>12s}{'LIKE scan ms':>15s}")
+        for label, q, *dates in QUERIES:
+            url = f'/expense/api/search?q={q}'
+            if dates:
+                url += f'&start_date={dates[0]}&end_date={dates[1]}'
+
+            def search():
+                response = client.get(url)
+                assert response.status_code == 200, (url, response.status_code)
+                return response.get_json()
+            search_ms, result = timed(search, args.repeat)
+
+            # Baseline: what a LIKE over expense_record.note would cost for the same terms
+            like = ' AND '.join(f"note LIKE :t{i}" for i in range(len(q.split())))
+            params = {f"t{i}": f"%{t.strip('*')}%" for i, t in enumerate(q.split())}
+            with app.app_context():
+                scan_ms, _ = timed(lambda: db.session.execute(text(
+                    f"SELECT id FROM expense_record WHERE user_id = :uid AND {like} "
+                    f"ORDER BY timestamp DESC LIMIT 51"), dict(params, uid=user_id)).all(), max(1, args.repeat // 4))
+
+            hits = f"{len(result['records'])}{'+' if result['has_more'] else ''}"
+            print(f"{label:18s}{q:>16s}{hits:>7s}{search_ms:12.2f}{scan_ms:15.2f}")
+
+if __name__ == '__main__':
+    main()
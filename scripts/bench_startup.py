@@ -0,0 +1,62 @@
+"""
+Startup benchmark: import the app in a fresh interpreter under `python -X importtime`
+and report total boot time, the slowest imports, and any heavy module that leaked
+into the boot path.
+
+Usage: python scripts/bench_startup.py [--runs 5] [--top 15]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import statistics
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that should only load when a request needs them
+DEFERRED = ('pandas', 'openpyxl', 'linebot')
+
+def run_once():
+    env = dict(os.environ, SCHEDULER_IN_WEB='0', PYTHONDONTWRITEBYTECODE='1')
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=BASE_DIR, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        sys.exit(proc.stderr)
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    totals = []
+    rows = []
+    for _ in range(args.runs):
+        rows = run_once()
+        app_row = next(r for r in rows if r[0] == 'app')
+        totals.append(app_row[2] / 1000.0)
+
+    print(f"import app: median {statistics.median(totals):.1f} ms, "
+          f"min {min(totals):.1f} ms over {args.runs} runs")
+
+    print(f"\nTop {args.top} imports by self time (last run):")
+    for name, self_us, cumulative in sorted(rows, key=lambda r: r[1], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000.0:8.1f} ms self  {cumulative / 1000.0:8.1f} ms cumulative  {name}")
+
+    loaded = {r[0].split('.')[0] for r in rows}
+    leaked = [m for m in DEFERRED if m in loaded]
+    print("\nDeferred modules loaded at boot: " + (', '.join(leaked) if leaked else 'none'))
+    return 1 if leaked else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
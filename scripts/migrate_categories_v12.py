@@ -0,0 +1,86 @@
+import sys
+import os
+import json
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from models import Category
+from services.category_service import CategoryService
+from sqlalchemy import text
+
+def migrate():
+    with app.app_context():
+        print("Starting migration v12: normalized expense categories...")
+        Category.__table__.create(db.engine, checkfirst=True)
+
+        with db.engine.connect() as conn:
+            columns = conn.execute(text("PRAGMA table_info(expense_record)")).fetchall()
+            col_names = [col[1] for col in columns]
+
+            if 'category_id' in col_names and 'category' not in col_names:
+                print("expense_record.category_id already in place, nothing to do.")
+                return
+
+            if 'category_id' not in col_names:
+                print("Adding category_id column...")
+                conn.execute(text("ALTER TABLE expense_record ADD COLUMN category_id INTEGER REFERENCES category(id)"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_expense_record_category_id ON expense_record (category_id)"))
+
+            ids = {}  # (user_id, name) -> category id
+
+            def get_or_create(user_id, emoji, name, color=None):
+                key = (user_id, name)
+                if key not in ids:
+                    row = conn.execute(text("SELECT id FROM category WHERE user_id = :u AND name = :n"),
+                                       {"u": user_id, "n": name}).fetchone()
+                    if row is None:
+                        conn.execute(text("INSERT INTO category (user_id, name, emoji, color) VALUES (:u, :n, :e, :c)"),
+                                     {"u": user_id, "n": name, "e": emoji, "c": color})
+                        row = conn.execute(text("SELECT id FROM category WHERE user_id = :u AND name = :n"),
+                                           {"u": user_id, "n": name}).fetchone()
+                    ids[key] = row[0]
+                return ids[key]
+
+            # 1. Settings lists first, so their emoji/colour win and entries get ids
+            settings = conn.execute(text("SELECT id, user_id, custom_categories FROM user_settings")).fetchall()
+            for settings_id, user_id, raw in settings:
+                try:
+                    entries = json.loads(raw or '[]')
+                except ValueError:
+                    continue
+                if not isinstance(entries, list):
+                    continue
+                for entry in entries:
+                    if isinstance(entry, dict) and str(entry.get('name') or '').strip():
+                        name = str(entry['name']).strip()
+                        entry['id'] = get_or_create(user_id, str(entry.get('emoji') or '').strip(), name, entry.get('color'))
+                conn.execute(text("UPDATE user_settings SET custom_categories = :c WHERE id = :id"),
+                             {"c": json.dumps(entries, ensure_ascii=False), "id": settings_id})
+
+            # 2. Every distinct label on existing records
+            labels = conn.execute(text(
+                "SELECT DISTINCT user_id, category FROM expense_record WHERE category IS NOT NULL AND category != ''"
+            )).fetchall()
+            for user_id, label in labels:
+                emoji, name = CategoryService.parse_label(label)
+                if not name:
+                    continue
+                category_id = get_or_create(user_id, emoji or CategoryService.DEFAULT_EMOJI.get(name, ''), name)
+                conn.execute(text("UPDATE expense_record SET category_id = :cid WHERE user_id = :u AND category = :l"),
+                             {"cid": category_id, "u": user_id, "l": label})
+            print(f"Mapped {len(labels)} labels onto {len(ids)} categories.")
+            conn.commit()
+
+            try:
+                # SQLite >= 3.35; on older versions the unused column is left behind
+                conn.execute(text("ALTER TABLE expense_record DROP COLUMN category"))
+                conn.commit()
+                print("Dropped legacy category column.")
+            except Exception as e:
+                conn.rollback()
+                print(f"Kept legacy category column: {e}")
+
+        print("Migration v12 completed successfully!")
+
+if __name__ == "__main__":
+    migrate()
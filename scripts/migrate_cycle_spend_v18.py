@@ -0,0 +1,27 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from models import CycleSpend, UserSettings, ExpenseRecord
+from services.budget_service import BudgetService
+
+def migrate():
+    with app.app_context():
+        print("Starting migration v18: running budget totals per billing cycle...")
+
+        CycleSpend.__table__.create(db.engine, checkfirst=True)
+
+        # Seed every cycle up front: expense writes only adjust existing totals
+        # and treat a missing row as zero. Rebuilding makes reruns safe.
+        cycle_days = dict(db.session.query(UserSettings.user_id, UserSettings.billing_cycle_start_day).all())
+        user_ids = [row[0] for row in db.session.query(ExpenseRecord.user_id).distinct()]
+        for user_id in user_ids:
+            BudgetService.rebuild(user_id, cycle_days.get(user_id))
+        db.session.commit()
+        print(f"Seeded cycle totals for {len(user_ids)} users.")
+
+        print("Migration v18 completed successfully!")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,44 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from sqlalchemy import text
+
+def migrate():
+    with app.app_context():
+        print("Starting migration v11: expense amounts to integer cents...")
+        with db.engine.connect() as conn:
+            columns = conn.execute(text("PRAGMA table_info(expense_record)")).fetchall()
+            col_names = [col[1] for col in columns]
+
+            if 'amount_cents' in col_names:
+                print("amount_cents already present, nothing to do.")
+                return
+
+            print("Adding amount_cents column...")
+            conn.execute(text("ALTER TABLE expense_record ADD COLUMN amount_cents INTEGER NOT NULL DEFAULT 0"))
+
+            if 'amount' in col_names:
+                print("Converting amount -> amount_cents...")
+                # Same half-up rounding as models.to_cents for values with <= 2 decimals
+                result = conn.execute(text(
+                    "UPDATE expense_record SET amount_cents = CAST(ROUND(COALESCE(amount, 0) * 100) AS INTEGER)"
+                ))
+                print(f"Converted {result.rowcount} rows.")
+            conn.commit()
+
+            if 'amount' in col_names:
+                try:
+                    # SQLite >= 3.35; on older versions the unused column is left behind
+                    conn.execute(text("ALTER TABLE expense_record DROP COLUMN amount"))
+                    conn.commit()
+                    print("Dropped legacy amount column.")
+                except Exception as e:
+                    conn.rollback()
+                    print(f"Kept legacy amount column: {e}")
+
+        print("Migration v11 completed successfully!")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,34 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from models import EXPENSE_SEARCH_DDL
+from sqlalchemy import text
+
+def migrate():
+    with app.app_context():
+        print("Starting migration v17: full-text search over expense notes...")
+
+        with db.engine.connect() as conn:
+            # Virtual table and the triggers that keep it in sync
+            for statement in EXPENSE_SEARCH_DDL:
+                conn.execute(text(statement))
+
+            # Rebuild from scratch so reruns (or rows written by an older
+            # deployment without the triggers) always end up consistent
+            conn.execute(text("DELETE FROM expense_fts"))
+            result = conn.execute(text("""
+                INSERT INTO expense_fts (rowid, note, category)
+                SELECT r.id, coalesce(r.note, ''), coalesce(c.name, '')
+                FROM expense_record r LEFT JOIN category c ON c.id = r.category_id
+            """))
+            print(f"Indexed {result.rowcount} expense records.")
+
+            conn.execute(text("INSERT INTO expense_fts (expense_fts) VALUES ('optimize')"))
+            conn.commit()
+
+        print("Migration v17 completed successfully!")
+
+if __name__ == "__main__":
+    migrate()
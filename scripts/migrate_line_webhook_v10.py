@@ -0,0 +1,19 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from models import LineWebhookEvent
+
+def migrate():
+    with app.app_context():
+        print("Starting migration v10: LINE webhook event dedup...")
+        try:
+            # Creates line_webhook_event if missing
+            LineWebhookEvent.__table__.create(db.engine, checkfirst=True)
+            print("Migration v10 completed successfully!")
+        except Exception as e:
+            print(f"Migration failed: {e}")
+
+if __name__ == "__main__":
+    migrate()
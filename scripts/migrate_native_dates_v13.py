@@ -0,0 +1,78 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from models import parse_date, parse_time, parse_timestamp
+from sqlalchemy import text
+
+BATCH_SIZE = 1000
+
+# Canonical layouts written by the Date / TimeHM / Timestamp column types
+DATE_GLOB = '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'
+TIME_GLOB = '[0-9][0-9]:[0-9][0-9]'
+TIMESTAMP_GLOB = DATE_GLOB + ' ' + TIME_GLOB + ':[0-9][0-9]'
+
+# table -> [(column, canonical glob, parser, formatter)]
+COLUMNS = {
+    'salary_record': [
+        ('date', DATE_GLOB, parse_date, lambda v: v.isoformat()),
+        ('start_time', TIME_GLOB, parse_time, lambda v: v.strftime('%H:%M')),
+        ('end_time', TIME_GLOB, parse_time, lambda v: v.strftime('%H:%M')),
+    ],
+    'expense_record': [
+        ('timestamp', TIMESTAMP_GLOB, parse_timestamp, lambda v: v.strftime('%Y-%m-%d %H:%M:%S')),
+    ],
+}
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_salary_record_user_date ON salary_record (user_id, date)",
+    "CREATE INDEX IF NOT EXISTS ix_expense_record_user_timestamp ON expense_record (user_id, timestamp)",
+]
+
+def normalize(conn, table, column, pattern, parse, fmt):
+    """Rewrite values not already in canonical form, BATCH_SIZE rows per transaction."""
+    fixed, bad, last_id = 0, 0, 0
+    while True:
+        rows = conn.execute(text(
+            f"SELECT id, {column} FROM {table} "
+            f"WHERE id > :last AND {column} IS NOT NULL AND {column} NOT GLOB :pattern "
+            f"ORDER BY id LIMIT :limit"
+        ), {"last": last_id, "pattern": pattern, "limit": BATCH_SIZE}).fetchall()
+        if not rows:
+            break
+
+        updates = []
+        for row_id, value in rows:
+            try:
+                parsed = parse(value)  # empty times become NULL
+                updates.append({"id": row_id, "value": fmt(parsed) if parsed is not None else None})
+            except ValueError:
+                bad += 1
+                print(f"  {table}.{column} id={row_id}: unparseable {value!r}, left as-is")
+        if updates:
+            conn.execute(text(f"UPDATE {table} SET {column} = :value WHERE id = :id"), updates)
+        conn.commit()
+
+        fixed += len(updates)
+        last_id = rows[-1][0]
+    return fixed, bad
+
+def migrate():
+    with app.app_context():
+        print("Starting migration v13: native date/time columns...")
+        with db.engine.connect() as conn:
+            for table, columns in COLUMNS.items():
+                for column, pattern, parse, fmt in columns:
+                    fixed, bad = normalize(conn, table, column, pattern, parse, fmt)
+                    print(f"{table}.{column}: normalized {fixed} rows" + (f", {bad} unparseable" if bad else ""))
+
+            print("Creating composite indexes...")
+            for statement in INDEXES:
+                conn.execute(text(statement))
+            conn.commit()
+
+        print("Migration v13 completed successfully!")
+
+if __name__ == "__main__":
+    migrate()
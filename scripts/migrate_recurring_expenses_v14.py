@@ -0,0 +1,49 @@
+import sys
+import os
+import json
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from models import RecurringExpense, UserSettings
+from services.recurring_service import RecurringExpenseService
+from sqlalchemy import text
+
+def migrate():
+    with app.app_context():
+        print("Starting migration v14: recurring expense rules...")
+        RecurringExpense.__table__.create(db.engine, checkfirst=True)
+
+        with db.engine.connect() as conn:
+            columns = conn.execute(text("PRAGMA table_info(expense_record)")).fetchall()
+            col_names = [col[1] for col in columns]
+
+            if 'recurring_id' not in col_names:
+                print("Adding recurring_id column...")
+                conn.execute(text("ALTER TABLE expense_record ADD COLUMN recurring_id INTEGER REFERENCES recurring_expense(id)"))
+            if 'occurrence' not in col_names:
+                print("Adding occurrence column...")
+                conn.execute(text("ALTER TABLE expense_record ADD COLUMN occurrence DATE"))
+            conn.execute(text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS uq_expense_record_occurrence ON expense_record (recurring_id, occurrence)"
+            ))
+            conn.commit()
+
+        # Parse every user's JSON rules once; they start from today, nothing is backfilled
+        imported = 0
+        for settings in UserSettings.query.all():
+            try:
+                entries = json.loads(settings.recurring_expenses or '[]')
+            except ValueError:
+                continue
+            if not isinstance(entries, list) or not entries:
+                continue
+            entries = RecurringExpenseService.sync_rules(settings.user_id, entries)
+            settings.recurring_expenses = json.dumps(entries, ensure_ascii=False)
+            imported += 1
+        db.session.commit()
+        print(f"Imported recurring rules for {imported} users.")
+
+        print("Migration v14 completed successfully!")
+
+if __name__ == "__main__":
+    migrate()
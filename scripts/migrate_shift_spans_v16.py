@@ -0,0 +1,51 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from sqlalchemy import text
+
+def migrate():
+    with app.app_context():
+        print("Starting migration v16: shift spans for overlap checks...")
+
+        with db.engine.connect() as conn:
+            columns = conn.execute(text("PRAGMA table_info(salary_record)")).fetchall()
+            col_names = [col[1] for col in columns]
+
+            for column in ('starts_at', 'ends_at'):
+                if column not in col_names:
+                    print(f"Adding {column} column...")
+                    conn.execute(text(f"ALTER TABLE salary_record ADD COLUMN {column} DATETIME"))
+
+            # Dates/times are canonical since v13, so SQLite's datetime() can build
+            # the span directly; an end before the start runs past midnight
+            result = conn.execute(text("""
+                UPDATE salary_record
+                SET starts_at = datetime(date || ' ' || start_time),
+                    ends_at = datetime(date || ' ' || end_time,
+                                       CASE WHEN end_time < start_time THEN '+1 day' ELSE '+0 days' END)
+                WHERE type = 'shift' AND start_time IS NOT NULL AND end_time IS NOT NULL
+                  AND starts_at IS NULL
+            """))
+            print(f"Filled spans for {result.rowcount} shifts.")
+
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_salary_record_user_starts_at ON salary_record (user_id, starts_at)"
+            ))
+            conn.commit()
+
+            overlaps = conn.execute(text("""
+                SELECT COUNT(*) FROM salary_record a
+                JOIN salary_record b ON b.user_id = a.user_id AND b.type = 'shift'
+                 AND b.starts_at >= a.starts_at AND b.starts_at < a.ends_at
+                 AND (b.starts_at > a.starts_at OR b.id > a.id)
+                WHERE a.type = 'shift'
+            """)).scalar()
+            if overlaps:
+                print(f"Found {overlaps} overlapping shift pairs (listed by GET /salary/api/conflicts).")
+
+        print("Migration v16 completed successfully!")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,15 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from models import ShiftTemplate
+
+def migrate():
+    with app.app_context():
+        print("Starting migration v15: shift templates...")
+        ShiftTemplate.__table__.create(db.engine, checkfirst=True)
+        print("Migration v15 completed successfully!")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,32 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from models import PeriodSnapshot
+from sqlalchemy import text
+
+def migrate():
+    with app.app_context():
+        print("Starting migration v7: Closed period snapshots...")
+
+        inspector = db.inspect(db.engine)
+        columns = [c['name'] for c in inspector.get_columns('user_settings')]
+
+        try:
+            with db.engine.connect() as conn:
+                if 'snapshot_epoch' not in columns:
+                    print("Adding snapshot_epoch...")
+                    conn.execute(text("ALTER TABLE user_settings ADD COLUMN snapshot_epoch INTEGER DEFAULT 0"))
+                conn.commit()
+
+            # Creates period_snapshot if missing
+            PeriodSnapshot.__table__.create(db.engine, checkfirst=True)
+
+            print("Migration v7 completed successfully!")
+
+        except Exception as e:
+            print(f"Migration failed: {e}")
+
+if __name__ == "__main__":
+    migrate()
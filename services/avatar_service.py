@@ -0,0 +1,138 @@
+# Pillow is imported on first use to keep boot fast
+from flask import current_app, send_from_directory, abort
+from werkzeug.utils import secure_filename
+from models import db
+from datetime import datetime
+import threading
+import queue
+import glob
+import os
+
+class AvatarService:
+    """
+    Uploaded avatars: the raw upload is validated and stored, then a background
+    worker decodes it once into fixed square WebP variants (AVATAR_SIZES) and
+    removes the original plus the user's previous avatar files.
+
+    avatar_val holds a key (user_<id>_<ts>); variants live at <key>_<size>.webp
+    in AVATAR_FOLDER. Legacy values are plain filenames and are served as-is.
+    """
+
+    FORMATS = {'PNG': '.png', 'JPEG': '.jpg', 'WEBP': '.webp', 'GIF': '.gif'}
+    MAX_PIXELS = 4096 * 4096
+    VARIANT_MAX_AGE = 31536000  # keys change on every upload
+
+    _queue = queue.Queue()
+    _worker = None
+    _worker_lock = threading.Lock()
+
+    @classmethod
+    def save_upload(cls, user, file):
+        """Store an upload and queue resizing. Returns an error message, or None on success."""
+        from PIL import Image, UnidentifiedImageError
+
+        # Header only; pixels are decoded by the worker
+        try:
+            with Image.open(file.stream) as im:
+                ext = cls.FORMATS.get(im.format)
+                too_large = im.width * im.height > cls.MAX_PIXELS
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+            return '無法辨識的圖片檔案'
+        if ext is None:
+            return '不支援的圖片格式 (PNG / JPEG / WebP / GIF)'
+        if too_large:
+            return '圖片尺寸過大'
+        file.stream.seek(0)
+
+        folder = current_app.config['AVATAR_FOLDER']
+        os.makedirs(folder, exist_ok=True)
+        key = f"user_{user.id}_{int(datetime.now().timestamp() * 1000)}"
+        file.save(os.path.join(folder, key + ext))
+
+        previous = user.avatar_val if user.avatar_type == 'upload' else None
+        user.avatar_type = 'upload'
+        user.avatar_val = key
+        db.session.commit()
+
+        cls._enqueue(cls._resize, folder, key, ext, tuple(current_app.config['AVATAR_SIZES']), previous)
+        return None
+
+    @classmethod
+    def discard(cls, avatar_val):
+        """Remove an uploaded avatar's files in the background (after switching away from it)."""
+        if avatar_val:
+            cls._enqueue(cls._remove, current_app.config['AVATAR_FOLDER'], avatar_val)
+
+    @classmethod
+    def send(cls, key, size):
+        """Serve a cached variant, or the original while the worker hasn't finished."""
+        folder = current_app.config['AVATAR_FOLDER']
+        key = secure_filename(key)
+
+        if size in current_app.config['AVATAR_SIZES']:
+            variant = f"{key}_{size}.webp"
+            if os.path.isfile(os.path.join(folder, variant)):
+                response = send_from_directory(folder, variant, max_age=cls.VARIANT_MAX_AGE)
+                response.cache_control.public = False
+                response.cache_control.private = True
+                response.cache_control.immutable = True
+                return response
+
+        # Pending original, or a legacy avatar_val that is already a filename
+        candidates = [key] + [os.path.basename(p) for p in glob.glob(os.path.join(folder, glob.escape(key) + '.*'))]
+        for name in candidates:
+            if os.path.isfile(os.path.join(folder, name)):
+                response = send_from_directory(folder, name)
+                response.cache_control.no_cache = True
+                return response
+        abort(404)
+
+    @classmethod
+    def _enqueue(cls, func, *args):
+        with cls._worker_lock:
+            if cls._worker is None or not cls._worker.is_alive():
+                cls._worker = threading.Thread(target=cls._run, daemon=True)
+                cls._worker.start()
+        cls._queue.put((func, args))
+
+    @classmethod
+    def _run(cls):
+        while True:
+            func, args = cls._queue.get()
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"Avatar Worker Error: {e}")
+            finally:
+                cls._queue.task_done()
+
+    @classmethod
+    def _resize(cls, folder, key, ext, sizes, previous):
+        from PIL import Image, ImageOps
+
+        source = os.path.join(folder, key + ext)
+        with Image.open(source) as im:
+            im = ImageOps.exif_transpose(im).convert('RGBA')
+            side = min(max(sizes), im.width, im.height)
+            square = ImageOps.fit(im, (side, side), Image.LANCZOS)
+
+        for size in sorted(sizes, reverse=True):
+            variant = square if size >= side else square.resize((size, size), Image.LANCZOS)
+            target = os.path.join(folder, f"{key}_{size}.webp")
+            tmp = f"{target}.{os.getpid()}.tmp"
+            variant.save(tmp, 'WEBP', quality=85, method=4)
+            os.replace(tmp, target)
+
+        os.remove(source)
+        if previous:
+            cls._remove(folder, previous)
+
+    @staticmethod
+    def _remove(folder, avatar_val):
+        name = secure_filename(avatar_val)
+        pattern = glob.escape(os.path.join(folder, name))
+        for path in [os.path.join(folder, name)] + glob.glob(pattern + '.*') + glob.glob(pattern + '_*.webp'):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,181 @@
+from models import db, CycleSpend, ExpenseRecord, User, to_cents, from_cents, format_amount, parse_date
+from extensions import mail
+from flask import current_app
+from flask_mail import Message
+from services.line_service import LineService
+from sqlalchemy import func, insert, or_
+from datetime import date, datetime, timedelta
+import calendar
+import json
+import threading
+
+class BudgetService:
+    """
+    Keeps CycleSpend in step with expense writes and sends the budget alert.
+
+    Writers describe their change as (timestamp, delta_cents) pairs; apply()
+    adds each delta to its cycle's row with a keyed single-row UPDATE (or
+    INSERT for a cycle's first record) and claims the alert with a conditional
+    UPDATE, so a write costs the same no matter how many records the cycle
+    holds, and concurrent writers notify once.
+
+    Every cycle with spend has a row, so a missing row means nothing spent.
+    Paths that change records wholesale (cycle day change, legacy import,
+    partial recurring bookings, migrate_cycle_spend_v18) restore that with
+    rebuild(); the write path itself never sums a range.
+    """
+
+    DEFAULT_CYCLE_DAY = 10
+    DEFAULT_THRESHOLD = 80  # percent, as in the dashboard's budget bar
+
+    @staticmethod
+    def _cycle_start_in(year, month, cycle_day):
+        # Short months start the cycle on their last day
+        return date(year, month, min(cycle_day, calendar.monthrange(year, month)[1]))
+
+    @classmethod
+    def cycle_bounds(cls, cycle_day, ref):
+        """(start, end) of the billing cycle containing ref, end inclusive."""
+        cycle_day = cycle_day or cls.DEFAULT_CYCLE_DAY
+        if isinstance(ref, datetime):
+            ref = ref.date()
+        year, month = ref.year, ref.month
+        start = cls._cycle_start_in(year, month, cycle_day)
+        if ref < start:
+            year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+            start = cls._cycle_start_in(year, month, cycle_day)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return start, cls._cycle_start_in(year, month, cycle_day) - timedelta(days=1)
+
+    @classmethod
+    def apply(cls, user_id, settings, changes, today=None):
+        """
+        Fold [(timestamp, delta_cents)] into the user's cycle totals. Call once
+        the record change is flushed; joins the caller's transaction. Returns
+        the alert to pass to notify() after commit, or None.
+        """
+        cycle_day = settings.billing_cycle_start_day if settings else None
+        deltas = {}
+        for timestamp, cents in changes:
+            start = cls.cycle_bounds(cycle_day, timestamp)[0]
+            deltas[start] = deltas.get(start, 0) + cents
+
+        for start, cents in deltas.items():
+            if cents:
+                cls._add(user_id, start, cents)
+
+        # Only spend added to the running cycle can cross its threshold
+        current = cls.cycle_bounds(cycle_day, today or date.today())
+        if settings and deltas.get(current[0], 0) > 0:
+            return cls._claim_alert(user_id, settings, current)
+        return None
+
+    @staticmethod
+    def _add(user_id, start, cents):
+        row = CycleSpend.query.filter_by(user_id=user_id, cycle_start=start)
+        if row.update({CycleSpend.total_cents: CycleSpend.total_cents + cents}, synchronize_session=False):
+            return
+        # No row yet: nothing was spent in this cycle before this write
+        inserted = db.session.execute(insert(CycleSpend.__table__).prefix_with('OR IGNORE')
+                                      .values(user_id=user_id, cycle_start=start, total_cents=cents))
+        if not inserted.rowcount:
+            row.update({CycleSpend.total_cents: CycleSpend.total_cents + cents}, synchronize_session=False)
+
+    @classmethod
+    def _claim_alert(cls, user_id, settings, cycle):
+        budget_cents = to_cents(settings.monthly_budget or 0)
+        percent = settings.budget_alert_threshold or cls.DEFAULT_THRESHOLD
+        if budget_cents <= 0:
+            return None
+        threshold = budget_cents * percent // 100
+
+        # Only the writer that moves the total past a threshold not yet
+        # notified gets a row back; raising the budget re-arms the alert
+        claimed = CycleSpend.query.filter_by(user_id=user_id, cycle_start=cycle[0])\
+            .filter(CycleSpend.total_cents >= threshold)\
+            .filter(or_(CycleSpend.alerted_cents.is_(None), CycleSpend.alerted_cents < threshold))\
+            .update({CycleSpend.alerted_cents: threshold}, synchronize_session=False)
+        if not claimed:
+            return None
+
+        total = db.session.query(CycleSpend.total_cents)\
+            .filter_by(user_id=user_id, cycle_start=cycle[0]).scalar()
+        return {
+            "user_id": user_id,
+            "start": cycle[0].isoformat(),
+            "end": cycle[1].isoformat(),
+            "total": from_cents(total),
+            "budget": from_cents(budget_cents),
+            "threshold": percent,
+            "percent": round(total * 100 / budget_cents)
+        }
+
+    @staticmethod
+    def reset(user_id):
+        """Drop the running totals along with all of the user's expense records."""
+        CycleSpend.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+
+    @classmethod
+    def rebuild(cls, user_id, cycle_day):
+        """
+        Recompute the user's totals from their records (one query grouped by
+        day). Cycles that keep their start keep their alert state. Joins the
+        caller's transaction.
+        """
+        day = func.date(ExpenseRecord.timestamp)
+        totals = {}
+        for day_str, cents in db.session.query(day, func.sum(ExpenseRecord.amount_cents))\
+                .filter(ExpenseRecord.user_id == user_id).group_by(day):
+            start = cls.cycle_bounds(cycle_day, parse_date(day_str))[0]
+            totals[start] = totals.get(start, 0) + (cents or 0)
+
+        alerted = dict(db.session.query(CycleSpend.cycle_start, CycleSpend.alerted_cents)
+                       .filter(CycleSpend.user_id == user_id, CycleSpend.alerted_cents.isnot(None)).all())
+        cls.reset(user_id)
+        if totals:
+            db.session.execute(insert(CycleSpend.__table__), [
+                {"user_id": user_id, "cycle_start": start, "total_cents": cents,
+                 "alerted_cents": alerted.get(start)}
+                for start, cents in totals.items()
+            ])
+
+    @classmethod
+    def notify(cls, alert):
+        """Send a claimed alert through the user's notification_methods, off the request path."""
+        if not alert:
+            return
+        threading.Thread(
+            target=cls._send_alert,
+            args=(current_app._get_current_object(), alert)
+        ).start()
+
+    @staticmethod
+    def _send_alert(app, alert):
+        with app.app_context():
+            user = db.session.get(User, alert['user_id'])
+            if not user or not user.settings:
+                return
+            try:
+                methods = json.loads(user.settings.notification_methods or '["email"]')
+            except ValueError:
+                methods = ['email']
+
+            msg_text = (
+                f"⚠️ [預算提醒]\n"
+                f"期間: {alert['start']} ~ {alert['end']}\n"
+                f"已支出: ${format_amount(alert['total'])} / 預算 ${format_amount(alert['budget'])} ({alert['percent']}%)\n"
+                f"已達設定的 {alert['threshold']}% 提醒門檻"
+            )
+
+            if 'line' in methods and user.settings.line_user_id:
+                LineService.push_message(user.settings.line_user_id, msg_text)
+
+            if 'email' in methods and user.email:
+                sender = app.config.get('MAIL_USERNAME')
+                if not sender:
+                    print("[Budget] Cannot send email: MAIL_USERNAME not set in config.")
+                    return
+                try:
+                    mail.send(Message(subject="⚠️ 預算提醒", recipients=[user.email], body=msg_text, sender=sender))
+                except Exception as e:
+                    print(f"[Budget] Failed to send alert email: {e}")
@@ -0,0 +1,106 @@
+from models import db, Category, ExpenseRecord, RecurringExpense
+from services.snapshot_service import SnapshotService
+from services.version_service import VersionService
+
+class CategoryService:
+    """
+    Maps the labels the UI sends ("飲食", "🍽️ 飲食") onto Category rows and keeps
+    the table in step with UserSettings.custom_categories.
+    """
+
+    # Emoji for the built-in names when a bare name arrives before any settings exist
+    DEFAULT_EMOJI = {
+        "飲食": "🍽️",
+        "衣著": "👕",
+        "居住": "🏠",
+        "交通": "🚌",
+        "教育": "📖",
+        "娛樂": "🎮",
+        "其他": "📦"
+    }
+
+    @staticmethod
+    def parse_label(label):
+        """'🍽️ 飲食' -> ('🍽️', '飲食'); 'Fast food' -> ('', 'Fast food')."""
+        label = (label or '').strip()
+        head, sep, rest = label.partition(' ')
+        if sep and rest.strip() and not any(ch.isalnum() for ch in head):
+            return head, rest.strip()
+        return '', label
+
+    @classmethod
+    def resolve(cls, user_id, label):
+        """Category id for a label or bare name, creating the category on first use."""
+        emoji, name = cls.parse_label(label)
+        if not name:
+            return None
+
+        category = Category.query.filter_by(user_id=user_id, name=name).first()
+        if category is None:
+            category = Category(user_id=user_id, name=name, emoji=emoji or cls.DEFAULT_EMOJI.get(name, ''))
+            db.session.add(category)
+            db.session.flush()
+        return category.id
+
+    @classmethod
+    def sync_settings(cls, user_id, entries):
+        """
+        Apply the settings list ([{id?, name, emoji, color}, ...]) to the table and
+        return it with ids filled in. Editing an entry that has an id renames the
+        category in place; renaming onto another existing name merges the two.
+        Joins the caller's transaction.
+        """
+        categories = Category.query.filter_by(user_id=user_id).all()
+        by_id = {c.id: c for c in categories}
+        by_name = {c.name: c for c in categories}
+        relabeled = False
+        result = []
+        seen = set()
+
+        for entry in entries or []:
+            if not isinstance(entry, dict):
+                continue
+            name = str(entry.get('name') or '').strip()
+            if not name:
+                continue
+            emoji = str(entry.get('emoji') or '').strip()
+            category = by_id.get(entry.get('id')) or by_name.get(name)
+
+            if category is None:
+                category = Category(user_id=user_id, name=name, emoji=emoji, color=entry.get('color'))
+                db.session.add(category)
+                db.session.flush()
+                by_id[category.id] = category
+            elif category.name != name and name in by_name:
+                # Renamed onto an existing category: move the records and recurring rules over
+                target = by_name[name]
+                ExpenseRecord.query.filter_by(category_id=category.id)\
+                    .update({ExpenseRecord.category_id: target.id}, synchronize_session=False)
+                RecurringExpense.query.filter_by(category_id=category.id)\
+                    .update({RecurringExpense.category_id: target.id}, synchronize_session=False)
+                by_name.pop(category.name, None)
+                by_id.pop(category.id, None)
+                db.session.delete(category)
+                category = target
+                relabeled = True
+
+            if category.id in seen:
+                # Two entries now share a category; the first one wins
+                continue
+            seen.add(category.id)
+
+            if (category.name, category.emoji) != (name, emoji):
+                by_name.pop(category.name, None)
+                category.name = name
+                category.emoji = emoji
+                relabeled = True
+            category.color = entry.get('color', category.color)
+            by_name[name] = category
+
+            result.append(dict(entry, id=category.id, name=name, emoji=emoji))
+
+        if relabeled:
+            # Frozen summaries and cached lists carry the old labels
+            SnapshotService.invalidate(user_id)
+            VersionService.bump(user_id, 'expense')
+        return result
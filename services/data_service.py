@@ -1,7 +1,9 @@
 from models import db, SalaryRecord, ExpenseRecord
 from services.salary_service import SalaryService
 from services.expense_service import ExpenseService
-import pandas as pd
+from services.snapshot_service import SnapshotService
+from services.version_service import VersionService
+from services.budget_service import BudgetService
 import io
 from flask import send_file
 
@@ -12,6 +14,9 @@ class DataService:
         Export all user data (Salary & Expense) to Excel.
         Returns: BytesIO object containing the .xlsx file
         """
+        # pandas/openpyxl are heavy; only the export needs them
+        import pandas as pd
+
         # Fetch Data
         salary_records = SalaryRecord.query.filter_by(user_id=user_id).all()
         expense_records = ExpenseRecord.query.filter_by(user_id=user_id).all()
@@ -35,7 +40,7 @@ class DataService:
         for r in expense_records:
             expense_data.append({
                 "Timestamp": r.timestamp,
-                "Category": r.category,
+                "Category": r.category.label if r.category else None,
                 "Amount": r.amount,
                 "Note": r.note
             })
@@ -69,10 +74,14 @@ class DataService:
         try:
             if module == 'salary' or module == 'all':
                 SalaryRecord.query.filter_by(user_id=user_id).delete()
+                VersionService.bump(user_id, 'salary')
                 
             if module == 'expense' or module == 'all':
                 ExpenseRecord.query.filter_by(user_id=user_id).delete()
+                BudgetService.reset(user_id)
+                VersionService.bump(user_id, 'expense')
                 
+            SnapshotService.invalidate(user_id)
             db.session.commit()
             return True
         except Exception as e:
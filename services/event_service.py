@@ -0,0 +1,136 @@
+from models import db, ReminderChange
+from sqlalchemy import func
+from datetime import datetime, timedelta
+import threading
+import queue
+import time
+
+class ReminderEventBus:
+    """
+    In-process fanout of reminder changes to open SSE streams.
+
+    Writers append to the reminder_change table (any worker, or the scheduler).
+    Each worker runs a single poller thread that tails the table and pushes new
+    rows to its local subscriber queues, so DB load does not grow with open tabs.
+
+    Every stream holds a gunicorn thread, so streams end after STREAM_LIFETIME
+    (the browser reconnects and resumes from Last-Event-ID) and a worker accepts
+    at most MAX_STREAMS at once, keeping the rest of its threads for requests.
+    """
+
+    POLL_INTERVAL = 1.0           # seconds between change log reads
+    RETENTION = timedelta(hours=1)
+    PRUNE_EVERY = 600             # seconds
+    STREAM_LIFETIME = 300         # seconds before a stream closes and the client reconnects
+    MAX_STREAMS = 16              # per worker; see --threads in the Procfile
+
+    _lock = threading.Lock()
+    _subscribers = {}             # user_id -> set of queue.Queue
+    _thread = None
+    _last_id = 0
+    _streams = 0
+
+    @staticmethod
+    def record(reminder, change_type):
+        """Log a change. Joins the caller's transaction; the caller commits."""
+        if reminder.id is None:
+            db.session.flush()
+        db.session.add(ReminderChange(
+            user_id=reminder.user_id,
+            reminder_id=reminder.id,
+            change_type=change_type,
+            is_active=None if change_type == 'delete' else bool(reminder.is_active)
+        ))
+
+    @staticmethod
+    def to_event(change):
+        return {
+            'id': change.id,
+            'reminder_id': change.reminder_id,
+            'type': change.change_type,
+            'is_active': change.is_active
+        }
+
+    @classmethod
+    def replay(cls, user_id, last_event_id):
+        """Changes a reconnecting client missed, still within the retention window."""
+        rows = ReminderChange.query.filter_by(user_id=user_id)\
+            .filter(ReminderChange.id > last_event_id)\
+            .order_by(ReminderChange.id.asc())\
+            .all()
+        return [cls.to_event(r) for r in rows]
+
+    @staticmethod
+    def latest_id(user_id):
+        """Resume point for a fresh stream: the user's newest change."""
+        return db.session.query(func.max(ReminderChange.id))\
+            .filter(ReminderChange.user_id == user_id).scalar() or 0
+
+    @classmethod
+    def subscribe(cls, app, user_id):
+        """Queue of the user's events, or None when this worker is at MAX_STREAMS."""
+        q = queue.Queue(maxsize=100)
+        with cls._lock:
+            if cls._streams >= cls.MAX_STREAMS:
+                return None
+            cls._streams += 1
+            cls._subscribers.setdefault(user_id, set()).add(q)
+            if cls._thread is None or not cls._thread.is_alive():
+                with app.app_context():
+                    cls._last_id = db.session.query(func.max(ReminderChange.id)).scalar() or 0
+                cls._thread = threading.Thread(target=cls._poll, args=(app,), daemon=True)
+                cls._thread.start()
+        return q
+
+    @classmethod
+    def unsubscribe(cls, user_id, q):
+        with cls._lock:
+            cls._streams -= 1
+            queues = cls._subscribers.get(user_id)
+            if queues:
+                queues.discard(q)
+                if not queues:
+                    del cls._subscribers[user_id]
+
+    @classmethod
+    def _poll(cls, app):
+        last_prune = 0.0
+        while True:
+            with cls._lock:
+                if not cls._subscribers:
+                    # Last stream closed; the next subscribe starts a fresh poller
+                    cls._thread = None
+                    return
+                watched = list(cls._subscribers.keys())
+
+            try:
+                with app.app_context():
+                    rows = ReminderChange.query\
+                        .filter(ReminderChange.id > cls._last_id)\
+                        .filter(ReminderChange.user_id.in_(watched))\
+                        .order_by(ReminderChange.id.asc())\
+                        .all()
+                    events = [(r.user_id, cls.to_event(r)) for r in rows]
+                    if rows:
+                        cls._last_id = rows[-1].id
+
+                    now = datetime.utcnow()
+                    if now.timestamp() - last_prune > cls.PRUNE_EVERY:
+                        ReminderChange.query.filter(ReminderChange.created_at < now - cls.RETENTION)\
+                            .delete(synchronize_session=False)
+                        db.session.commit()
+                        last_prune = now.timestamp()
+            except Exception as e:
+                print(f"[ReminderEventBus] Poll error: {e}")
+                events = []
+
+            with cls._lock:
+                for user_id, event in events:
+                    for q in cls._subscribers.get(user_id, ()):
+                        try:
+                            q.put_nowait(event)
+                        except queue.Full:
+                            # Stalled client; it will resync via Last-Event-ID on reconnect
+                            pass
+
+            time.sleep(cls.POLL_INTERVAL)
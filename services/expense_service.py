@@ -1,10 +1,33 @@
-from models import db, ExpenseRecord, UserSettings
+from models import db, ExpenseRecord, Category, UserSettings, to_cents, from_cents, parse_timestamp
 from flask_login import current_user
 from datetime import datetime, timedelta
-from sqlalchemy import func
+from sqlalchemy import func, type_coerce, select, table, column, literal_column, or_
 import json
+from services.snapshot_service import SnapshotService
+from services.version_service import VersionService
+from services.category_service import CategoryService
+from services.recurring_service import RecurringExpenseService
+from services.suggest_service import SuggestService
+from services.budget_service import BudgetService
 
 class ExpenseService:
+    # Read-only listings select these columns and build dicts straight from the
+    # row tuples, skipping ORM instances and the identity map (see _to_dict).
+    # Queries using them must outerjoin Category for the label; the timestamp
+    # comes back as its stored "YYYY-MM-DD HH:MM:SS" text, already in API format.
+    _LIST_COLUMNS = (
+        ExpenseRecord.id, type_coerce(ExpenseRecord.timestamp, db.String).label('timestamp'),
+        Category.label.label('category'),
+        ExpenseRecord.note, (ExpenseRecord.amount_cents / 100.0).label('amount')
+    )
+    _LIST_FIELDS = tuple(c.key for c in _LIST_COLUMNS)
+
+    # FTS5 mirror of note / category name, maintained by triggers (see models.EXPENSE_SEARCH_DDL)
+    _FTS = table('expense_fts', column('rowid'), column('note'), column('category'), column('rank'))
+    SEARCH_LIMIT = 50
+    MAX_SEARCH_LIMIT = 200
+    SEARCH_RANK_WINDOW = 500  # newest index hits ordered by relevance
+
     def _ensure_file_exists(self):
         # Deprecated: DB handles this
         pass
@@ -12,8 +35,13 @@ class ExpenseService:
     def get_all_records(self):
         if not current_user.is_authenticated:
             return []
-        records = ExpenseRecord.query.filter_by(user_id=current_user.id).order_by(ExpenseRecord.timestamp.desc()).all()
-        return [self._to_dict(r) for r in records]
+        rows = ExpenseRecord.query.with_entities(*self._LIST_COLUMNS)\
+            .outerjoin(Category, ExpenseRecord.category_id == Category.id)\
+            .filter(ExpenseRecord.user_id == current_user.id)\
+            .order_by(ExpenseRecord.timestamp.desc())\
+            .all()
+        fields = self._LIST_FIELDS
+        return [dict(zip(fields, row)) for row in rows]
 
     def add_record(self, record_data):
         if not current_user.is_authenticated:
@@ -21,24 +49,33 @@ class ExpenseService:
             
         new_record = ExpenseRecord(
             user_id=current_user.id,
-            category=record_data.get('category'),
+            category_id=CategoryService.resolve(current_user.id, record_data.get('category')),
             note=record_data.get('note')
         )
         
         # Timestamp
-        if 'timestamp' in record_data:
-            new_record.timestamp = record_data['timestamp']
+        if record_data.get('timestamp'):
+            new_record.timestamp = parse_timestamp(record_data['timestamp'])
         else:
-            new_record.timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            new_record.timestamp = datetime.now().replace(microsecond=0)
             
         # Amount
         try:
-            new_record.amount = max(0.0, float(record_data.get('amount', 0.0)))
+            new_record.amount_cents = max(0, to_cents(record_data.get('amount', 0)))
         except:
-            new_record.amount = 0.0
+            new_record.amount_cents = 0
             
         db.session.add(new_record)
+        rec_date = new_record.timestamp.date().isoformat()
+        SnapshotService.invalidate(current_user.id, rec_date, rec_date)
+        VersionService.bump(current_user.id, 'expense')
+        db.session.flush()
+        alert = BudgetService.apply(current_user.id, current_user.settings,
+                                    [(new_record.timestamp, new_record.amount_cents)])
         db.session.commit()
+        BudgetService.notify(alert)
+        SuggestService.record(current_user.id, new_record.note, new_record.category_id,
+                              new_record.amount_cents, new_record.timestamp)
         return self._to_dict(new_record)
 
     def update_record(self, record_id, record_data):
@@ -49,17 +86,28 @@ class ExpenseService:
         if not record:
             return None
             
-        if 'category' in record_data: record.category = record_data['category']
+        old_date = record.timestamp.date().isoformat()
+        old_spend = (record.timestamp, record.amount_cents)
+        if 'category' in record_data: record.category_id = CategoryService.resolve(current_user.id, record_data['category'])
         if 'note' in record_data: record.note = record_data['note']
-        if 'timestamp' in record_data: record.timestamp = record_data['timestamp']
+        if record_data.get('timestamp'): record.timestamp = parse_timestamp(record_data['timestamp'])
         
         if 'amount' in record_data:
             try:
-                record.amount = max(0.0, float(record_data['amount']))
+                record.amount_cents = max(0, to_cents(record_data['amount']))
             except:
                 pass
                 
+        new_date = record.timestamp.date().isoformat()
+        SnapshotService.invalidate(current_user.id, old_date, old_date)
+        SnapshotService.invalidate(current_user.id, new_date, new_date)
+        VersionService.bump(current_user.id, 'expense')
+        db.session.flush()
+        # Moves the spend out of the old cycle and into the new one
+        alert = BudgetService.apply(current_user.id, current_user.settings,
+                                    [(old_spend[0], -old_spend[1]), (record.timestamp, record.amount_cents)])
         db.session.commit()
+        BudgetService.notify(alert)
         return self._to_dict(record)
 
     def delete_record(self, record_id):
@@ -69,6 +117,12 @@ class ExpenseService:
         record = ExpenseRecord.query.filter_by(id=record_id, user_id=current_user.id).first()
         if record:
             db.session.delete(record)
+            rec_date = record.timestamp.date().isoformat()
+            SnapshotService.invalidate(current_user.id, rec_date, rec_date)
+            VersionService.bump(current_user.id, 'expense')
+            db.session.flush()
+            BudgetService.apply(current_user.id, current_user.settings,
+                                [(record.timestamp, -record.amount_cents)])
             db.session.commit()
             return True
         return False
@@ -80,91 +134,97 @@ class ExpenseService:
         if not target_user:
              return {"records": [], "total_amount": 0, "category_split": {}}
              
-        # Filter: timestamp string comparison works for YYYY-MM-DD format if dates are YYYY-MM-DD
-        # But timestamps are YYYY-MM-DD HH:MM:SS
-        # start_date_str is YYYY-MM-DD
-        
-        records = ExpenseRecord.query.filter_by(user_id=target_user.id)\
-            .filter(ExpenseRecord.timestamp >= start_date_str)\
-            .filter(ExpenseRecord.timestamp < end_date_str + " 23:59:59")\
+        # Dates are [start, end): midnight of start up to (not including) midnight of end
+        # category_id and amount_cents ride along after the listed columns; zip() stops before them
+        rows = ExpenseRecord.query.with_entities(*self._LIST_COLUMNS, ExpenseRecord.category_id, ExpenseRecord.amount_cents)\
+            .outerjoin(Category, ExpenseRecord.category_id == Category.id)\
+            .filter(ExpenseRecord.user_id == target_user.id)\
+            .filter(ExpenseRecord.timestamp >= parse_timestamp(start_date_str))\
+            .filter(ExpenseRecord.timestamp < parse_timestamp(end_date_str))\
             .order_by(ExpenseRecord.timestamp.desc())\
             .all()
             
-        # Refine filter logic to strictly match date prefix
+        fields = self._LIST_FIELDS
         filtered = []
         total = 0
-        categories = {}
+        by_category = {}
+        labels = {}
         
-        for r in records:
-            rec_date = r.timestamp[:10]
-            if start_date_str <= rec_date < end_date_str:
-                filtered.append(self._to_dict(r))
-                total += r.amount
-                cat = r.category or '其他'
-                categories[cat] = categories.get(cat, 0) + r.amount
+        # Split on the integer key; labels are attached once per category
+        for row in rows:
+            category_id, cents = row[-2], row[-1]
+            filtered.append(dict(zip(fields, row)))
+            total += cents
+            by_category[category_id] = by_category.get(category_id, 0) + cents
+            labels[category_id] = row[2] or '其他'
+
+        categories = {}
+        for category_id, cents in by_category.items():
+            label = labels[category_id]
+            categories[label] = categories.get(label, 0) + cents
                 
         return {
             "records": filtered,
-            "total_amount": total,
-            "category_split": categories,
+            "total_amount": from_cents(total),
+            "category_split": {cat: from_cents(c) for cat, c in categories.items()},
             "period": {"start": start_date_str, "end": end_date_str}
         }
 
     def get_grouped_summary(self, start_date_str, end_date_str):
-        summary_data = self.get_summary(start_date_str, end_date_str)
-        records = summary_data['records']
-        
-        def get_week_start(date_obj):
-            return date_obj - timedelta(days=date_obj.weekday())
+        if not current_user.is_authenticated:
+            return {"weeks": [], "total_amount": 0, "period": {"start": start_date_str, "end": end_date_str}}
+
+        # One row per day over [start, end), same bounds as get_summary
+        day_col = func.date(ExpenseRecord.timestamp)
+        day_rows = db.session.query(
+            day_col,
+            func.sum(ExpenseRecord.amount_cents),
+            func.count(ExpenseRecord.id)
+        ).filter(ExpenseRecord.user_id == current_user.id)\
+            .filter(ExpenseRecord.timestamp >= parse_timestamp(start_date_str))\
+            .filter(ExpenseRecord.timestamp < parse_timestamp(end_date_str))\
+            .group_by(day_col)\
+            .order_by(day_col.desc())\
+            .all()
 
         weeks_grouped = {}
-        
-        for r in records:
-            dt = datetime.strptime(r['timestamp'][:10], '%Y-%m-%d')
-            wk_start = get_week_start(dt).strftime('%Y-%m-%d')
-            day_str = dt.strftime('%Y-%m-%d')
-            
+        total = 0
+
+        # Rows arrive newest day first, so weeks and days keep descending order
+        for day_str, day_cents, day_count in day_rows:
+            day_cents = day_cents or 0
+            dt = datetime.strptime(day_str, '%Y-%m-%d')
+            wk_start_dt = dt - timedelta(days=dt.weekday())
+            wk_start = wk_start_dt.strftime('%Y-%m-%d')
+
             if wk_start not in weeks_grouped:
                 weeks_grouped[wk_start] = {
                     "week_start": wk_start,
                     "total": 0,
-                    "days": {}
+                    "days": [],
+                    "week_end": (wk_start_dt + timedelta(days=6)).strftime('%Y-%m-%d')
                 }
-            
-            weeks_grouped[wk_start]['total'] += r['amount']
-            
-            if day_str not in weeks_grouped[wk_start]['days']:
-                weeks_grouped[wk_start]['days'][day_str] = {
-                    "date": day_str,
-                    "total": 0,
-                    "records_count": 0
-                }
-            
-            weeks_grouped[wk_start]['days'][day_str]['total'] += r['amount']
-            weeks_grouped[wk_start]['days'][day_str]['records_count'] += 1
-
-        sorted_weeks = []
-        for ws in sorted(weeks_grouped.keys(), reverse=True):
-            w_data = weeks_grouped[ws]
-            ws_dt = datetime.strptime(ws, '%Y-%m-%d')
-            we_dt = ws_dt + timedelta(days=6)
-            w_data['week_end'] = we_dt.strftime('%Y-%m-%d')
-            
-            sorted_days = []
-            for ds in sorted(w_data['days'].keys(), reverse=True):
-                sorted_days.append(w_data['days'][ds])
-            
-            w_data['days'] = sorted_days
-            sorted_weeks.append(w_data)
+
+            # Sums stay in integer cents; converted once below
+            weeks_grouped[wk_start]['total'] += day_cents
+            weeks_grouped[wk_start]['days'].append({
+                "date": day_str,
+                "total": from_cents(day_cents),
+                "records_count": day_count
+            })
+            total += day_cents
+
+        for week in weeks_grouped.values():
+            week['total'] = from_cents(week['total'])
 
         now = datetime.now()
         this_wk_start = (now - timedelta(days=now.weekday())).strftime('%Y-%m-%d')
         this_wk_end = (now - timedelta(days=now.weekday()) + timedelta(days=6)).strftime('%Y-%m-%d')
 
         return {
-            "weeks": sorted_weeks,
-            "total_amount": summary_data['total_amount'],
-            "period": summary_data['period'],
+            "weeks": list(weeks_grouped.values()),
+            "total_amount": from_cents(total),
+            "period": {"start": start_date_str, "end": end_date_str},
             "this_week_range": {"start": this_wk_start, "end": this_wk_end}
         }
 
@@ -184,6 +244,48 @@ class ExpenseService:
             
         return start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')
 
+    def get_cycle_period(self, cycle_day, ref=None):
+        """
+        Billing cycle containing ref (default today): from cycle_day up to the day
+        before it next month, inclusive. Short months start the cycle on their
+        last day, the same cycles BudgetService keeps running totals for.
+        """
+        start, end = BudgetService.cycle_bounds(cycle_day, ref or datetime.now().date())
+        return start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')
+
+    def get_dashboard(self, view='period'):
+        """
+        Everything the expense dashboards render on load, in one call. The
+        period view gets the current cycle's grouped summary; the today view
+        gets today's records plus the cycle total for the budget bar.
+        """
+        settings = self.get_settings()
+        cycle_day = settings.get('billing_cycle_start_day')
+        data = {"settings": settings}
+
+        if view == 'today':
+            start, end = self.get_cycle_period(cycle_day or 10)
+            today = datetime.now().date()
+            data["today"] = self.get_summary(today.isoformat(), (today + timedelta(days=1)).isoformat())
+            data["cycle"] = {"start": start, "end": end, "total_amount": self.get_total(start, end)}
+            return data
+
+        if cycle_day and cycle_day != 1:
+            start, end = self.get_cycle_period(cycle_day)
+        else:
+            start, end = self.get_current_period()
+        data["grouped"] = self.get_grouped_summary(start, end)
+        return data
+
+    def get_total(self, start_date_str, end_date_str):
+        """Sum over [start, end) without loading the records."""
+        cents = db.session.query(func.coalesce(func.sum(ExpenseRecord.amount_cents), 0))\
+            .filter(ExpenseRecord.user_id == current_user.id)\
+            .filter(ExpenseRecord.timestamp >= parse_timestamp(start_date_str))\
+            .filter(ExpenseRecord.timestamp < parse_timestamp(end_date_str))\
+            .scalar()
+        return from_cents(cents)
+
     def get_settings(self):
         if not current_user.is_authenticated:
             return {"monthly_budget": 10000}
@@ -219,7 +321,10 @@ class ExpenseService:
             
         if 'editable_month_range' in settings_data:
             try:
-                current_user.settings.editable_month_range = int(settings_data['editable_month_range'])
+                new_range = int(settings_data['editable_month_range'])
+                if new_range != current_user.settings.editable_month_range:
+                    current_user.settings.editable_month_range = new_range
+                    SnapshotService.on_editable_range_change(current_user.settings)
             except: pass
             
         if 'budget_alert_threshold' in settings_data:
@@ -229,18 +334,25 @@ class ExpenseService:
 
         if 'billing_cycle_start_day' in settings_data:
             try:
-                current_user.settings.billing_cycle_start_day = int(settings_data['billing_cycle_start_day'])
+                new_day = int(settings_data['billing_cycle_start_day'])
+                if new_day != current_user.settings.billing_cycle_start_day:
+                    current_user.settings.billing_cycle_start_day = new_day
+                    # Totals were kept per old cycle
+                    BudgetService.rebuild(current_user.id, new_day)
             except: pass
             
         if 'custom_categories' in settings_data:
-            current_user.settings.custom_categories = json.dumps(settings_data['custom_categories'], ensure_ascii=False)
+            entries = CategoryService.sync_settings(current_user.id, settings_data['custom_categories'])
+            current_user.settings.custom_categories = json.dumps(entries, ensure_ascii=False)
             
         if 'recurring_expenses' in settings_data:
-            current_user.settings.recurring_expenses = json.dumps(settings_data['recurring_expenses'], ensure_ascii=False)
+            entries = RecurringExpenseService.sync_rules(current_user.id, settings_data['recurring_expenses'])
+            current_user.settings.recurring_expenses = json.dumps(entries, ensure_ascii=False)
             
         if 'quick_shortcuts' in settings_data:
             current_user.settings.quick_shortcuts = json.dumps(settings_data['quick_shortcuts'], ensure_ascii=False)
             
+        VersionService.bump(current_user.id, 'settings')
         try:
             db.session.commit()
         except Exception as e:
@@ -263,7 +375,7 @@ class ExpenseService:
             return [{"label": f"{start} ~ {end}", "start": start, "end": end}]
 
         # Use first record date to find the first month start
-        first_date = datetime.strptime(result[0][:10], '%Y-%m-%d')
+        first_date = result[0]
         current = datetime(first_date.year, first_date.month, 1)
 
         periods = []
@@ -296,6 +408,110 @@ class ExpenseService:
 
         return periods
         
+    def search(self, query, start_date_str=None, end_date_str=None, limit=None, cursor=None):
+        """
+        Records whose note or category contains every term of the query.
+        Terms of 3+ characters are matched through the trigram index. Hits are
+        ranked by relevance (bm25) SEARCH_RANK_WINDOW at a time, newest window
+        first, which keeps very common terms cheap; shorter terms, which the
+        index cannot hold, filter those hits with LIKE, or on their own list
+        matches newest first. A trailing * is accepted: substring matching
+        already covers prefixes. Optional dates are [start, end) like get_summary.
+
+        Pages are keyset based: pass the returned "next" dict back as cursor.
+        Ranked searches page within a window ("offset") and then move below it
+        ("before_id"); unranked ones continue from (before_ts, before_id).
+        """
+        terms = [t.strip('"*') for t in (query or '').split()]
+        terms = [t for t in terms if t]
+        if not terms:
+            raise ValueError("Empty search query")
+        limit = min(max(int(limit or self.SEARCH_LIMIT), 1), self.MAX_SEARCH_LIMIT)
+        cursor = cursor or {}
+        before_id = int(cursor['before_id']) if cursor.get('before_id') else None
+        offset = max(int(cursor.get('offset') or 0), 0)
+        before_ts = parse_timestamp(cursor['before_ts']) if cursor.get('before_ts') else None
+
+        fts = self._FTS
+        conditions = [ExpenseRecord.user_id == current_user.id]
+        if start_date_str:
+            conditions.append(ExpenseRecord.timestamp >= parse_timestamp(start_date_str))
+        if end_date_str:
+            conditions.append(ExpenseRecord.timestamp < parse_timestamp(end_date_str))
+        if start_date_str or end_date_str:
+            # Ids of the range come off the (user_id, timestamp) index; as rowid
+            # bounds they let the FTS scan skip everything outside the period
+            in_range = select(ExpenseRecord.id).where(*conditions).correlate(None)
+            conditions += [
+                fts.c.rowid >= in_range.with_only_columns(func.min(ExpenseRecord.id)).scalar_subquery(),
+                fts.c.rowid <= in_range.with_only_columns(func.max(ExpenseRecord.id)).scalar_subquery()
+            ]
+        for term in terms:
+            if len(term) < 3:
+                pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+                conditions.append(or_(fts.c.note.like(pattern, escape='\\'),
+                                      fts.c.category.like(pattern, escape='\\')))
+
+        indexed = [t for t in terms if len(t) >= 3]
+        if indexed:
+            # Quoted strings: user input never reaches the FTS5 query syntax
+            match = literal_column('expense_fts').op('MATCH')(
+                ' '.join('"' + t.replace('"', '""') + '"' for t in indexed))
+            if before_id is not None:
+                conditions.append(fts.c.rowid < before_id)
+            # FTS5 walks hits in rowid order for free; bm25 only runs on the window
+            hits = select(fts.c.rowid.label('id'), fts.c.rank.label('rank'))\
+                .select_from(fts.join(ExpenseRecord, ExpenseRecord.id == fts.c.rowid))\
+                .where(match, *conditions)\
+                .order_by(fts.c.rowid.desc())\
+                .limit(self.SEARCH_RANK_WINDOW)\
+                .subquery()
+            # Window bounds for the cursor (window functions see the whole window, not the page)
+            q = ExpenseRecord.query.with_entities(*self._LIST_COLUMNS,
+                                                  func.min(hits.c.id).over(), func.count().over())\
+                .join(hits, hits.c.id == ExpenseRecord.id)\
+                .order_by(hits.c.rank, ExpenseRecord.timestamp.desc(), ExpenseRecord.id.desc())
+        else:
+            if before_ts is not None and before_id is not None:
+                conditions.append(or_(ExpenseRecord.timestamp < before_ts,
+                                      (ExpenseRecord.timestamp == before_ts) & (ExpenseRecord.id < before_id)))
+            q = ExpenseRecord.query.with_entities(*self._LIST_COLUMNS)\
+                .join(fts, fts.c.rowid == ExpenseRecord.id)\
+                .filter(*conditions)\
+                .order_by(ExpenseRecord.timestamp.desc(), ExpenseRecord.id.desc())
+
+        # One extra row tells whether this window / listing goes on
+        rows = q.outerjoin(Category, ExpenseRecord.category_id == Category.id)\
+            .offset(offset if indexed else 0)\
+            .limit(limit + 1)\
+            .all()
+        fields = self._LIST_FIELDS
+        records = [dict(zip(fields, row)) for row in rows[:limit]]
+
+        next_cursor = None
+        if indexed and rows:
+            window_min, window_size = rows[0][-2:]
+            if len(rows) > limit:
+                next_cursor = {"before_id": before_id, "offset": offset + limit}
+            elif window_size >= self.SEARCH_RANK_WINDOW:
+                # Window used up; continue below it if anything older matches
+                older = db.session.query(fts.c.rowid)\
+                    .select_from(fts.join(ExpenseRecord, ExpenseRecord.id == fts.c.rowid))\
+                    .filter(match, *conditions, fts.c.rowid < window_min)\
+                    .limit(1).first()
+                if older:
+                    next_cursor = {"before_id": window_min, "offset": 0}
+        elif len(rows) > limit:
+            last = records[-1]
+            next_cursor = {"before_ts": last['timestamp'], "before_id": last['id']}
+
+        return {
+            "query": ' '.join(terms),
+            "records": records,
+            "has_more": next_cursor is not None,
+            "next": next_cursor
+        }
+
     def export_records_csv(self, start_date, end_date):
         import io
         import csv
@@ -321,8 +537,8 @@ class ExpenseService:
     def _to_dict(self, record):
         return {
             'id': record.id,
-            'timestamp': record.timestamp,
-            'category': record.category,
+            'timestamp': record.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+            'category': record.category.label if record.category else None,
             'note': record.note,
             'amount': record.amount
         }
@@ -1,32 +1,165 @@
-from linebot import LineBotApi, WebhookHandler
-from linebot.exceptions import InvalidSignatureError
-from linebot.models import TextSendMessage, ImageSendMessage
+# linebot (and its pydantic/aiohttp stack) is imported on first use to keep boot fast
 from flask import current_app
+from datetime import datetime, timedelta
+import threading
+import queue
 import os
 
+class LineEventDispatcher:
+    """
+    Same add() registration API as linebot's WebhookHandler, but dispatches
+    already-parsed events one at a time so they can run off the request thread.
+    """
+
+    def __init__(self):
+        self._handlers = {}
+
+    def add(self, event, message=None):
+        def decorator(func):
+            messages = message if isinstance(message, (list, tuple)) else [message]
+            for m in messages:
+                self._handlers[self._key(event, m)] = func
+            return func
+        return decorator
+
+    def dispatch(self, event):
+        from linebot.models import MessageEvent
+        func = None
+        if isinstance(event, MessageEvent):
+            func = self._handlers.get(self._key(event.__class__, event.message.__class__))
+        if func is None:
+            func = self._handlers.get(self._key(event.__class__))
+        if func:
+            func(event)
+
+    @staticmethod
+    def _key(event, message=None):
+        return event.__name__ if message is None else f"{event.__name__}_{message.__name__}"
+
 class LineService:
+    _token = None
+    _secret = None
+    _register_handlers = None
     _line_bot_api = None
+    _parser = None
     _handler = None
+    _init_lock = threading.Lock()
+
+    # Background webhook processing
+    _queue = queue.Queue()
+    _worker = None
+    _worker_lock = threading.Lock()
+    DEDUP_RETENTION = timedelta(days=1)
 
     @classmethod
-    def init_app(cls, app):
-        token = os.environ.get('LINE_CHANNEL_ACCESS_TOKEN')
-        secret = os.environ.get('LINE_CHANNEL_SECRET')
-        
-        if token and secret:
-            cls._line_bot_api = LineBotApi(token)
-            cls._handler = WebhookHandler(secret)
-        else:
+    def init_app(cls, app, register_handlers=None):
+        """Read credentials only; the SDK client and handlers are built on first use."""
+        cls._token = os.environ.get('LINE_CHANNEL_ACCESS_TOKEN')
+        cls._secret = os.environ.get('LINE_CHANNEL_SECRET')
+        cls._register_handlers = register_handlers
+
+        if not (cls._token and cls._secret):
             print("LINE Bot credentials not found in env.")
 
+    @classmethod
+    def _ensure_client(cls):
+        if cls._line_bot_api is not None or not (cls._token and cls._secret):
+            return
+        with cls._init_lock:
+            if cls._line_bot_api is None:
+                from linebot import LineBotApi, WebhookParser
+                handler = LineEventDispatcher()
+                if cls._register_handlers:
+                    cls._register_handlers(handler)
+                cls._parser = WebhookParser(cls._secret)
+                cls._handler = handler
+                cls._line_bot_api = LineBotApi(cls._token)
+
     @classmethod
     def get_handler(cls):
+        cls._ensure_client()
         return cls._handler
 
+    @classmethod
+    def parse_webhook(cls, body, signature):
+        """Verify X-Line-Signature and parse events. Raises InvalidSignatureError."""
+        cls._ensure_client()
+        return cls._parser.parse(body, signature)
+
+    @classmethod
+    def enqueue_events(cls, app, events):
+        """Hand parsed webhook events to the background worker and return immediately."""
+        with cls._worker_lock:
+            if cls._worker is None or not cls._worker.is_alive():
+                cls._worker = threading.Thread(target=cls._process_events, args=(app,), daemon=True)
+                cls._worker.start()
+        for event in events:
+            cls._queue.put(event)
+
+    @classmethod
+    def _process_events(cls, app):
+        from models import db, LineWebhookEvent
+        last_prune = datetime.now()
+
+        while True:
+            event = cls._queue.get()
+            with app.app_context():
+                try:
+                    # LINE redelivers on timeouts; the unique event id makes handling idempotent
+                    event_id = getattr(event, 'webhook_event_id', None)
+                    if event_id:
+                        db.session.add(LineWebhookEvent(event_id=event_id))
+                        try:
+                            db.session.commit()
+                        except Exception:
+                            db.session.rollback()
+                            continue
+
+                    cls._handler.dispatch(event)
+
+                    if datetime.now() - last_prune > timedelta(hours=1):
+                        LineWebhookEvent.query.filter(
+                            LineWebhookEvent.received_at < datetime.utcnow() - cls.DEDUP_RETENTION
+                        ).delete(synchronize_session=False)
+                        db.session.commit()
+                        last_prune = datetime.now()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"LINE Webhook Worker Error: {e}")
+                finally:
+                    cls._queue.task_done()
+
+    @classmethod
+    def respond(cls, event, text):
+        """Answer an event with the free reply API, falling back to push when the token is gone."""
+        reply_token = getattr(event, 'reply_token', None)
+        if reply_token and cls.reply_message(reply_token, text):
+            return True
+        return cls.push_message(event.source.user_id, text)
+
+    @classmethod
+    def reply_message(cls, reply_token, text):
+        cls._ensure_client()
+        if not cls._line_bot_api:
+            return False
+        from linebot.models import TextSendMessage
+
+        try:
+            # Reply tokens are single-use, so all chunks go in one call (max 5 messages)
+            max_length = 4000
+            chunks = [text[i:i+max_length] for i in range(0, len(text), max_length)][:5]
+            cls._line_bot_api.reply_message(reply_token, [TextSendMessage(text=c) for c in chunks])
+            return True
+        except Exception as e:
+            print(f"LINE Reply Error: {e}")
+            return False
+
     @classmethod
     def push_message(cls, user_id, text):
+        cls._ensure_client()
         if not cls._line_bot_api:
             return False
+        from linebot.models import TextSendMessage
             
         try:
             # LINE Limit is 5000 chars. We split at 4000 to be safe.
@@ -47,8 +180,10 @@ class LineService:
 
     @classmethod
     def push_image(cls, user_id, image_url, thumbnail_url=None):
+        cls._ensure_client()
         if not cls._line_bot_api:
             return False
+        from linebot.models import ImageSendMessage
         try:
             if thumbnail_url is None:
                 thumbnail_url = image_url
@@ -0,0 +1,153 @@
+from models import db, RecurringExpense, ExpenseRecord, UserSettings, to_cents
+from services.category_service import CategoryService
+from services.snapshot_service import SnapshotService
+from services.version_service import VersionService
+from services.budget_service import BudgetService
+from datetime import date, datetime, timedelta
+from sqlalchemy import insert
+import calendar
+import time
+
+class RecurringExpenseService:
+    """
+    Turns UserSettings.recurring_expenses ([{id, name, amount, day, category}])
+    into ExpenseRecord rows. Rules are parsed into RecurringExpense when settings
+    are saved; the scheduler then only books rules whose next_date has come.
+    """
+
+    @staticmethod
+    def next_occurrence(day, on_or_after):
+        """First date >= on_or_after falling on `day` of its month (31 -> last day)."""
+        year, month = on_or_after.year, on_or_after.month
+        for _ in range(2):
+            candidate = date(year, month, min(day, calendar.monthrange(year, month)[1]))
+            if candidate >= on_or_after:
+                return candidate
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return candidate
+
+    @classmethod
+    def sync_rules(cls, user_id, entries, today=None):
+        """
+        Apply the settings list to the user's rules and return it with ids filled
+        in. New or rescheduled rules start from today, at most once per month.
+        Joins the caller's transaction.
+        """
+        today = today or date.today()
+        rules = {r.rule_key: r for r in RecurringExpense.query.filter_by(user_id=user_id).all()}
+        result = []
+        keep = set()
+
+        for index, entry in enumerate(entries or []):
+            if not isinstance(entry, dict):
+                continue
+            if entry.get('id') in (None, ''):
+                entry = dict(entry, id=int(time.time() * 1000) + index)
+            result.append(entry)
+
+            key = str(entry['id'])
+            name = str(entry.get('name') or '').strip()
+            try:
+                amount_cents = to_cents(entry.get('amount'))
+                day = int(entry.get('day'))
+            except (ArithmeticError, TypeError, ValueError):
+                continue
+            if not name or amount_cents < 0 or not 1 <= day <= 31 or key in keep:
+                continue
+            keep.add(key)
+
+            category_id = CategoryService.resolve(user_id, entry.get('category') or '其他')
+            rule = rules.get(key)
+            if rule is None:
+                rule = RecurringExpense(user_id=user_id, rule_key=key)
+            rule.name = name
+            rule.amount_cents = amount_cents
+            rule.category_id = category_id
+            if rule.day != day or rule.next_date is None:
+                rule.day = day
+                rule.next_date = cls.next_occurrence(day, cls._earliest_start(rule, today))
+            db.session.add(rule)
+
+        removed = [r.id for key, r in rules.items() if key not in keep]
+        if removed:
+            # Booked rows stay as ordinary records
+            ExpenseRecord.query.filter(ExpenseRecord.recurring_id.in_(removed))\
+                .update({ExpenseRecord.recurring_id: None}, synchronize_session=False)
+            RecurringExpense.query.filter(RecurringExpense.id.in_(removed))\
+                .delete(synchronize_session=False)
+        return result
+
+    @staticmethod
+    def _earliest_start(rule, today):
+        # A rule already booked this month waits for next month after a day change
+        last = rule.last_date
+        if last and (last.year, last.month) >= (today.year, today.month):
+            return date(last.year + last.month // 12, last.month % 12 + 1, 1)
+        return today
+
+    @classmethod
+    def materialize_due(cls, today=None):
+        """
+        Book every occurrence up to today for all users in one transaction.
+        Missed occurrences (scheduler downtime) are caught up. Rows are inserted
+        with OR IGNORE against (recurring_id, occurrence), so overlapping runs
+        never double-book. Returns the number of records created.
+        """
+        today = today or date.today()
+        due = RecurringExpense.query.filter(RecurringExpense.next_date <= today).all()
+        if not due:
+            return 0
+
+        rows = []
+        touched = {}  # user_id -> (first, last) occurrence booked
+        for rule in due:
+            occurrence = rule.next_date
+            while occurrence <= today:
+                rows.append({
+                    "user_id": rule.user_id,
+                    "timestamp": datetime.combine(occurrence, datetime.min.time()),
+                    "category_id": rule.category_id,
+                    "note": rule.name,
+                    "amount_cents": rule.amount_cents,
+                    "recurring_id": rule.id,
+                    "occurrence": occurrence
+                })
+                first, last = touched.get(rule.user_id, (occurrence, occurrence))
+                touched[rule.user_id] = (min(first, occurrence), max(last, occurrence))
+                rule.last_date = occurrence
+                occurrence = cls.next_occurrence(rule.day, occurrence + timedelta(days=1))
+            rule.next_date = occurrence
+
+        result = db.session.execute(insert(ExpenseRecord.__table__).prefix_with('OR IGNORE'), rows)
+        settings = {s.user_id: s for s in UserSettings.query.filter(UserSettings.user_id.in_(touched)).all()}
+        if result.rowcount == len(rows):
+            alerts = cls._apply_budgets(rows, settings, today)
+        else:
+            # Some rows were already booked and we can't tell which: recompute
+            alerts = []
+            for user_id in touched:
+                user_settings = settings.get(user_id)
+                BudgetService.rebuild(user_id, user_settings.billing_cycle_start_day if user_settings else None)
+        for user_id, (first, last) in touched.items():
+            SnapshotService.invalidate(user_id, first.isoformat(), last.isoformat())
+            VersionService.bump(user_id, 'expense')
+        db.session.commit()
+        for alert in alerts:
+            BudgetService.notify(alert)
+
+        created = result.rowcount if result.rowcount >= 0 else len(rows)
+        print(f"[Scheduler] Booked {created} recurring expenses for {len(touched)} users.")
+        return created
+
+    @staticmethod
+    def _apply_budgets(rows, settings, today):
+        """Fold the booked rows into each user's cycle totals; returns the alerts to send."""
+        changes = {}
+        for row in rows:
+            changes.setdefault(row['user_id'], []).append((row['timestamp'], row['amount_cents']))
+        alerts = []
+        for user_id, user_changes in changes.items():
+            alert = BudgetService.apply(user_id, settings.get(user_id), user_changes, today)
+            if alert:
+                alerts.append(alert)
+        return alerts
@@ -3,6 +3,8 @@ from extensions import mail
 from flask_mail import Message
 from flask import current_app
 from services.line_service import LineService
+from services.version_service import VersionService
+from services.event_service import ReminderEventBus
 from datetime import datetime, timedelta
 import json
 import calendar
@@ -47,6 +49,8 @@ class ReminderService:
         )
         
         db.session.add(reminder)
+        ReminderEventBus.record(reminder, 'create')
+        VersionService.bump(user_id, 'reminders')
         db.session.commit()
         return reminder, None
 
@@ -69,6 +73,8 @@ class ReminderService:
         if 'notify_method' in data:
             reminder.notify_method = json.dumps(data.get('notify_method'))
             
+        ReminderEventBus.record(reminder, 'update')
+        VersionService.bump(user_id, 'reminders')
         db.session.commit()
         return reminder, None
 
@@ -77,6 +83,8 @@ class ReminderService:
         reminder = Reminder.query.filter_by(id=reminder_id, user_id=user_id).first()
         if reminder:
             db.session.delete(reminder)
+            ReminderEventBus.record(reminder, 'delete')
+            VersionService.bump(user_id, 'reminders')
             db.session.commit()
             return True
         return False
@@ -86,6 +94,8 @@ class ReminderService:
         reminder = Reminder.query.filter_by(id=reminder_id, user_id=user_id).first()
         if reminder:
             reminder.is_active = not reminder.is_active
+            ReminderEventBus.record(reminder, 'update')
+            VersionService.bump(user_id, 'reminders')
             db.session.commit()
             return reminder.is_active
         return None
@@ -172,6 +182,8 @@ class ReminderService:
                     
                     if r.frequency == 'once':
                         r.is_active = False
+                        ReminderEventBus.record(r, 'update')
+                        VersionService.bump(r.user_id, 'reminders')
                     
                     sent_count += 1
             
@@ -1,6 +1,7 @@
-from models import db, ReportLog, User
+from models import db, ReportLog, User, format_amount
 from services.salary_service import SalaryService
 from services.expense_service import ExpenseService
+from services.category_service import CategoryService
 from services.email_service import EmailService
 from datetime import datetime, timedelta
 import threading
@@ -156,7 +157,7 @@ class ReportService:
                             template='email/expense_export.html',
                             username=user.username,
                             period=f"{start_date} ~ {end_date}",
-                            total_amount=f"${data.get('total_amount', 0):,}",
+                            total_amount=f"${format_amount(data.get('total_amount', 0))}",
                             records=records,
                             top_categories=top_categories
                         )
@@ -165,15 +166,16 @@ class ReportService:
                      if 'line' in methods and user.settings.line_user_id:
                         msg = (
                             f"💸 [記帳報表] {start_date} ~ {end_date}\n"
-                            f"總支出: ${data.get('total_amount', 0):,}\n"
+                            f"總支出: ${format_amount(data.get('total_amount', 0))}\n"
                             f"------------------\n"
                         )
                         
                         # Add details (All records)
                         detail_lines = []
                         for r in records:
-                            cat = r.get('category', '其他').split(' ')[0] # Get emoji or just first part
-                            detail_lines.append(f"{r['timestamp'][5:16]} {cat} ${int(r['amount'])}")
+                            emoji, name = CategoryService.parse_label(r.get('category') or '其他')
+                            cat = emoji or name
+                            detail_lines.append(f"{r['timestamp'][5:16]} {cat} ${format_amount(r['amount'])}")
                             
                         msg += "\n".join(detail_lines)
                         
@@ -1,9 +1,64 @@
-from models import db, SalaryRecord, UserSettings
+from models import db, SalaryRecord, ShiftTemplate, UserSettings, parse_date, parse_time, shift_span
 from flask_login import current_user
 from datetime import datetime, timedelta
-from sqlalchemy import func
+from sqlalchemy import func, type_coerce, select, insert, case, cast, literal, or_, and_, exists
+from sqlalchemy.orm import aliased
+from services.snapshot_service import SnapshotService
+from services.version_service import VersionService
+import bisect
+import json
+
+# Longest possible shift (end == start is zero hours), so a shift overlapping
+# [s, e) must start within (s - MAX_SHIFT, e): a bounded range on the starts_at index.
+MAX_SHIFT = timedelta(hours=24)
+
+class ShiftIntervalIndex:
+    """
+    In-memory counterpart of the (user_id, starts_at) index for bulk inserts:
+    spans sorted by start, so each overlap probe is a bisect plus the hits.
+    """
+
+    def __init__(self, spans=()):
+        self._spans = sorted(spans)
+        self._starts = [s for s, _ in self._spans]
+
+    @classmethod
+    def load(cls, user_id, start_date, end_date):
+        """Existing shifts that could touch days start_date..end_date."""
+        lower = datetime.combine(start_date, datetime.min.time()) - MAX_SHIFT
+        upper = datetime.combine(end_date, datetime.min.time()) + 2 * MAX_SHIFT
+        rows = db.session.query(SalaryRecord.starts_at, SalaryRecord.ends_at)\
+            .filter(SalaryRecord.user_id == user_id, SalaryRecord.type == 'shift')\
+            .filter(SalaryRecord.starts_at > lower, SalaryRecord.starts_at < upper)\
+            .all()
+        return cls((s, e) for s, e in rows if e is not None)
+
+    def overlaps(self, starts_at, ends_at):
+        lo = bisect.bisect_right(self._starts, starts_at - MAX_SHIFT)
+        hi = bisect.bisect_left(self._starts, ends_at)
+        return any(self._spans[i][1] > starts_at for i in range(lo, hi))
+
+    def add(self, starts_at, ends_at):
+        i = bisect.bisect_left(self._starts, starts_at)
+        self._starts.insert(i, starts_at)
+        self._spans.insert(i, (starts_at, ends_at))
 
 class SalaryService:
+    # Read-only listings select these columns and build dicts straight from the
+    # row tuples, skipping ORM instances and the identity map (see _to_dict).
+    # Date/time columns come back as their stored text, already in API format.
+    _LIST_COLUMNS = (
+        SalaryRecord.id, type_coerce(SalaryRecord.date, db.String).label('date'), SalaryRecord.type,
+        type_coerce(SalaryRecord.start_time, db.String).label('start_time'),
+        type_coerce(SalaryRecord.end_time, db.String).label('end_time'), SalaryRecord.hours,
+        SalaryRecord.rate, SalaryRecord.amount, SalaryRecord.note
+    )
+    _LIST_FIELDS = tuple(c.key for c in _LIST_COLUMNS)
+
+    MAX_COPY_REPEAT = 52  # copies per copy_records call (a year of weeks)
+    MAX_GENERATE_DAYS = 366  # range per generate_from_templates call
+    MAX_STATS_DAYS = 366  # range per get_range_stats call
+
     def get_all_records(self, user=None):
         target_user = user or current_user
         # Check if we have a valid user (either passed or logged in)
@@ -13,8 +68,11 @@ class SalaryService:
             return []
             
         # Return dict representations to match expected format
-        records = SalaryRecord.query.filter_by(user_id=target_user.id).order_by(SalaryRecord.date.asc()).all()
-        return [self._to_dict(r) for r in records]
+        rows = SalaryRecord.query.with_entities(*self._LIST_COLUMNS)\
+            .filter_by(user_id=target_user.id)\
+            .order_by(SalaryRecord.date.asc())\
+            .all()
+        return self._rows_to_dicts(rows)
 
     def get_records_by_range(self, start_date_str, end_date_str, user=None):
         target_user = user or current_user
@@ -23,26 +81,73 @@ class SalaryService:
         if not target_user:
             return []
             
-        records = SalaryRecord.query.filter_by(user_id=target_user.id)\
-            .filter(SalaryRecord.date >= start_date_str)\
-            .filter(SalaryRecord.date <= end_date_str)\
+        rows = SalaryRecord.query.with_entities(*self._LIST_COLUMNS)\
+            .filter_by(user_id=target_user.id)\
+            .filter(SalaryRecord.date >= parse_date(start_date_str))\
+            .filter(SalaryRecord.date <= parse_date(end_date_str))\
             .order_by(SalaryRecord.date.asc(), SalaryRecord.start_time.asc())\
             .all()
             
-        return [self._to_dict(r) for r in records]
+        return self._rows_to_dicts(rows)
 
-    def _calculate_hours(self, start_time_str, end_time_str):
-        try:
-            start_dt = datetime.strptime(start_time_str, '%H:%M')
-            end_dt = datetime.strptime(end_time_str, '%H:%M')
-            
-            if end_dt < start_dt:
-                end_dt += timedelta(days=1)
-                
-            delta = end_dt - start_dt
-            return delta.total_seconds() / 3600.0
-        except (ValueError, TypeError):
-            return 0.0
+    def _calculate_hours(self, start_time, end_time):
+        # time objects; an end before the start means the shift ran past midnight
+        minutes = (end_time.hour * 60 + end_time.minute) - (start_time.hour * 60 + start_time.minute)
+        if minutes < 0:
+            minutes += 24 * 60
+        return minutes / 60.0
+
+    def _overlapping(self, user_id, starts_at, ends_at):
+        # Index range on (user_id, starts_at), then the end bound on those few rows
+        return SalaryRecord.query.filter(SalaryRecord.user_id == user_id, SalaryRecord.type == 'shift')\
+            .filter(SalaryRecord.starts_at > starts_at - MAX_SHIFT, SalaryRecord.starts_at < ends_at)\
+            .filter(SalaryRecord.ends_at > starts_at)
+
+    def _check_overlap(self, record):
+        """Raise ValueError if the shift overlaps another of the user's shifts."""
+        if record.starts_at is None or record.starts_at == record.ends_at:
+            return
+        query = self._overlapping(record.user_id, record.starts_at, record.ends_at)
+        if record.id is not None:
+            query = query.filter(SalaryRecord.id != record.id)
+        clash = query.order_by(SalaryRecord.starts_at.asc()).first()
+        if clash is not None:
+            raise ValueError(
+                f"與 {clash.date.isoformat()} {clash.start_time.strftime('%H:%M')}-"
+                f"{clash.end_time.strftime('%H:%M')} 的班表時間重疊"
+            )
+
+    def find_conflicts(self, start_date_str=None, end_date_str=None):
+        """
+        Pairs of overlapping shifts where the earlier one falls in [start, end].
+        A self-join on the starts_at index: each shift only probes the shifts
+        that start before it ends.
+        """
+        if not current_user.is_authenticated:
+            return []
+
+        first, second = aliased(SalaryRecord), aliased(SalaryRecord)
+        query = db.session.query(first, second).join(second, and_(
+            second.user_id == first.user_id,
+            second.type == 'shift',
+            second.starts_at >= first.starts_at,
+            second.starts_at < first.ends_at,
+            or_(second.starts_at > first.starts_at, second.id > first.id)
+        )).filter(first.user_id == current_user.id, first.type == 'shift')
+        if start_date_str:
+            query = query.filter(first.date >= parse_date(start_date_str))
+        if end_date_str:
+            query = query.filter(first.date <= parse_date(end_date_str))
+
+        conflicts = []
+        for a, b in query.order_by(first.starts_at.asc(), second.starts_at.asc()).all():
+            overlap = min(a.ends_at, b.ends_at) - b.starts_at
+            conflicts.append({
+                "first": self._to_dict(a),
+                "second": self._to_dict(b),
+                "overlap_hours": overlap.total_seconds() / 3600.0
+            })
+        return conflicts
 
     def add_record(self, record_data):
         if not current_user.is_authenticated:
@@ -50,19 +155,21 @@ class SalaryService:
             
         new_record = SalaryRecord(
             user_id=current_user.id,
-            date=record_data.get('date'),
+            date=parse_date(record_data.get('date')),
             type=record_data.get('type'),
             note=record_data.get('note')
         )
         
         if new_record.type == 'shift':
-            start_t = record_data.get('start_time')
-            end_t = record_data.get('end_time')
+            start_t = parse_time(record_data.get('start_time'))
+            end_t = parse_time(record_data.get('end_time'))
             new_record.start_time = start_t
             new_record.end_time = end_t
             
             if start_t and end_t:
                 new_record.hours = self._calculate_hours(start_t, end_t)
+                new_record.starts_at, new_record.ends_at = shift_span(new_record.date, start_t, end_t)
+                self._check_overlap(new_record)
             
             # Rate handling
             raw_rate = record_data.get('rate')
@@ -94,6 +201,9 @@ class SalaryService:
                     new_record.hours = 0.0
                 
         db.session.add(new_record)
+        rec_date = new_record.date.isoformat()
+        SnapshotService.invalidate(current_user.id, rec_date, rec_date)
+        VersionService.bump(current_user.id, 'salary')
         db.session.commit()
         return self._to_dict(new_record)
 
@@ -110,15 +220,22 @@ class SalaryService:
         if not record:
             return None
             
-        if 'date' in record_data: record.date = record_data['date']
+        old_date = record.date.isoformat()
+        if 'date' in record_data: record.date = parse_date(record_data['date'])
         if 'note' in record_data: record.note = record_data['note']
         
         if record.type == 'shift':
-            if 'start_time' in record_data: record.start_time = record_data['start_time']
-            if 'end_time' in record_data: record.end_time = record_data['end_time']
+            if 'start_time' in record_data: record.start_time = parse_time(record_data['start_time'])
+            if 'end_time' in record_data: record.end_time = parse_time(record_data['end_time'])
             
             if record.start_time and record.end_time:
                 record.hours = self._calculate_hours(record.start_time, record.end_time)
+                record.starts_at, record.ends_at = shift_span(record.date, record.start_time, record.end_time)
+                try:
+                    self._check_overlap(record)
+                except ValueError:
+                    db.session.rollback()
+                    raise
                 
             if 'rate' in record_data:
                 try:
@@ -142,6 +259,10 @@ class SalaryService:
                 except:
                     pass
                     
+        new_date = record.date.isoformat()
+        SnapshotService.invalidate(current_user.id, old_date, old_date)
+        SnapshotService.invalidate(current_user.id, new_date, new_date)
+        VersionService.bump(current_user.id, 'salary')
         db.session.commit()
         return self._to_dict(record)
 
@@ -152,6 +273,9 @@ class SalaryService:
         record = SalaryRecord.query.filter_by(id=record_id, user_id=current_user.id).first()
         if record:
             db.session.delete(record)
+            rec_date = record.date.isoformat()
+            SnapshotService.invalidate(current_user.id, rec_date, rec_date)
+            VersionService.bump(current_user.id, 'salary')
             db.session.commit()
             return True
         return False
@@ -189,7 +313,10 @@ class SalaryService:
             
         if 'editable_month_range' in settings_data:
             try:
-                current_user.settings.editable_month_range = int(settings_data['editable_month_range'])
+                new_range = int(settings_data['editable_month_range'])
+                if new_range != current_user.settings.editable_month_range:
+                    current_user.settings.editable_month_range = new_range
+                    SnapshotService.on_editable_range_change(current_user.settings)
             except: pass
 
         if 'default_start_time' in settings_data:
@@ -214,6 +341,7 @@ class SalaryService:
         if 'recurring_expenses' in settings_data:
             current_user.settings.recurring_expenses = settings_data['recurring_expenses']
             
+        VersionService.bump(current_user.id, 'settings')
         try:
             db.session.commit()
         except: pass
@@ -221,13 +349,74 @@ class SalaryService:
         return self.get_settings()
 
     def calculate_weekly_summary(self, start_date_str):
-        start = datetime.strptime(start_date_str, '%Y-%m-%d')
-        end = start + timedelta(days=6)
-        end_str = end.strftime('%Y-%m-%d')
-        
-        records = self.get_records_by_range(start_date_str, end_str)
-        
-        total_hours = sum(r['hours'] for r in records if 'hours' in r)
+        start = parse_date(start_date_str)
+        stats = self.get_range_stats(start, start + timedelta(days=6))
+        return {k: stats[k] for k in ("total_hours", "total_amount", "record_count")}
+
+    def get_range_stats(self, start_date_str, end_date_str):
+        """
+        Hours / amount / count for [start, end] inclusive, per day, per
+        Monday-based week (counting only days inside the range) and in total,
+        from one query grouped by date.
+        Progress is measured against the monthly target_income.
+        """
+        start, end = parse_date(start_date_str), parse_date(end_date_str)
+        if end < start:
+            raise ValueError("end_date must not be before start_date")
+        if (end - start).days >= self.MAX_STATS_DAYS:
+            raise ValueError(f"Range exceeds {self.MAX_STATS_DAYS} days")
+
+        day_rows = db.session.query(
+            SalaryRecord.date,
+            func.coalesce(func.sum(SalaryRecord.hours), 0),
+            func.coalesce(func.sum(SalaryRecord.amount), 0),
+            func.count(SalaryRecord.id)
+        ).filter(SalaryRecord.user_id == current_user.id)\
+            .filter(SalaryRecord.date >= start)\
+            .filter(SalaryRecord.date <= end)\
+            .group_by(SalaryRecord.date)\
+            .order_by(SalaryRecord.date.asc())\
+            .all()
+
+        days = []
+        weeks = {}
+        total_hours, total_amount, total_count = 0, 0, 0
+        for day, hours, amount, count in day_rows:
+            days.append({"date": day.isoformat(), "hours": hours, "amount": round(amount, 2), "count": count})
+            week_start = day - timedelta(days=day.weekday())
+            week = weeks.setdefault(week_start, {
+                "week_start": week_start.isoformat(),
+                "week_end": (week_start + timedelta(days=6)).isoformat(),
+                "hours": 0, "amount": 0, "count": 0
+            })
+            week["hours"] += hours
+            week["amount"] += amount
+            week["count"] += count
+            total_hours += hours
+            total_amount += amount
+            total_count += count
+
+        for week in weeks.values():
+            week["amount"] = round(week["amount"], 2)
+
+        target = self.get_settings().get("target_income") or 0
+        return {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "total_hours": total_hours,
+            "total_amount": int(total_amount),
+            "record_count": total_count,
+            "days": days,
+            "weeks": list(weeks.values()),
+            "target": {
+                "income": target,
+                "percent": round(total_amount / target * 100, 1) if target > 0 else None,
+                "remaining": max(0, int(target - total_amount)) if target > 0 else None
+            }
+        }
+
+    def _summarize(self, records):
+        total_hours = sum(r['hours'] for r in records if r.get('hours'))
         total_amount = sum(r['amount'] for r in records)
         
         return {
@@ -236,64 +425,341 @@ class SalaryService:
             "record_count": len(records)
         }
 
+    def get_dashboard(self, week_start_str=None):
+        """
+        Everything the weekly dashboard renders on load: settings, the week's
+        records and summary, and the month total behind the target progress bar.
+        Week and month come out of one records query over the month (plus the
+        days the week runs past it).
+        """
+        if week_start_str:
+            week_start = parse_date(week_start_str)
+        else:
+            today = datetime.now().date()
+            week_start = today - timedelta(days=today.weekday())
+        week_end = week_start + timedelta(days=6)
+        month_start = week_start.replace(day=1)
+        month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+        records = self.get_records_by_range(month_start.isoformat(), max(week_end, month_end).isoformat())
+
+        # Listed dates are ISO strings, so string comparison orders them
+        week_from, week_to, month_to = week_start.isoformat(), week_end.isoformat(), month_end.isoformat()
+        week_records = [r for r in records if week_from <= r['date'] <= week_to]
+        month_amount = sum(r['amount'] for r in records if r['date'] <= month_to)
+
+        return {
+            "settings": self.get_settings(),
+            "week": {"start": week_from, "end": week_to},
+            "records": week_records,
+            "stats": self._summarize(week_records),
+            "month": {"start": month_start.isoformat(), "end": month_to, "total_amount": month_amount}
+        }
+
     def copy_week_records(self, target_week_start_str):
+        """Copy the week before target_week_start into that week."""
+        target_start = parse_date(target_week_start_str)
+        return self.copy_records(target_start - timedelta(days=7), target_start - timedelta(days=1), target_start)
+
+    def copy_records(self, source_start_str, source_end_str, target_start_str, repeat=1):
+        """
+        Copy every record in [source_start, source_end] to target_start onwards,
+        `repeat` times back to back (e.g. this week -> each of the next 8 weeks).
+        Shifts are re-priced at the current hourly rate.
+
+        Runs one INSERT ... SELECT per copy, shifting the source rows with
+        SQLite's date() / datetime(). Copies that would overlap an existing shift
+        are left out; since each copy is its own statement, that includes shifts
+        from earlier copies (an overnight shift at the end of the range can reach
+        into the next copy). Returns the number of records created.
+        """
         if not current_user.is_authenticated:
             return 0
-            
-        target_start = datetime.strptime(target_week_start_str, '%Y-%m-%d')
-        source_start = target_start - timedelta(days=7)
-        source_end = source_start + timedelta(days=6)
-        
-        source_records = SalaryRecord.query.filter_by(user_id=current_user.id)\
-            .filter(SalaryRecord.date >= source_start.strftime('%Y-%m-%d'))\
-            .filter(SalaryRecord.date <= source_end.strftime('%Y-%m-%d'))\
-            .all()
-            
-        if not source_records:
-            return 0
-            
-        count = 0
+
+        source_start = parse_date(source_start_str)
+        source_end = parse_date(source_end_str)
+        target_start = parse_date(target_start_str)
+        repeat = int(repeat)
+        if source_end < source_start:
+            raise ValueError("source_end is before source_start")
+        if not 1 <= repeat <= self.MAX_COPY_REPEAT:
+            raise ValueError(f"repeat must be between 1 and {self.MAX_COPY_REPEAT}")
+
+        span = (source_end - source_start).days + 1
+        shift = (target_start - source_start).days
         current_rate = current_user.settings.hourly_rate
-        
-        for r in source_records:
-            old_date = datetime.strptime(r.date, '%Y-%m-%d')
-            day_diff = (old_date - source_start).days
-            new_date = target_start + timedelta(days=day_diff)
-            
-            new_record = SalaryRecord(
-                user_id=current_user.id,
-                date=new_date.strftime('%Y-%m-%d'),
-                type=r.type,
-                start_time=r.start_time,
-                end_time=r.end_time,
-                hours=r.hours,
-                note=r.note
+        is_shift = SalaryRecord.type == 'shift'
+        existing = aliased(SalaryRecord)
+        # Later passes must not pick up earlier copies when the target overlaps the source
+        last_source_id = db.session.query(func.max(SalaryRecord.id))\
+            .filter(SalaryRecord.user_id == current_user.id).scalar() or 0
+
+        count = 0
+        for i in range(repeat):
+            modifier = f"{shift + i * span} days"
+            new_start = func.datetime(SalaryRecord.starts_at, modifier)
+            new_end = func.datetime(SalaryRecord.ends_at, modifier)
+            clash = exists().where(
+                existing.user_id == current_user.id,
+                existing.type == 'shift',
+                existing.starts_at > func.datetime(new_start, '-1 day'),
+                existing.starts_at < new_end,
+                existing.ends_at > new_start
             )
-            
-            if r.type == 'shift':
-                new_record.rate = current_rate
-                new_record.amount = int(new_record.hours * current_rate)
-            else:
-                new_record.amount = r.amount
-                
-            db.session.add(new_record)
-            count += 1
-            
+            rows = select(
+                SalaryRecord.user_id,
+                func.date(SalaryRecord.date, modifier),
+                SalaryRecord.type,
+                SalaryRecord.start_time,
+                SalaryRecord.end_time,
+                SalaryRecord.hours,
+                case((is_shift, literal(current_rate)), else_=SalaryRecord.rate),
+                case((is_shift, cast(SalaryRecord.hours * current_rate, db.Integer)), else_=SalaryRecord.amount),
+                SalaryRecord.note,
+                new_start,
+                new_end
+            ).select_from(SalaryRecord)\
+                .where(SalaryRecord.user_id == current_user.id)\
+                .where(SalaryRecord.date >= source_start)\
+                .where(SalaryRecord.date <= source_end)\
+                .where(SalaryRecord.id <= last_source_id)\
+                .where(~clash)
+
+            result = db.session.execute(insert(SalaryRecord).from_select(
+                ['user_id', 'date', 'type', 'start_time', 'end_time', 'hours', 'rate', 'amount', 'note',
+                 'starts_at', 'ends_at'],
+                rows
+            ))
+            count += result.rowcount
+        if not count:
+            return 0
+
+        target_end = target_start + timedelta(days=span * repeat - 1)
+        SnapshotService.invalidate(current_user.id, target_start.isoformat(), target_end.isoformat())
+        VersionService.bump(current_user.id, 'salary')
         db.session.commit()
         return count
 
+    def recalculate_rates(self, start_date_str=None, end_date_str=None, rate=None, dry_run=False):
+        """
+        Re-price every shift in [start, end] at `rate` (default: the current
+        hourly_rate) with a single UPDATE. start defaults to the first editable
+        date, so closed periods stay as they were billed; end defaults to open-ended.
+
+        Returns a before/after summary per month and in total. With dry_run the
+        summary is computed but nothing is written.
+        """
+        if not current_user.is_authenticated:
+            return {}
+
+        settings = current_user.settings
+        rate = float(settings.hourly_rate if rate is None else rate)
+        if rate < 0:
+            raise ValueError("rate must not be negative")
+        start = parse_date(start_date_str) if start_date_str else None
+        if start is None:
+            cutoff = SnapshotService.closed_before(settings)
+            start = parse_date(cutoff) if cutoff else None
+        end = parse_date(end_date_str) if end_date_str else None
+        if start and end and end < start:
+            raise ValueError("end_date is before start_date")
+
+        new_amount = cast(SalaryRecord.hours * rate, db.Integer)
+        conditions = [SalaryRecord.user_id == current_user.id, SalaryRecord.type == 'shift']
+        if start:
+            conditions.append(SalaryRecord.date >= start)
+        if end:
+            conditions.append(SalaryRecord.date <= end)
+        changed = or_(SalaryRecord.rate.is_(None), SalaryRecord.rate != rate,
+                      SalaryRecord.amount.is_(None), SalaryRecord.amount != new_amount)
+
+        # Diff first: one grouped pass computes both old and new totals
+        month = func.substr(type_coerce(SalaryRecord.date, db.String), 1, 7)
+        rows = db.session.query(
+            month,
+            func.count(SalaryRecord.id),
+            func.sum(case((changed, 1), else_=0)),
+            func.coalesce(func.sum(SalaryRecord.amount), 0),
+            func.coalesce(func.sum(new_amount), 0)
+        ).filter(*conditions).group_by(month).order_by(month).all()
+
+        months = [{"month": m, "shifts": n, "changed": c, "before": before, "after": after,
+                   "difference": after - before} for m, n, c, before, after in rows]
+        before_total = sum(m['before'] for m in months)
+        after_total = sum(m['after'] for m in months)
+        summary = {
+            "rate": rate,
+            "start": start.isoformat() if start else None,
+            "end": end.isoformat() if end else None,
+            "shifts": sum(m['shifts'] for m in months),
+            "changed": sum(m['changed'] for m in months),
+            "before_amount": before_total,
+            "after_amount": after_total,
+            "difference": after_total - before_total,
+            "months": months,
+            "applied": False
+        }
+        if dry_run or not summary['changed']:
+            return summary
+
+        SalaryRecord.query.filter(*conditions, changed)\
+            .update({SalaryRecord.rate: rate, SalaryRecord.amount: new_amount}, synchronize_session=False)
+
+        SnapshotService.invalidate(current_user.id, summary['start'], summary['end'])
+        VersionService.bump(current_user.id, 'salary')
+        db.session.commit()
+        summary['applied'] = True
+        return summary
+
+    # ---- Shift templates ----
+
+    def get_templates(self):
+        if not current_user.is_authenticated:
+            return []
+        templates = ShiftTemplate.query.filter_by(user_id=current_user.id)\
+            .order_by(ShiftTemplate.start_time.asc(), ShiftTemplate.name.asc()).all()
+        return [self._template_to_dict(t) for t in templates]
+
+    def save_template(self, data, template_id=None):
+        """Create, or update when template_id is given. Returns None if that template isn't the user's."""
+        if template_id is None:
+            template = ShiftTemplate(user_id=current_user.id)
+        else:
+            template = ShiftTemplate.query.filter_by(id=template_id, user_id=current_user.id).first()
+            if template is None:
+                return None
+
+        if template_id is None or 'name' in data:
+            name = str(data.get('name') or '').strip()
+            if not name:
+                raise ValueError("Template name is required")
+            clash = ShiftTemplate.query.filter_by(user_id=current_user.id, name=name).first()
+            if clash is not None and clash is not template:
+                raise ValueError(f"Template '{name}' already exists")
+            template.name = name
+        if template_id is None or 'weekdays' in data:
+            weekdays = sorted({int(d) for d in data.get('weekdays') or []})
+            if not weekdays or not all(0 <= d <= 6 for d in weekdays):
+                raise ValueError("weekdays must be a non-empty list of 0 (Mon) - 6 (Sun)")
+            template.weekdays = json.dumps(weekdays)
+        if template_id is None or 'start_time' in data:
+            template.start_time = parse_time(data.get('start_time'))
+        if template_id is None or 'end_time' in data:
+            template.end_time = parse_time(data.get('end_time'))
+        if template.start_time is None or template.end_time is None:
+            raise ValueError("start_time and end_time are required")
+        if 'rate' in data:
+            template.rate = float(data['rate']) if data['rate'] not in (None, '') else None
+        if 'note' in data:
+            template.note = data['note']
+
+        db.session.add(template)
+        VersionService.bump(current_user.id, 'settings')
+        db.session.commit()
+        return self._template_to_dict(template)
+
+    def delete_template(self, template_id):
+        deleted = ShiftTemplate.query.filter_by(id=template_id, user_id=current_user.id).delete()
+        if deleted:
+            VersionService.bump(current_user.id, 'settings')
+            db.session.commit()
+        return bool(deleted)
+
+    def generate_from_templates(self, template_ids, start_date_str, end_date_str):
+        """
+        Expand templates over [start, end] and insert the shifts in one batch.
+        Dates that already had a shift before this call are skipped; several
+        templates may still fill the same free day (split shifts) as long as
+        they don't overlap each other or an overnight shift from the day before.
+        Hours and amount are computed once per distinct (start, end, rate).
+        Returns {"created", "skipped_dates"}.
+        """
+        if not current_user.is_authenticated:
+            return {"created": 0, "skipped_dates": []}
+
+        start = parse_date(start_date_str)
+        end = parse_date(end_date_str)
+        if end < start:
+            raise ValueError("end_date is before start_date")
+        if (end - start).days >= self.MAX_GENERATE_DAYS:
+            raise ValueError(f"Range is limited to {self.MAX_GENERATE_DAYS} days")
+
+        ids = {int(i) for i in template_ids or []}
+        templates = ShiftTemplate.query.filter_by(user_id=current_user.id)\
+            .filter(ShiftTemplate.id.in_(ids)).all() if ids else []
+        if not templates:
+            raise ValueError("No templates selected")
+
+        busy = {d for (d,) in db.session.query(SalaryRecord.date).distinct()
+                .filter(SalaryRecord.user_id == current_user.id, SalaryRecord.type == 'shift')
+                .filter(SalaryRecord.date >= start, SalaryRecord.date <= end)}
+
+        index = ShiftIntervalIndex.load(current_user.id, start, end)
+        weekdays = {t.id: set(json.loads(t.weekdays)) for t in templates}
+        default_rate = current_user.settings.hourly_rate
+        pricing = {}  # (start_time, end_time, rate) -> (hours, amount)
+        rows = []
+        skipped = set()
+        day = start
+        while day <= end:
+            weekday = day.weekday()
+            for t in templates:
+                if weekday not in weekdays[t.id]:
+                    continue
+                if day in busy:
+                    skipped.add(day)
+                    continue
+                rate = t.rate if t.rate is not None else default_rate
+                key = (t.start_time, t.end_time, rate)
+                if key not in pricing:
+                    hours = self._calculate_hours(t.start_time, t.end_time)
+                    pricing[key] = (hours, int(hours * rate))
+                hours, amount = pricing[key]
+                starts_at, ends_at = shift_span(day, t.start_time, t.end_time)
+                if index.overlaps(starts_at, ends_at):
+                    skipped.add(day)
+                    continue
+                index.add(starts_at, ends_at)
+                rows.append({
+                    "user_id": current_user.id, "date": day, "type": 'shift',
+                    "start_time": t.start_time, "end_time": t.end_time,
+                    "hours": hours, "rate": rate, "amount": amount, "note": t.note,
+                    "starts_at": starts_at, "ends_at": ends_at
+                })
+            day += timedelta(days=1)
+
+        if rows:
+            db.session.execute(insert(SalaryRecord), rows)
+            SnapshotService.invalidate(current_user.id, start.isoformat(), end.isoformat())
+            VersionService.bump(current_user.id, 'salary')
+            db.session.commit()
+        return {"created": len(rows), "skipped_dates": sorted(d.isoformat() for d in skipped)}
+
+    def _template_to_dict(self, template):
+        return {
+            'id': template.id,
+            'name': template.name,
+            'weekdays': json.loads(template.weekdays or '[]'),
+            'start_time': template.start_time.strftime('%H:%M'),
+            'end_time': template.end_time.strftime('%H:%M'),
+            'rate': template.rate,
+            'note': template.note
+        }
+
     def clear_week_records(self, week_start_str):
         if not current_user.is_authenticated:
             return 0
             
-        start = datetime.strptime(week_start_str, '%Y-%m-%d')
+        start = parse_date(week_start_str)
         end = start + timedelta(days=6)
         
         deleted = SalaryRecord.query.filter_by(user_id=current_user.id)\
-            .filter(SalaryRecord.date >= start.strftime('%Y-%m-%d'))\
-            .filter(SalaryRecord.date <= end.strftime('%Y-%m-%d'))\
+            .filter(SalaryRecord.date >= start)\
+            .filter(SalaryRecord.date <= end)\
             .delete()
             
+        SnapshotService.invalidate(current_user.id, start.isoformat(), end.isoformat())
+        VersionService.bump(current_user.id, 'salary')
         db.session.commit()
         return deleted
 
@@ -332,8 +798,8 @@ class SalaryService:
             start_date = now - timedelta(days=30)
             end_date = now + timedelta(days=30)
         else:
-            start_date = datetime.strptime(result[0], '%Y-%m-%d') - timedelta(days=30)
-            end_date = datetime.strptime(result[1], '%Y-%m-%d') + timedelta(days=30)
+            start_date = datetime.combine(result[0], datetime.min.time()) - timedelta(days=30)
+            end_date = datetime.combine(result[1], datetime.min.time()) + timedelta(days=30)
 
         # Normalize to 1st of month
         current = datetime(start_date.year, start_date.month, 1)
@@ -375,13 +841,17 @@ class SalaryService:
             "record_count": len(records)
         }
 
+    def _rows_to_dicts(self, rows):
+        fields = self._LIST_FIELDS
+        return [dict(zip(fields, row)) for row in rows]
+
     def _to_dict(self, record):
         return {
             'id': record.id,
-            'date': record.date,
+            'date': record.date.isoformat(),
             'type': record.type,
-            'start_time': record.start_time,
-            'end_time': record.end_time,
+            'start_time': record.start_time.strftime('%H:%M') if record.start_time else None,
+            'end_time': record.end_time.strftime('%H:%M') if record.end_time else None,
             'hours': record.hours,
             'rate': record.rate,
             'amount': record.amount,
@@ -0,0 +1,122 @@
+from datetime import datetime
+import threading
+import time
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: single process, always leader
+    fcntl = None
+
+class SchedulerService:
+    """
+    Runs the APScheduler jobs in exactly one process per host.
+
+    Every gunicorn worker imports the app, so each one would otherwise tick
+    check_reminders on its own. The leader is whoever holds an exclusive flock
+    on SCHEDULER_LOCK_FILE; the OS drops the lock when that process dies and a
+    standby picks it up on its next retry.
+
+    The lock is per host, so across dynos only one kind of process may contend:
+    the `flask run-scheduler` process by default, web processes (wsgi.py) only
+    with SCHEDULER_IN_WEB=1. create_app never starts it, so CLI commands and
+    scripts importing the app stay out of the election.
+    """
+
+    RETRY_SECONDS = 30
+
+    _scheduler = None
+    _lock_fd = None
+
+    @classmethod
+    def init_app(cls, app):
+        """Web entry points: set up jobs and contend for leadership without blocking startup."""
+        if not app.config.get('SCHEDULER_IN_WEB', False):
+            print("Scheduler disabled in web process (run `flask run-scheduler`).")
+            return
+
+        if not cls._setup(app):
+            return
+
+        if cls._try_acquire(app):
+            cls._start()
+        else:
+            threading.Thread(target=cls._standby, args=(app,), daemon=True).start()
+
+    @classmethod
+    def run_forever(cls, app):
+        """Entry point for the dedicated `flask run-scheduler` process."""
+        if not cls._setup(app):
+            return
+        threading.Thread(target=cls._standby, args=(app,), daemon=True).start()
+
+        print("[Scheduler] Running; standing by while another process holds the lock.")
+        try:
+            while True:
+                time.sleep(3600)
+        except (KeyboardInterrupt, SystemExit):
+            if cls._scheduler.running:
+                cls._scheduler.shutdown()
+
+    @classmethod
+    def _setup(cls, app):
+        try:
+            from flask_apscheduler import APScheduler
+            from services.reminder_service import ReminderService
+            from services.recurring_service import RecurringExpenseService
+        except ImportError as e:
+            print(f"Scheduler could not start: {e}")
+            print("Reminders will not be sent automatically.")
+            return False
+
+        scheduler = APScheduler()
+        app.config['SCHEDULER_API_ENABLED'] = True
+        scheduler.init_app(app)
+
+        @scheduler.task('interval', id='check_reminders', seconds=60)
+        def check_reminders_task():
+            # Wrap in app context inside the task
+            with app.app_context():
+                ReminderService.check_and_send_reminders(app)
+
+        @scheduler.task('interval', id='materialize_recurring', minutes=15)
+        def materialize_recurring_task():
+            with app.app_context():
+                RecurringExpenseService.materialize_due()
+
+        cls._scheduler = scheduler
+        return True
+
+    @classmethod
+    def _try_acquire(cls, app):
+        if fcntl is None:
+            return True
+
+        path = app.config['SCHEDULER_LOCK_FILE']
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+
+        # Keep fd open for the life of the process; closing it releases the lock
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()} {datetime.now().isoformat()}\n".encode())
+        cls._lock_fd = fd
+        return True
+
+    @classmethod
+    def _standby(cls, app):
+        while not cls._try_acquire(app):
+            time.sleep(cls.RETRY_SECONDS)
+        print(f"[Scheduler] PID {os.getpid()} took over as leader.")
+        cls._start()
+
+    @classmethod
+    def _start(cls):
+        try:
+            cls._scheduler.start()
+            print(f"Scheduler started successfully (PID {os.getpid()}).")
+        except Exception as e:
+            print(f"Scheduler error: {e}")
@@ -0,0 +1,131 @@
+from models import db, PeriodSnapshot, UserSettings
+from flask import current_app
+from datetime import datetime
+import hashlib
+
+class SnapshotService:
+    """
+    Periods older than UserSettings.editable_month_range can no longer be edited,
+    so their API payloads are frozen once and served as-is afterwards.
+    """
+
+    # One year, the longest max-age worth sending
+    MAX_AGE = 31536000
+
+    @staticmethod
+    def closed_before(settings, today=None):
+        """
+        First editable date (YYYY-MM-DD); everything before it is closed.
+        Mirrors getActivePeriod() in the dashboard JS. None means nothing is closed.
+        """
+        month_range = settings.editable_month_range if settings else 1
+        if month_range is None:
+            month_range = 1
+        if month_range < 0:
+            return None
+
+        today = today or datetime.now()
+        months = today.year * 12 + (today.month - 1) - month_range
+        return datetime(months // 12, months % 12 + 1, 1).strftime('%Y-%m-%d')
+
+    @staticmethod
+    def is_closed(settings, end_date_str):
+        cutoff = SnapshotService.closed_before(settings)
+        return cutoff is not None and bool(end_date_str) and end_date_str < cutoff
+
+    @staticmethod
+    def get_or_freeze(user, kind, start_date_str, end_date_str, builder):
+        """
+        Return the PeriodSnapshot for a closed period, building it with builder()
+        on first access. Returns None when the period is still editable.
+        """
+        if not SnapshotService.is_closed(user.settings, end_date_str):
+            return None
+
+        snapshot = PeriodSnapshot.query.filter_by(
+            user_id=user.id,
+            kind=kind,
+            period_start=start_date_str,
+            period_end=end_date_str
+        ).first()
+        if snapshot:
+            return snapshot
+
+        payload = current_app.json.dumps(builder())
+        snapshot = PeriodSnapshot(
+            user_id=user.id,
+            kind=kind,
+            period_start=start_date_str,
+            period_end=end_date_str,
+            payload=payload,
+            etag=hashlib.sha256(payload.encode('utf-8')).hexdigest()
+        )
+        db.session.add(snapshot)
+        try:
+            db.session.commit()
+        except Exception:
+            # Another request froze the same period first
+            db.session.rollback()
+            snapshot = PeriodSnapshot.query.filter_by(
+                user_id=user.id,
+                kind=kind,
+                period_start=start_date_str,
+                period_end=end_date_str
+            ).first()
+        return snapshot
+
+    @staticmethod
+    def make_response(snapshot, request):
+        """
+        Serve a snapshot with a strong ETag. Clients that pass the current
+        ?epoch= may keep it forever; anyone else has to revalidate.
+        """
+        response = current_app.response_class(snapshot.payload, mimetype='application/json')
+        response.set_etag(snapshot.etag)
+        response.cache_control.private = True
+
+        settings = UserSettings.query.filter_by(user_id=snapshot.user_id).first()
+        epoch = str((settings.snapshot_epoch or 0) if settings else 0)
+        if request.args.get('epoch') == epoch:
+            response.cache_control.max_age = SnapshotService.MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+
+        return response.make_conditional(request)
+
+    @staticmethod
+    def invalidate(user_id, start_date_str=None, end_date_str=None):
+        """
+        Drop snapshots overlapping [start, end] (all of them when no range is given)
+        and bump the user's epoch. Joins the caller's transaction; the caller commits.
+        """
+        query = PeriodSnapshot.query.filter_by(user_id=user_id)
+        if start_date_str:
+            query = query.filter(PeriodSnapshot.period_end >= start_date_str)
+        if end_date_str:
+            query = query.filter(PeriodSnapshot.period_start <= end_date_str)
+
+        deleted = query.delete(synchronize_session=False)
+        if deleted:
+            SnapshotService._bump_epoch(user_id)
+        return deleted
+
+    @staticmethod
+    def on_editable_range_change(settings):
+        """Re-open snapshots that fall inside a widened edit window."""
+        cutoff = SnapshotService.closed_before(settings)
+        query = PeriodSnapshot.query.filter_by(user_id=settings.user_id)
+        if cutoff is not None:
+            query = query.filter(PeriodSnapshot.period_end >= cutoff)
+
+        deleted = query.delete(synchronize_session=False)
+        if deleted:
+            SnapshotService._bump_epoch(settings.user_id)
+        return deleted
+
+    @staticmethod
+    def _bump_epoch(user_id):
+        settings = UserSettings.query.filter_by(user_id=user_id).first()
+        if settings:
+            settings.snapshot_epoch = (settings.snapshot_epoch or 0) + 1
@@ -0,0 +1,181 @@
+from models import db, ExpenseRecord, Category, from_cents
+from services.version_service import VersionService
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import bisect
+import heapq
+import threading
+
+class SuggestionIndex:
+    """
+    One user's notes in a sorted array for prefix lookups. Every use of a note
+    adds 2^(age / HALF_LIFE) to its score, with age measured from the time the
+    index was built (future timestamps count as now), so scores weigh frequency
+    and recency together, stay within float range, and can be updated one
+    record at a time. Categories and amounts keep their own scores per note.
+    """
+
+    HALF_LIFE = timedelta(days=30)
+    MAX_ENTRIES = 2000  # distinct notes kept per user
+
+    def __init__(self, version, reference=None):
+        self.version = version  # 'expense' DataVersion the index reflects
+        self.reference = reference or datetime.now()  # zero point of the weights
+        self.entries = {}       # normalized note -> entry dict
+        self.keys = []          # sorted normalized notes
+
+    @staticmethod
+    def normalize(note):
+        return (note or '').strip().casefold()
+
+    def weight(self, timestamp):
+        # Records added later weigh slightly over 1; that only overflows after centuries of uptime
+        timestamp = min(timestamp, max(datetime.now(), self.reference))
+        return 2 ** ((timestamp - self.reference) / self.HALF_LIFE)
+
+    @classmethod
+    def build(cls, version, history_rows):
+        index = cls(version)
+        # Oldest first, so the display form is the most recent spelling
+        for note, category_id, amount_cents, timestamp in reversed(history_rows):
+            index._add(note, category_id, amount_cents, timestamp)
+        if len(index.entries) > cls.MAX_ENTRIES:
+            keep = heapq.nlargest(cls.MAX_ENTRIES, index.entries.values(), key=lambda e: e['score'])
+            index.entries = {e['key']: e for e in keep}
+        index.keys = sorted(index.entries)
+        return index
+
+    def add(self, note, category_id, amount_cents, timestamp):
+        key = self.normalize(note)
+        is_new = key and key not in self.entries
+        self._add(note, category_id, amount_cents, timestamp)
+        if is_new:
+            bisect.insort(self.keys, key)
+            if len(self.entries) > self.MAX_ENTRIES:
+                weakest = min(self.entries.values(), key=lambda e: e['score'])
+                del self.entries[weakest['key']]
+                self.keys.pop(bisect.bisect_left(self.keys, weakest['key']))
+
+    def _add(self, note, category_id, amount_cents, timestamp):
+        key = self.normalize(note)
+        if not key:
+            return
+        weight = self.weight(timestamp)
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = {'key': key, 'score': 0.0, 'count': 0, 'categories': {}, 'amounts': {}}
+        entry['note'] = note.strip()
+        entry['score'] += weight
+        entry['count'] += 1
+        entry['categories'][category_id] = entry['categories'].get(category_id, 0.0) + weight
+        entry['amounts'][amount_cents] = entry['amounts'].get(amount_cents, 0.0) + weight
+
+    def lookup(self, prefix, limit):
+        prefix = self.normalize(prefix)
+        matches = []
+        for i in range(bisect.bisect_left(self.keys, prefix), len(self.keys)):
+            if not self.keys[i].startswith(prefix):
+                break
+            matches.append(self.entries[self.keys[i]])
+        return heapq.nlargest(limit, matches, key=lambda e: e['score'])
+
+class SuggestService:
+    """
+    Expense note autocomplete from the user's own history. Indexes are built
+    lazily per user, kept in a process-wide LRU of MAX_USERS, and checked
+    against the 'expense' DataVersion on every lookup, so writes from other
+    workers or the scheduler trigger a rebuild. add_record feeds new records
+    in directly (see record).
+    """
+
+    MAX_USERS = 200
+    HISTORY_DAYS = 365
+    MAX_HISTORY_ROWS = 20000
+    MAX_LIMIT = 20
+
+    _lock = threading.Lock()
+    _indexes = OrderedDict()  # user_id -> SuggestionIndex, least recently used first
+
+    @classmethod
+    def suggest(cls, user_id, prefix='', limit=8):
+        limit = min(max(int(limit), 1), cls.MAX_LIMIT)
+        version = VersionService.get_versions(user_id, ['expense'])['expense']
+
+        with cls._lock:
+            index = cls._indexes.get(user_id)
+            if index is not None and index.version == version:
+                cls._indexes.move_to_end(user_id)
+                entries = index.lookup(prefix, limit)
+            else:
+                index = None
+
+        if index is None:
+            # Built outside the lock; a write landing meanwhile only costs a rebuild next time
+            index = SuggestionIndex.build(version, cls._history(user_id))
+            with cls._lock:
+                cls._indexes[user_id] = index
+                cls._indexes.move_to_end(user_id)
+                while len(cls._indexes) > cls.MAX_USERS:
+                    cls._indexes.popitem(last=False)
+                entries = index.lookup(prefix, limit)
+
+        return cls._to_dicts(user_id, entries)
+
+    @classmethod
+    def record(cls, user_id, note, category_id, amount_cents, timestamp):
+        """
+        Fold a just-committed record into a cached index. Only applies when
+        the index was current right before this write; otherwise it is dropped
+        and rebuilt on the next lookup.
+        """
+        with cls._lock:
+            if user_id not in cls._indexes:
+                return
+        version = VersionService.get_versions(user_id, ['expense'])['expense']
+        with cls._lock:
+            index = cls._indexes.get(user_id)
+            if index is None:
+                return
+            if index.version == version - 1:
+                try:
+                    index.add(note, category_id, amount_cents, timestamp)
+                    index.version = version
+                    return
+                except Exception as e:
+                    # The record is already committed; a cache update must not fail the write
+                    print(f"[Suggest] Dropping index for user {user_id}: {e}")
+            del cls._indexes[user_id]
+
+    @classmethod
+    def _history(cls, user_id):
+        since = datetime.now() - timedelta(days=cls.HISTORY_DAYS)
+        return db.session.query(
+            ExpenseRecord.note, ExpenseRecord.category_id, ExpenseRecord.amount_cents, ExpenseRecord.timestamp
+        ).filter(ExpenseRecord.user_id == user_id)\
+            .filter(ExpenseRecord.timestamp >= since)\
+            .order_by(ExpenseRecord.timestamp.desc())\
+            .limit(cls.MAX_HISTORY_ROWS)\
+            .all()
+
+    @staticmethod
+    def _to_dicts(user_id, entries):
+        if not entries:
+            return []
+        best = [(e, max(e['categories'], key=e['categories'].get), max(e['amounts'], key=e['amounts'].get))
+                for e in entries]
+        # Labels are looked up now, so renamed categories show their current name
+        ids = {category_id for _, category_id, _ in best if category_id is not None}
+        categories = {c.id: c for c in Category.query.filter(Category.user_id == user_id, Category.id.in_(ids)).all()} \
+            if ids else {}
+
+        result = []
+        for entry, category_id, amount_cents in best:
+            category = categories.get(category_id)
+            result.append({
+                "note": entry['note'],
+                "category": category.label if category else None,
+                "category_name": category.name if category else None,
+                "amount": from_cents(amount_cents),
+                "count": entry['count']
+            })
+        return result
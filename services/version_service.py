@@ -0,0 +1,69 @@
+from models import db, DataVersion
+from flask import request, current_app, make_response
+from flask_login import current_user
+from datetime import datetime
+from functools import wraps
+
+class VersionService:
+    """
+    Monotonic data version per user and module. Every write path bumps it,
+    read APIs derive their ETag from it and can answer 304 without querying data.
+    """
+
+    MODULES = ('salary', 'expense', 'reminders', 'settings')
+
+    @staticmethod
+    def bump(user_id, *modules):
+        """Increment the given modules. Joins the caller's transaction; the caller commits."""
+        for module in modules:
+            updated = DataVersion.query.filter_by(user_id=user_id, module=module)\
+                .update({DataVersion.version: DataVersion.version + 1}, synchronize_session=False)
+            if not updated:
+                db.session.add(DataVersion(user_id=user_id, module=module, version=1))
+
+    @staticmethod
+    def get_versions(user_id, modules):
+        rows = db.session.query(DataVersion.module, DataVersion.version)\
+            .filter(DataVersion.user_id == user_id)\
+            .filter(DataVersion.module.in_(modules))\
+            .all()
+        found = dict(rows)
+        return {m: found.get(m, 0) for m in modules}
+
+    @staticmethod
+    def etag_for(user_id, modules):
+        versions = VersionService.get_versions(user_id, modules)
+        parts = [str(user_id)] + [f"{m}.{versions[m]}" for m in modules]
+        # Default ranges ("current period", "this week") move with the date
+        parts.append(datetime.now().strftime('%Y%m%d'))
+        return '-'.join(parts)
+
+def versioned(*modules):
+    """
+    Route decorator for GET endpoints: short-circuit with 304 when If-None-Match
+    matches the current data version, otherwise tag the fresh response.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET' or not current_user.is_authenticated:
+                return view(*args, **kwargs)
+
+            etag = VersionService.etag_for(current_user.id, modules)
+            # Weak match: compressed responses carry W/"..." (see extensions.Compress)
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+                response.set_etag(etag)
+                response.cache_control.private = True
+                response.cache_control.no_cache = True
+                return response
+
+            response = make_response(view(*args, **kwargs))
+            # Snapshot responses carry their own ETag and caching policy
+            if response.status_code == 200 and not response.get_etag()[0]:
+                response.set_etag(etag)
+                response.cache_control.private = True
+                response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
@@ -43,7 +43,7 @@ window.openAvatarPreview = function () {
     if (settingsAvatar) {
         if (settingsAvatar.tagName === 'IMG') {
             // Settings has Image Avatar
-            previewImg.src = settingsAvatar.src;
+            previewImg.src = settingsAvatar.dataset.full || settingsAvatar.src;
             previewImg.style.display = 'block';
             previewEmoji.style.display = 'none';
         } else {
@@ -54,7 +54,7 @@ window.openAvatarPreview = function () {
         }
     } else if (navAvatar) {
         // Fallback to navbar avatar image
-        previewImg.src = navAvatar.src;
+        previewImg.src = navAvatar.dataset.full || navAvatar.src;
         previewImg.style.display = 'block';
         previewEmoji.style.display = 'none';
     } else {
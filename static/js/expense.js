@@ -26,17 +26,35 @@ const expenseApp = {
         }
 
         this.bindEvents();
-        this.loadSettings().then(() => {
-            // If cycle day is set, override the period from HTML (which might be default month)
-            if (this.settings.billing_cycle_start_day && this.settings.billing_cycle_start_day !== 1) {
-                // Determine current cycle based on Today
-                const cycle = this.getCycleDates(new Date());
-                // Wait, if viewing history? Dashboard usually defaults to 'Active' cycle (Now).
-                // If user wants to see specific past month, they nav.
-                this.currentPeriod = cycle;
+        this.bootstrap();
+    },
+
+    async bootstrap() {
+        // First paint: settings and the view's data in one request
+        const view = this.isTodayOnly ? 'today' : 'period';
+        try {
+            const res = await fetch(`/expense/api/bootstrap?view=${view}`);
+            const data = await res.json();
+            this.applySettings(data.settings);
+            if (this.isTodayOnly) {
+                this.renderToday(data.today);
+                this.renderSummary(data.cycle.total_amount);
+            } else {
+                // The server resolves the active billing cycle (see getCycleDates)
+                this.currentPeriod = { start: data.grouped.period.start, end: data.grouped.period.end };
+                this.renderGrouped(data.grouped);
             }
-            this.loadData();
-        });
+            performance.measure('expense:first-render');
+        } catch (e) {
+            console.error('Bootstrap failed, loading separately', e);
+            this.loadSettings().then(() => {
+                // If cycle day is set, override the period from HTML (which might be default month)
+                if (this.settings.billing_cycle_start_day && this.settings.billing_cycle_start_day !== 1) {
+                    this.currentPeriod = this.getCycleDates(new Date());
+                }
+                this.loadData();
+            });
+        }
     },
 
     initHistory() {
@@ -74,6 +92,43 @@ const expenseApp = {
 
         const exportBtn = document.getElementById('exportCsvBtn');
         if (exportBtn) exportBtn.addEventListener('click', () => { this.triggerHaptic(); this.downloadCsv(); });
+
+        const searchInput = document.getElementById('historySearch');
+        if (searchInput) {
+            let timer = null;
+            searchInput.addEventListener('input', () => {
+                clearTimeout(timer);
+                timer = setTimeout(() => this.searchHistory(searchInput.value.trim()), 250);
+            });
+        }
+    },
+
+    async searchHistory(query, cursor = null) {
+        const title = document.getElementById('historyListTitle');
+        const moreBtn = document.getElementById('historySearchMore');
+        if (moreBtn) moreBtn.style.display = 'none';
+        if (!query) {
+            if (title) title.textContent = '該期消費明細';
+            return this.loadHistoryData();
+        }
+        try {
+            // Searches every period; the selectors above only apply to the period view
+            const params = new URLSearchParams({ q: query });
+            if (cursor) {
+                Object.entries(cursor).forEach(([k, v]) => { if (v !== null) params.set(k, v); });
+            }
+            const res = await fetch(`/expense/api/search?${params}`);
+            if (!res.ok) return;
+            const data = await res.json();
+            // Later pages append; the results stay in relevance order within each batch
+            this.records = cursor ? this.records.concat(data.records) : data.records;
+            if (title) title.textContent = `搜尋「${query}」`;
+            this.renderList('historyExpenseList');
+            if (moreBtn && data.next) {
+                moreBtn.style.display = '';
+                moreBtn.onclick = () => this.searchHistory(query, data.next);
+            }
+        } catch (e) { console.error('Search failed', e); }
     },
 
 
@@ -107,9 +162,45 @@ const expenseApp = {
 
 
 
+        // Autocomplete from the user's own history (add mode only)
+        const noteInput = document.getElementById('expenseNote');
+        if (noteInput && document.getElementById('noteSuggestions')) {
+            let timer = null;
+            noteInput.addEventListener('input', () => {
+                if (document.getElementById('expenseId').value) return;
+                clearTimeout(timer);
+                timer = setTimeout(() => this.loadSuggestions(noteInput.value.trim()), 150);
+            });
+        }
+
         window.onclick = (e) => { if (e.target.classList.contains('modal')) this.closeModal(); };
     },
 
+    async loadSuggestions(prefix = '') {
+        const container = document.getElementById('noteSuggestions');
+        if (!container) return;
+        try {
+            const res = await fetch(`/expense/api/suggestions?q=${encodeURIComponent(prefix)}`);
+            if (!res.ok) return;
+            const data = await res.json();
+            container.innerHTML = '';
+            data.suggestions.forEach(s => {
+                const pill = document.createElement('div');
+                pill.className = 'tag-pill';
+                pill.textContent = `${s.note} $${Math.round(s.amount)}`;
+                pill.onclick = () => {
+                    document.getElementById('expenseNote').value = s.note;
+                    const categorySelect = document.getElementById('expenseCategory');
+                    if (categorySelect && s.category_name) categorySelect.value = s.category_name;
+                    const amountInput = document.getElementById('expenseAmount');
+                    if (amountInput && !amountInput.value) amountInput.value = s.amount;
+                    container.innerHTML = '';
+                };
+                container.appendChild(pill);
+            });
+        } catch (e) { console.error('Suggestions failed', e); }
+    },
+
     triggerHaptic() {
         if (navigator.vibrate) {
             navigator.vibrate(10); // Ultra light tap
@@ -136,9 +227,14 @@ const expenseApp = {
 
     async loadSettings() {
         try {
-            const res = await fetch(`/expense/api/settings?t=${new Date().getTime()}`);
-            this.settings = await res.json();
-            console.log("DATA_CHECK: Server returned:", this.settings);
+            const res = await fetch('/expense/api/settings');
+            this.applySettings(await res.json());
+        } catch (error) { console.error(error); }
+    },
+
+    applySettings(settings) {
+        try {
+            this.settings = settings;
             this.monthlyBudget = this.settings.monthly_budget || 10000;
 
             // Parse JSON strings
@@ -237,34 +333,37 @@ const expenseApp = {
         const url = `/expense/api/records/grouped?start_date=${this.currentPeriod.start}&end_date=${this.currentPeriod.end}`;
         try {
             const res = await fetch(url);
-            const data = await res.json();
-            const display = document.getElementById('periodDisplayTitle');
-            if (display) display.textContent = `${data.period.start} ~ ${data.period.end}`;
+            this.renderGrouped(await res.json(), preserveState);
+        } catch (error) { console.error(error); }
+    },
 
-            const weekDisp = document.getElementById('weekDisplayRange');
-            if (weekDisp && data.this_week_range) {
-                weekDisp.textContent = `${data.this_week_range.start} ~ ${data.this_week_range.end}`;
-            }
-            this.groupedData = data;
-            this.renderSummary(data.total_amount);
+    renderGrouped(data, preserveState = false) {
+        const display = document.getElementById('periodDisplayTitle');
+        if (display) display.textContent = `${data.period.start} ~ ${data.period.end}`;
 
-            if (!preserveState) {
-                this.navStack = ['weeks'];
-                this.switchLevel('weeks');
-            } else {
-                // Refresh the current level's DOM
-                if (this.viewState.level === 'weeks') this.renderWeeks();
-                else if (this.viewState.level === 'days') {
-                    // Update currentWeek reference with new data from groupedData
-                    const newWk = this.groupedData.weeks.find(w => w.week_start === this.viewState.currentWeek.week_start);
-                    if (newWk) this.viewState.currentWeek = newWk;
-                    this.renderDays(this.viewState.currentWeek);
-                }
-                else if (this.viewState.level === 'records') {
-                    this.renderRecords(this.viewState.currentDay);
-                }
+        const weekDisp = document.getElementById('weekDisplayRange');
+        if (weekDisp && data.this_week_range) {
+            weekDisp.textContent = `${data.this_week_range.start} ~ ${data.this_week_range.end}`;
+        }
+        this.groupedData = data;
+        this.renderSummary(data.total_amount);
+
+        if (!preserveState) {
+            this.navStack = ['weeks'];
+            this.switchLevel('weeks');
+        } else {
+            // Refresh the current level's DOM
+            if (this.viewState.level === 'weeks') this.renderWeeks();
+            else if (this.viewState.level === 'days') {
+                // Update currentWeek reference with new data from groupedData
+                const newWk = this.groupedData.weeks.find(w => w.week_start === this.viewState.currentWeek.week_start);
+                if (newWk) this.viewState.currentWeek = newWk;
+                this.renderDays(this.viewState.currentWeek);
             }
-        } catch (error) { console.error(error); }
+            else if (this.viewState.level === 'records') {
+                this.renderRecords(this.viewState.currentDay);
+            }
+        }
     },
 
 
@@ -275,7 +374,11 @@ const expenseApp = {
 
 
         const res = await fetch(`/expense/api/records?start_date=${localDate}&end_date=${tomorrow}`);
-        const data = await res.json();
+        this.renderToday(await res.json());
+        this.updateMonthlyStatus();
+    },
+
+    renderToday(data) {
         this.records = data.records;
 
         // Update today's total
@@ -284,27 +387,27 @@ const expenseApp = {
         if (totalEl) totalEl.textContent = `$${Math.round(total).toLocaleString()}`;
 
         this.renderList('expenseList');
-        this.updateMonthlyStatus();
     },
 
     getCycleDates(refDate = new Date()) {
         const cycleDay = this.settings.billing_cycle_start_day || 10;
-        const currentDay = refDate.getDate();
+        // Short months start the cycle on their last day (same as BudgetService.cycle_bounds)
+        const cycleStart = (year, month) =>
+            new Date(year, month, Math.min(cycleDay, new Date(year, month + 1, 0).getDate()));
 
         let startYear = refDate.getFullYear();
         let startMonth = refDate.getMonth();
 
         // If today is before cycle day, the cycle started last month
-        if (currentDay < cycleDay) {
+        let start = cycleStart(startYear, startMonth);
+        if (refDate < start) {
             startMonth--;
+            start = cycleStart(startYear, startMonth);
         }
 
-        const start = new Date(startYear, startMonth, cycleDay);
-        const end = new Date(startYear, startMonth + 1, cycleDay); // End date exclusive usually, or handles "day before"
-        // API expects inclusive date strings usually, but let's check backend.
-        // For date string "YYYY-MM-DD", let's use [Start, End - 1 day]
-
-        const endInclusive = new Date(startYear, startMonth + 1, cycleDay - 1);
+        // For date string "YYYY-MM-DD", let's use [Start, next start - 1 day]
+        const next = cycleStart(startYear, startMonth + 1);
+        const endInclusive = new Date(next.getFullYear(), next.getMonth(), next.getDate() - 1);
 
         return {
             start: this.formatDate(start),
@@ -593,10 +696,13 @@ const expenseApp = {
             dateInput.min = this.formatDate(period.start);
         }
 
+        this.loadSuggestions();
         document.getElementById('expenseModal').classList.add('show');
     },
 
     openEditModal(record) {
+        const suggestions = document.getElementById('noteSuggestions');
+        if (suggestions) suggestions.innerHTML = '';
         this.resetForm();
         const isEditable = this.isDateEditable(record.timestamp.split(' ')[0]);
 
@@ -746,12 +852,17 @@ const expenseApp = {
             let dim = new Date(y, m, 0).getDate();
             e = `${y}-${m}-${dim}`;
         }
-        const res = await fetch(`/expense/api/records?start_date=${s}&end_date=${e}`);
+        // epoch lets the browser keep closed periods from the server snapshot
+        const res = await fetch(`/expense/api/records?start_date=${s}&end_date=${e}&epoch=${this.snapshotEpoch()}`);
         const data = await res.json();
         this.records = data.records;
         const ht = document.getElementById('historyTotal'); if (ht) ht.textContent = `$${Math.round(data.total_amount).toLocaleString()}`;
         this.renderList('historyExpenseList');
     },
+    snapshotEpoch() {
+        const el = document.querySelector('[data-snapshot-epoch]');
+        return el ? el.dataset.snapshotEpoch : '0';
+    },
     async downloadCsv() {
         const y = document.getElementById('yearSelect').value;
         const m = document.getElementById('monthSelect').value;
@@ -988,13 +1099,23 @@ expenseApp.saveSettings = async function () {
     payload.recurring_expenses = (this.settings.recurring_expenses || []).filter(r => r && r.name);
     payload.quick_shortcuts = (this.settings.quick_shortcuts || []).filter(s => s && s.name);
     try {
-        await fetch('/expense/api/settings', {
+        const res = await fetch('/expense/api/settings', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
             },
             body: JSON.stringify(payload)
         });
+        if (res.ok) {
+            // Pick up ids assigned to new categories / recurring items so later edits update in place
+            const saved = await res.json();
+            try {
+                const cats = JSON.parse(saved.custom_categories || '[]');
+                if (Array.isArray(cats)) this.settings.custom_categories = cats;
+                const recs = JSON.parse(saved.recurring_expenses || '[]');
+                if (Array.isArray(recs)) this.settings.recurring_expenses = recs;
+            } catch (e) { console.error('Settings id sync failed', e); }
+        }
         // Optional: show toast
     } catch (e) { console.error('Save failed', e); alert('儲存失敗'); }
 };
@@ -1102,6 +1223,7 @@ expenseApp.editCategory = function (idx) {
     const newColor = prompt('修改顏色 (Hex):', cat.color);
 
     this.settings.custom_categories[idx] = {
+        ...cat, // keep id so the server renames in place
         name: newName,
         emoji: newEmoji || cat.emoji,
         color: newColor || cat.color
@@ -10,7 +10,27 @@ const salaryApp = {
         this.currentWeekStart = new Date(startDateStr);
 
         this.bindEvents();
-        this.loadSettings().then(() => this.loadWeek());
+        this.bootstrap();
+    },
+
+    async bootstrap() {
+        // First paint: settings, this week's records and the month total in one request
+        const startStr = this.formatDate(this.currentWeekStart);
+        try {
+            const res = await fetch(`/salary/api/bootstrap?start_date=${startStr}`);
+            const data = await res.json();
+            this.settings = data.settings;
+            this.records = data.records;
+            this.renderWeekLabel(data.week.start, data.week.end);
+            this.updateActionButtonsVisibility();
+            this.renderGrid();
+            this.updateSummary();
+            this.updateTargetProgress(data.month.total_amount);
+            performance.measure('salary:first-render');
+        } catch (e) {
+            console.error('Bootstrap failed, loading separately', e);
+            this.loadSettings().then(() => this.loadWeek());
+        }
     },
 
     async loadSettings() {
@@ -40,6 +60,8 @@ const salaryApp = {
 
         // Actions
         addSafeListener('copyLastWeekBtn', 'click', () => this.copyLastWeek());
+        addSafeListener('copyToNextWeeksBtn', 'click', () => this.copyToNextWeeks());
+        addSafeListener('applyTemplateBtn', 'click', () => this.applyTemplates());
         addSafeListener('clearThisWeekBtn', 'click', () => this.clearThisWeek());
 
         // Modal Events
@@ -68,9 +90,13 @@ const salaryApp = {
         if (!dash) return;
         const isPast = !this.isDateEditable(this.formatDate(this.currentWeekStart));
         const copyBtn = document.getElementById('copyLastWeekBtn');
+        const repeatBtn = document.getElementById('copyToNextWeeksBtn');
+        const templateBtn = document.getElementById('applyTemplateBtn');
         const clearBtn = document.getElementById('clearThisWeekBtn');
 
         if (copyBtn) copyBtn.style.display = isPast ? 'none' : 'inline-flex';
+        if (repeatBtn) repeatBtn.style.display = isPast ? 'none' : 'inline-flex';
+        if (templateBtn) templateBtn.style.display = isPast ? 'none' : 'inline-flex';
         if (clearBtn) clearBtn.style.display = isPast ? 'none' : 'inline-flex';
     },
 
@@ -106,11 +132,7 @@ const salaryApp = {
         const end = new Date(this.currentWeekStart);
         end.setDate(end.getDate() + 6);
         const endStr = this.formatDate(end);
-
-        const label = document.getElementById('currentWeekLabel');
-        if (label) {
-            label.textContent = `${startStr.replace(/-/g, '/')} - ${endStr.slice(5).replace(/-/g, '/')}`;
-        }
+        this.renderWeekLabel(startStr, endStr);
 
         try {
             const response = await fetch(`/salary/api/records?start_date=${startStr}&end_date=${endStr}`);
@@ -123,6 +145,13 @@ const salaryApp = {
         }
     },
 
+    renderWeekLabel(startStr, endStr) {
+        const label = document.getElementById('currentWeekLabel');
+        if (label) {
+            label.textContent = `${startStr.replace(/-/g, '/')} - ${endStr.slice(5).replace(/-/g, '/')}`;
+        }
+    },
+
     renderGrid() {
         document.querySelectorAll('.shifts-container').forEach(el => el.innerHTML = '');
         const todayStr = this.formatDate(new Date());
@@ -437,6 +466,94 @@ const salaryApp = {
         } catch (error) { }
     },
 
+    async copyToNextWeeks() {
+        const input = prompt('要將本週班表複製到接下來幾週？', '4');
+        if (input === null) return;
+        const weeks = parseInt(input, 10);
+        if (!(weeks >= 1 && weeks <= 52)) {
+            alert('請輸入 1 ~ 52 之間的週數');
+            return;
+        }
+
+        const weekEnd = new Date(this.currentWeekStart);
+        weekEnd.setDate(weekEnd.getDate() + 6);
+        const nextWeek = new Date(this.currentWeekStart);
+        nextWeek.setDate(nextWeek.getDate() + 7);
+
+        try {
+            // 一次請求完成全部週數的複製
+            const res = await fetch('/salary/api/actions/copy_range', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({
+                    source_start: this.formatDate(this.currentWeekStart),
+                    source_end: this.formatDate(weekEnd),
+                    target_start: this.formatDate(nextWeek),
+                    repeat: weeks
+                })
+            });
+
+            const data = await res.json();
+            if (res.ok) {
+                alert(`已複製 ${data.count} 筆紀錄到後續 ${weeks} 週`);
+            } else {
+                alert(data.error || '複製失敗');
+            }
+        } catch (error) { }
+    },
+
+    async applyTemplates() {
+        let templates = [];
+        try {
+            const res = await fetch('/salary/api/templates');
+            if (res.ok) templates = await res.json();
+        } catch (error) { }
+        if (!templates.length) {
+            alert('尚未建立班表範本，請先到設定頁新增');
+            return;
+        }
+
+        const list = templates.map((t, i) => `${i + 1}. ${t.name} (${t.start_time}-${t.end_time})`).join('\n');
+        const picked = prompt(`要套用哪些範本？輸入編號，多個以逗號分隔:\n${list}`, templates.map((_, i) => i + 1).join(','));
+        if (picked === null) return;
+        const ids = picked.split(',')
+            .map(s => templates[parseInt(s.trim(), 10) - 1])
+            .filter(t => t)
+            .map(t => t.id);
+        if (!ids.length) return;
+
+        const weeksInput = prompt('從本週起產生幾週？', '4');
+        if (weeksInput === null) return;
+        const weeks = parseInt(weeksInput, 10);
+        if (!(weeks >= 1 && weeks <= 52)) {
+            alert('請輸入 1 ~ 52 之間的週數');
+            return;
+        }
+
+        const end = new Date(this.currentWeekStart);
+        end.setDate(end.getDate() + weeks * 7 - 1);
+
+        try {
+            const res = await fetch('/salary/api/templates/generate', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({
+                    template_ids: ids,
+                    start_date: this.formatDate(this.currentWeekStart),
+                    end_date: this.formatDate(end)
+                })
+            });
+            const data = await res.json();
+            if (!res.ok) {
+                alert(data.error || '產生失敗');
+                return;
+            }
+            const skipped = data.skipped_dates.length ? `，略過 ${data.skipped_dates.length} 天已有排班的日期` : '';
+            alert(`已產生 ${data.created} 筆排班${skipped}`);
+            this.loadWeek();
+        } catch (error) { }
+    },
+
     async handleExport() {
         const btn = document.getElementById('exportSalaryBtn');
         const originalText = btn ? btn.innerHTML : '匯出';
@@ -536,8 +653,14 @@ const salaryApp = {
         gridStart.setDate(1 - (firstDay.getDay() || 7) + 1);
 
         try {
-            const res = await fetch(`/salary/api/records?start_date=${this.formatDate(gridStart)}&end_date=${this.formatDate(new Date(gridStart.getTime() + 42 * 864e5))}`);
-            this.records = await res.json();
+            // Calendar cells need the records; the month totals come pre-aggregated
+            const monthKey = `${y}-${String(m + 1).padStart(2, '0')}`;
+            const [recordsRes, statsRes] = await Promise.all([
+                fetch(`/salary/api/records?start_date=${this.formatDate(gridStart)}&end_date=${this.formatDate(new Date(gridStart.getTime() + 42 * 864e5))}`),
+                fetch(`/salary/api/stats?month=${monthKey}`)
+            ]);
+            this.records = await recordsRes.json();
+            const stats = await statsRes.json();
             this.renderCalendar(gridStart);
 
             // Cycle: 1st ~ Last Day of Month (Standard)
@@ -562,9 +685,7 @@ const salaryApp = {
                 rangeDisplay.textContent = `${cycleStart.getMonth() + 1}/${cycleStart.getDate()} ~ ${cycleEndDisplay.getMonth() + 1}/${cycleEndDisplay.getDate()}`;
             }
 
-            // Calculations use [start, end) logic usually, or inclusive check
-            // We pass (start, nextMonth) to be used as < nextMonth
-            this.updateMonthlySummary(cycleStart, nextMonth);
+            this.updateMonthlySummary(stats);
 
             // Also update tooltip
             const hLabel = document.querySelector('.summary-item:first-child .label');
@@ -640,25 +761,13 @@ const salaryApp = {
         document.getElementById('recordModal').classList.add('show');
     },
 
-    updateMonthlySummary(start, end) {
-        const startStr = this.formatDate(start);
-        const endStr = this.formatDate(end);
-        let hours = 0, amount = 0;
-
-        this.records.forEach(r => {
-            // Logic: start <= date < end (e.g. Jan 10 <= date < Feb 10)
-            if (r.date >= startStr && r.date < endStr) {
-                if (r.type === 'shift') hours += r.hours;
-                amount += r.amount;
-            }
-        });
-
+    updateMonthlySummary(stats) {
         const hEl = document.getElementById('monthlyHours');
         const aEl = document.getElementById('monthlyAmount');
-        if (hEl) hEl.textContent = `${hours.toFixed(1)}h`;
-        if (aEl) aEl.textContent = `$${Math.round(amount)}`;
+        if (hEl) hEl.textContent = `${stats.total_hours.toFixed(1)}h`;
+        if (aEl) aEl.textContent = `$${Math.round(stats.total_amount)}`;
 
-        this.updateTargetProgress(amount);
+        this.updateTargetProgress(stats.total_amount);
     },
 
     // History
@@ -722,7 +831,8 @@ const salaryApp = {
         const [start, end] = select.value.split(',');
 
         try {
-            const res = await fetch(`/salary/api/history/data?start_date=${start}&end_date=${end}`);
+            // epoch lets the browser keep closed months from the server snapshot
+            const res = await fetch(`/salary/api/history/data?start_date=${start}&end_date=${end}&epoch=${this.snapshotEpoch()}`);
             const data = await res.json();
 
             document.getElementById('historyHours').textContent = `${data.total_hours.toFixed(1)}h`;
@@ -749,9 +859,21 @@ const salaryApp = {
         } catch (error) { }
     },
 
+    snapshotEpoch() {
+        const el = document.querySelector('[data-snapshot-epoch]');
+        return el ? el.dataset.snapshotEpoch : '0';
+    },
+
     initSettings() {
+        this.loadTemplates();
+        const addTemplateBtn = document.getElementById('addTemplateBtn');
+        if (addTemplateBtn) addTemplateBtn.addEventListener('click', () => this.editTemplate());
+
         const form = document.getElementById('settingsForm');
         if (form) {
+            const rateInput = document.getElementById('hourlyRate');
+            let savedRate = rateInput ? parseFloat(rateInput.value) : null;
+
             form.addEventListener('submit', async (e) => {
                 e.preventDefault();
                 const data = Object.fromEntries(new FormData(e.target).entries());
@@ -761,10 +883,118 @@ const salaryApp = {
                         headers: { 'Content-Type': 'application/json' },
                         body: JSON.stringify(data)
                     });
-                    if (res.ok) alert('設定已儲存');
+                    if (!res.ok) return;
+                    alert('設定已儲存');
+
+                    const newRate = parseFloat(data.hourly_rate);
+                    if (!isNaN(newRate) && newRate !== savedRate) {
+                        savedRate = newRate;
+                        await this.offerRateRecalculation();
+                    }
                 } catch (error) { alert('網路錯誤'); }
             });
         }
+    },
+
+    async loadTemplates() {
+        const list = document.getElementById('templateList');
+        if (!list) return;
+        try {
+            const res = await fetch('/salary/api/templates');
+            if (!res.ok) return;
+            this.templates = await res.json();
+        } catch (error) { return; }
+
+        const dayNames = ['一', '二', '三', '四', '五', '六', '日'];
+        list.innerHTML = '';
+        this.templates.forEach(t => {
+            const el = document.createElement('div');
+            el.className = 'setting-item-row glass';
+            el.style.cssText = 'display:flex; justify-content:space-between; padding:12px; margin-bottom:8px; align-items:center;';
+            el.innerHTML = `
+                <div>
+                    <div class="template-name" style="font-weight:bold; margin-bottom:2px;"></div>
+                    <div style="font-size:0.8rem; opacity:0.7;">
+                        週${t.weekdays.map(d => dayNames[d]).join('、')} • ${t.start_time}-${t.end_time}${t.rate !== null ? ` • ${t.rate}/hr` : ''}
+                    </div>
+                </div>
+                <div style="display:flex; gap:15px;">
+                    <span class="material-icons" style="color:var(--text-secondary); cursor:pointer;" data-action="edit">edit</span>
+                    <span class="material-icons" style="color:#ef4444; cursor:pointer;" data-action="delete">delete</span>
+                </div>
+            `;
+            el.querySelector('.template-name').textContent = t.name;
+            el.querySelector('[data-action="edit"]').addEventListener('click', () => this.editTemplate(t));
+            el.querySelector('[data-action="delete"]').addEventListener('click', () => this.deleteTemplate(t));
+            list.appendChild(el);
+        });
+    },
+
+    async editTemplate(template) {
+        const t = template || { name: '', weekdays: [0, 1, 2, 3, 4], start_time: '09:00', end_time: '18:00', rate: null };
+        const name = prompt('範本名稱:', t.name);
+        if (!name) return;
+        const days = prompt('星期 (1=週一 ... 7=週日，以逗號分隔):', t.weekdays.map(d => d + 1).join(','));
+        if (days === null) return;
+        const start = prompt('上班時間 (HH:MM):', t.start_time);
+        if (!start) return;
+        const end = prompt('下班時間 (HH:MM):', t.end_time);
+        if (!end) return;
+        const rate = prompt('時薪 (留空則使用目前時薪):', t.rate !== null ? t.rate : '');
+        if (rate === null) return;
+
+        const payload = {
+            name,
+            weekdays: days.split(',').map(s => parseInt(s.trim(), 10) - 1).filter(d => d >= 0 && d <= 6),
+            start_time: start,
+            end_time: end,
+            rate: rate.trim() === '' ? null : parseFloat(rate)
+        };
+        try {
+            const res = await fetch(template ? `/salary/api/templates/${template.id}` : '/salary/api/templates', {
+                method: template ? 'PUT' : 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify(payload)
+            });
+            if (!res.ok) {
+                const data = await res.json();
+                alert(data.error || '儲存失敗');
+                return;
+            }
+            this.loadTemplates();
+        } catch (error) { alert('網路錯誤'); }
+    },
+
+    async deleteTemplate(template) {
+        if (!confirm(`確定刪除範本「${template.name}」？`)) return;
+        try {
+            const res = await fetch(`/salary/api/templates/${template.id}`, { method: 'DELETE' });
+            if (res.ok) this.loadTemplates();
+        } catch (error) { }
+    },
+
+    async offerRateRecalculation() {
+        // 先試算 (dry_run), 確認後再一次套用到可編輯期間內的所有排班
+        const preview = async (dryRun) => {
+            const res = await fetch('/salary/api/actions/recalculate', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ dry_run: dryRun })
+            });
+            return res.ok ? res.json() : null;
+        };
+
+        const diff = await preview(true);
+        if (!diff || !diff.changed) return;
+
+        const sign = diff.difference >= 0 ? '+' : '-';
+        const message = `可編輯期間 (${diff.start || '全部'} 起) 有 ${diff.changed} 筆排班使用舊時薪。\n` +
+            `重算後金額: $${diff.before_amount} → $${diff.after_amount} (${sign}$${Math.abs(diff.difference)})\n` +
+            `要以新時薪 ${diff.rate}/hr 重算嗎？`;
+        if (!confirm(message)) return;
+
+        const result = await preview(false);
+        if (result && result.applied) alert(`已重算 ${result.changed} 筆排班`);
     }
 };
 
@@ -1,4 +1,8 @@
 from app import app
+from services.scheduler_service import SchedulerService
+
+# Web processes join the scheduler election only when SCHEDULER_IN_WEB=1
+SchedulerService.init_app(app)
 
 if __name__ == "__main__":
     app.run()